@@ -0,0 +1,182 @@
+"""Coordinator running store agents across all stores and consolidating purchase orders.
+
+Stores are checked concurrently by a bounded pool of workers. Every worker uses
+the shared engine's connection pool and the shared LLM gateway, and holds a
+database session only while reading its store's data, not while waiting on the
+model. Restock lines from all stores are then grouped per supplier
+(``Product.supplier_id``) into one purchase order each.
+
+With restock rules enabled (the default) every product is first decided by
+``app.services.restock_rules``; only the rows the rules escalate are sent to the
+model, and a store with none skips its model call entirely. The run report
+gives the share of decisions made without the model.
+
+Usage: python -m app.agents.coordinator [--stores store1 store2 ...] [--workers N]
+                                        [--fake-llm [LATENCY]] [--no-rules] [--output orders.json]
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+
+from sqlalchemy import select
+
+from app.agents.store_agent import StoreAgent
+from app.models.database import async_session, engine, StoreInventory
+from app.services.llm_gateway import get_llm_gateway
+from app.services.restock_rules import load_rules, ESCALATE
+from app.config.settings import get_settings
+from app.config.constants import CURRENT_USER, CURRENT_DATETIME
+
+
+def _percentile(values, fraction: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(int(len(ordered) * fraction), len(ordered) - 1)], 4)
+
+
+def purchase_orders(lines):
+    """Group restock lines into one order per supplier, summing quantities across stores."""
+    orders = {}
+    for line in lines:
+        order = orders.setdefault(line["supplier_id"], {})
+        item = order.setdefault(line["product_id"], {
+            "product_id": line["product_id"],
+            "unit_price": line["price"],
+            "quantity": 0,
+            "stores": {}
+        })
+        item["quantity"] += line["quantity"]
+        item["stores"][line["store_id"]] = line["quantity"]
+
+    return [
+        {
+            "supplier_id": supplier_id,
+            "lines": [items[product_id] for product_id in sorted(items)],
+            "total_units": sum(item["quantity"] for item in items.values()),
+            "total_cost": round(sum(item["quantity"] * (item["unit_price"] or 0) for item in items.values()), 2),
+            "stores": len({store for item in items.values() for store in item["stores"]}),
+            "created_by": CURRENT_USER,
+            "created_at": CURRENT_DATETIME
+        }
+        for supplier_id, items in sorted(orders.items(), key=lambda order: str(order[0]))
+    ]
+
+
+class AgentCoordinator:
+    def __init__(self, session_factory=async_session, llm=None, max_workers: int = None, rules=None,
+                 use_rules: bool = None):
+        settings = get_settings()
+        self.session_factory = session_factory
+        self.llm = llm or get_llm_gateway()
+        self.max_workers = max_workers or settings.agent_max_workers
+        if use_rules is None:
+            use_rules = settings.restock_rules_enabled
+        self.rules = (rules or load_rules()) if use_rules else None
+
+    async def store_ids(self):
+        async with self.session_factory() as session:
+            result = await session.execute(select(StoreInventory.store_id).distinct().order_by(StoreInventory.store_id))
+            return result.scalars().all()
+
+    async def check_store(self, store_id: str, workers: asyncio.Semaphore):
+        timing = {"store_id": store_id}
+        async with workers:
+            started = time.perf_counter()
+            try:
+                async with self.session_factory() as session:
+                    agent = StoreAgent(store_id, session, llm=self.llm)
+                    inventory, history, start = await agent.load_inventory()
+                # The session is closed, so its connection is back in the pool during the model call
+                loaded = time.perf_counter()
+                lines = await agent.decide(inventory, history, start, self.rules, timing)
+                timing.update(db_seconds=loaded - started, llm_seconds=time.perf_counter() - loaded,
+                              restock_lines=len(lines))
+                return lines, timing
+            except Exception as e:
+                timing["error"] = str(e)
+                return [], timing
+            finally:
+                timing["seconds"] = time.perf_counter() - started
+
+    async def run(self, store_ids=None):
+        """Check ``store_ids`` (default: every store) and return purchase orders and run timing."""
+        started = time.perf_counter()
+        if store_ids is None:
+            store_ids = await self.store_ids()
+        workers = asyncio.Semaphore(self.max_workers)
+        results = await asyncio.gather(*(self.check_store(store_id, workers) for store_id in store_ids))
+
+        lines = [line for store_lines, _ in results for line in store_lines]
+        timings = [timing for _, timing in results]
+        succeeded = [timing for timing in timings if "error" not in timing]
+        elapsed = time.perf_counter() - started
+        decisions = sum((t.get("decisions", Counter()) for t in succeeded), Counter())
+        total_rows = sum(decisions.values())
+
+        return {
+            "purchase_orders": purchase_orders(lines),
+            "run": {
+                "stores": len(store_ids),
+                "succeeded": len(succeeded),
+                "failed": [{"store_id": t["store_id"], "error": t["error"]} for t in timings if "error" in t],
+                "restock_lines": len(lines),
+                "workers": self.max_workers,
+                "elapsed_seconds": round(elapsed, 4),
+                "stores_per_second": round(len(store_ids) / elapsed, 2) if elapsed else None,
+                "store_seconds": {
+                    "p50": _percentile([t["seconds"] for t in timings], 0.5),
+                    "p95": _percentile([t["seconds"] for t in timings], 0.95)
+                },
+                "db_seconds_p50": _percentile([t["db_seconds"] for t in succeeded], 0.5),
+                "llm_seconds_p50": _percentile([t["llm_seconds"] for t in succeeded], 0.5),
+                "rules": None if self.rules is None else {
+                    "decisions": dict(decisions),
+                    "resolved_without_model": round(1 - decisions[ESCALATE] / total_rows, 4) if total_rows else None,
+                    "model_calls_skipped": sum(1 for t in succeeded if not t["model_rows"])
+                },
+                "llm": dict(getattr(self.llm, "stats", Counter())),
+                "run_by": CURRENT_USER,
+                "run_at": CURRENT_DATETIME
+            }
+        }
+
+
+async def main(args):
+    llm = None
+    if args.fake_llm is not None:
+        from app.services.fake_llm import FakeLLM
+        from app.services.llm_gateway import LLMGateway
+
+        settings = get_settings()
+        llm = LLMGateway(settings.ollama_base_url, settings.ollama_model,
+                         max_concurrency=settings.llm_max_concurrency, batch_size=settings.llm_batch_size,
+                         batch_window=settings.llm_batch_window_ms / 1000, client=FakeLLM(args.fake_llm))
+    try:
+        coordinator = AgentCoordinator(llm=llm, max_workers=args.workers, use_rules=False if args.no_rules else None)
+        report = await coordinator.run(args.stores)
+    finally:
+        await engine.dispose()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(output)
+        run = report["run"]
+        print(f"{len(report['purchase_orders'])} purchase orders for {run['stores']} stores "
+              f"in {run['elapsed_seconds']}s, written to {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run store agents and emit consolidated purchase orders")
+    parser.add_argument("--stores", nargs="+", help="store IDs to check (default: all stores)")
+    parser.add_argument("--workers", type=int, help="stores checked concurrently")
+    parser.add_argument("--fake-llm", type=float, nargs="?", const=0.0, metavar="LATENCY",
+                        help="answer with the offline fake model, sleeping LATENCY seconds per prompt")
+    parser.add_argument("--no-rules", action="store_true", help="send every product to the model")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    asyncio.run(main(parser.parse_args()))
@@ -1,21 +1,30 @@
-from langchain.llms import Ollama
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.models.database import StoreInventory, Product, SalesHistory
+from app.services.inventory import adjust_stock
+from app.services.events import broker
+from app.services.prices import effective_price
+from app.services.cache import response_cache
+from app.services.llm_gateway import get_llm_gateway
+from app.services.prompt_context import encode_inventory
+from app.services.rollups import daily_sales_matrix
+from app.services.restock_rules import evaluate, load_rules, summarize, RESTOCK, ESCALATE
 from app.config.settings import get_settings
-import json
+from app.config.constants import ALERT_SALES_WINDOW_DAYS
+from datetime import timedelta
 
 settings = get_settings()
 
 class StoreAgent:
-    def __init__(self, store_id: str, session: AsyncSession):
+    def __init__(self, store_id: str, session: AsyncSession, llm=None):
         self.store_id = store_id
         self.session = session
-        self.llm = Ollama(base_url="http://localhost:11434", model="mistral")
+        self.llm = llm or get_llm_gateway()
         self.current_user = settings.current_user
         self.current_time = settings.datetime_obj
 
-    async def check_inventory(self):
+    async def load_inventory(self):
+        """Read the store's inventory and recent daily sales; returns ``(inventory_data, history, start)``."""
         query = select(StoreInventory, Product).join(Product).where(
             StoreInventory.store_id == self.store_id
         )
@@ -26,42 +35,116 @@ class StoreAgent:
             {
                 "product_id": inv.Product.id,
                 "name": inv.Product.name,
+                "supplier_id": inv.Product.supplier_id,
+                "price": effective_price(inv.StoreInventory, inv.Product),
                 "current_stock": inv.StoreInventory.stock_level,
                 "min_threshold": inv.StoreInventory.min_threshold,
                 "last_updated_by": inv.StoreInventory.last_updated_by,
-                "last_updated_at": inv.StoreInventory.last_updated_at.isoformat()
+                "last_updated_at": inv.StoreInventory.last_updated_at
             }
             for inv in inventory
         ]
+        start = self.current_time.date() + timedelta(days=1 - ALERT_SALES_WINDOW_DAYS)
+        history = await daily_sales_matrix(
+            self.session, [(self.store_id, row["product_id"]) for row in inventory_data],
+            start, ALERT_SALES_WINDOW_DAYS
+        )
+        return inventory_data, history, start
+
+    def build_prompt(self, inventory_data, history, start, notes=None):
+        """The restock prompt for ``inventory_data``; ``notes`` maps product IDs to why they need a look."""
+        context = encode_inventory(
+            self.store_id, inventory_data, history, start, self.current_time, settings.llm_prompt_token_budget
+        )
+        flagged = ""
+        if notes:
+            flagged = "Flagged for review: " + "; ".join(f"{product_id} {note}" for product_id, note in notes.items())
 
-        prompt = f"""
-        Analyze the following inventory data:
-        {json.dumps(inventory_data)}
+        return f"""
+        Analyze the following inventory and sales summary:
+        {context}
+        {flagged}
         
         Consider:
         1. Current stock levels vs minimum threshold
-        2. Last update time and user
-        3. Current time: {self.current_time.isoformat()}
+        2. Recent sales velocity, trend and days of cover
+        3. Last update time and user
         4. Current user: {self.current_user}
         
-        Return a JSON list of products that need restocking.
+        Return a JSON list of products that need restocking, as objects with
+        "product_id" and the "quantity" to order.
         """
-        
-        response = await self.llm.agenerate([prompt])
-        return json.loads(response.generations[0].text)
+
+    async def decide(self, inventory, history, start, rules=None, timing: dict = None):
+        """Restock lines for this store: ``rules`` first, the model only for escalated rows.
+
+        Without ``rules`` every row goes to the model. ``timing``, if given,
+        receives the rule decisions and how many rows the model saw.
+        """
+        timing = {} if timing is None else timing
+        if rules is None:
+            answer = await self.llm.generate_json(self.build_prompt(inventory, history, start))
+            timing["model_rows"] = len(inventory)
+            return self.restock_lines(answer, inventory)
+
+        decisions = evaluate(inventory, history, rules)
+        timing["decisions"] = summarize(decisions)
+        lines = self.restock_lines(
+            [{"product_id": d.product_id, "quantity": d.quantity} for d in decisions if d.action == RESTOCK],
+            inventory
+        )
+        escalated = [row for row, decision in enumerate(decisions) if decision.action == ESCALATE]
+        timing["model_rows"] = len(escalated)
+        if escalated:
+            rows = [inventory[row] for row in escalated]
+            notes = {decisions[row].product_id: decisions[row].reason for row in escalated}
+            answer = await self.llm.generate_json(self.build_prompt(rows, history[escalated], start, notes))
+            lines += self.restock_lines(answer, rows)
+        return lines
+
+    async def check_inventory(self, use_rules: bool = None):
+        """Restock lines for the store, through the restock rules unless they are disabled in the settings."""
+        if use_rules is None:
+            use_rules = settings.restock_rules_enabled
+        inventory_data, history, start = await self.load_inventory()
+        return await self.decide(inventory_data, history, start, load_rules() if use_rules else None)
+
+    def restock_lines(self, answer, inventory_data):
+        """Turn the model's answer into order lines for products this store actually stocks.
+
+        Entries may be product IDs or objects with a product_id (or id) and an
+        optional quantity; without a usable quantity the alert rule is used:
+        enough to get 10 units above the minimum.
+        """
+        stocked = {row["product_id"]: row for row in inventory_data}
+        lines = {}
+        for entry in answer if isinstance(answer, list) else []:
+            product_id = entry.get("product_id", entry.get("id")) if isinstance(entry, dict) else entry
+            row = stocked.get(product_id) if isinstance(product_id, str) else None
+            if row is None:
+                continue
+            quantity = entry.get("quantity") if isinstance(entry, dict) else None
+            if not isinstance(quantity, (int, float)) or quantity <= 0:
+                quantity = row["min_threshold"] - row["current_stock"] + 10
+            if quantity > 0:
+                lines[product_id] = {
+                    "store_id": self.store_id,
+                    "product_id": product_id,
+                    "supplier_id": row["supplier_id"],
+                    "price": row["price"],
+                    "quantity": int(quantity)
+                }
+        return list(lines.values())
 
     async def update_inventory(self, product_id: str, quantity: int):
-        query = select(StoreInventory).where(
-            StoreInventory.store_id == self.store_id,
-            StoreInventory.product_id == product_id
+        level = await adjust_stock(
+            self.session, self.store_id, product_id, quantity,
+            user=self.current_user, updated_at=self.current_time
         )
-        result = await self.session.execute(query)
-        inventory = result.scalar_one_or_none()
-        
-        if inventory:
-            inventory.stock_level += quantity
-            inventory.last_updated_by = self.current_user
-            inventory.last_updated_at = self.current_time
+
+        if level is not None:
             await self.session.commit()
+            response_cache.invalidate_stores([self.store_id])
+            broker.publish_stock(self.store_id, product_id, level.stock_level, level.min_threshold, quantity)
             return True
         return False
\ No newline at end of file
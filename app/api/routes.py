@@ -1,75 +1,396 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.models.database import get_session, Product, StoreInventory, SalesHistory
-from app.models.schemas import InventoryUpdate, PriceUpdate, InventoryResponse, ForecastItem, AlertItem
-from app.config.constants import CURRENT_USER, CURRENT_DATETIME, get_datetime_obj
+from sqlalchemy import select, func
+from app.models.database import get_session, Product, StoreInventory, SalesHistory, Job
+from app.models.schemas import (
+    InventoryUpdate, PriceUpdate, StockTransfer, StoreBatchRequest, SalesBulkRequest, InventoryBatchUpdate,
+    BulkPriceUpdate, JobRequest, StoreInventoryResponse, ForecastResponse, AlertsResponse, PriceOptimizationResponse
+)
+from app.config.constants import (
+    CURRENT_USER, CURRENT_DATETIME, MAX_BATCH_STORES, MAX_PAGE_SIZE, MAX_FORECAST_DAYS, ALERT_SALES_WINDOW_DAYS,
+    MAX_BULK_SALES, MAX_BATCH_ADJUSTMENTS, MAX_PRICE_CHANGE, MAX_BULK_PRICE_CHANGES,
+    STREAM_HEARTBEAT_SECONDS, VELOCITY_MAX_AGE_SECONDS, get_datetime_obj
+)
+from app.services.forecast_store import load_forecasts, freshness
+from app.services.forecast_engine import METHODS, DEFAULT_METHOD
+from app.services.pricing import PricingService
+from app.services.prices import change_prices, affected_prices
+from app.services.price_engine import OBJECTIVES, DEFAULT_OBJECTIVE, DEFAULT_MAX_CHANGE
+from app.services.rollups import average_daily_sales
+from app.services.ingestion import ingest_sales
+from app.services.inventory import adjust_stock, adjust_stock_many, transfer_stock, read_stock_levels
+from app.services.stock_ledger import point_in_time, ADJUSTMENT, RECEIPT
+from app.services.inventory_reads import inventory_page, parse_fields
+from app.services.cache import response_cache
+from app.services.serialization import dumps, validated_dumps
+from app.services.events import broker, encode_event
+from app.services.jobs import JOBS, STATUSES, scheduler, enqueue, job_payload
+from app.services.scheduled_jobs import read_sales_velocity
+from app.services.export import DATASETS, FORMATS, MEDIA_TYPES, export_query, stream_export, arrow_available
+from collections import Counter
 from datetime import datetime, timedelta
+from itertools import groupby
 from typing import List
-import numpy as np
 
 router = APIRouter()
 
 
-@router.get("/inventory/{store_id}")
-async def get_store_inventory(store_id: str, session: AsyncSession = Depends(get_session)):
-    try:
-        query = select(StoreInventory, Product).join(
-            Product, StoreInventory.product_id == Product.id
-        ).where(StoreInventory.store_id == store_id)
+# Every column the per-row payloads below need, read as plain row tuples rather
+# than hydrated StoreInventory/Product entities; price is the store's effective price
+_INVENTORY_COLUMNS = (
+    StoreInventory.store_id, StoreInventory.product_id, Product.name, Product.category, StoreInventory.stock_level,
+    StoreInventory.min_threshold, func.coalesce(StoreInventory.store_price, Product.price).label("price"),
+    Product.unit_cost, StoreInventory.last_updated_at
+)
+
+
+def _inventory_query(*conditions):
+    return select(*_INVENTORY_COLUMNS).join(
+        Product, StoreInventory.product_id == Product.id
+    ).where(*conditions)
+
+
+def _inventory_item(item):
+    return {
+        "product_id": item.product_id,
+        "name": item.name,
+        "category": item.category,
+        "current_stock": item.stock_level,
+        "min_threshold": item.min_threshold,
+        "price": item.price,
+        "last_updated": item.last_updated_at.isoformat() if item.last_updated_at else None
+    }
+
+
+def _forecast_item(item, predictions, confidence):
+    daily_demand = [int(round(value)) for value in predictions]
+    return {
+        "product_id": item.product_id,
+        "product_name": item.name,
+        "current_stock": item.stock_level,
+        "predicted_demand": sum(daily_demand),
+        "confidence": float(confidence),
+        "daily_demand": daily_demand
+    }
+
+
+def _check_forecast_params(days: int, method: str):
+    if not 1 <= days <= MAX_FORECAST_DAYS:
+        raise HTTPException(status_code=400, detail=f"days must be between 1 and {MAX_FORECAST_DAYS}")
+    if method not in METHODS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown forecasting method '{method}', expected one of {', '.join(METHODS)}"
+        )
 
-        result = await session.execute(query)
-        items = result.all()
 
-        if not items:
-            raise HTTPException(status_code=404, detail=f"No inventory found for store {store_id}")
+async def _forecast_builder(session, items, days, method, refresh=False):
+    """Serve every inventory row's forecast from the forecast store and return a per-row builder.
+
+    Series without a usable stored forecast are computed and stored first, in
+    one engine call; with ``refresh`` so are those whose sales changed since.
+    The builder's ``freshness`` describes what was served.
+    """
+    store_ids = sorted({item.store_id for item in items})
+    stored, recomputed = await load_forecasts(session, store_ids, days, method, include_stale=refresh)
+
+    def build(item):
+        daily_demand, confidence = stored[(item.store_id, item.product_id)][:2]
+        return _forecast_item(item, daily_demand, confidence)
+
+    build.freshness = freshness(stored, recomputed)
+    return build
+
+
+def _alert_item(item, avg_daily_sales=None):
+    stock_level = item.stock_level
+    return {
+        "product_id": item.product_id,
+        "product_name": item.name,
+        "current_stock": stock_level,
+        "min_threshold": item.min_threshold,
+        "urgency": "HIGH" if stock_level < (item.min_threshold / 2) else "MEDIUM",
+        "suggested_order": item.min_threshold - stock_level + 10,
+        "avg_daily_sales": None if avg_daily_sales is None else round(avg_daily_sales, 2),
+        "days_of_cover": round(max(stock_level, 0) / avg_daily_sales, 1) if avg_daily_sales else None
+    }
+
+
+async def _alert_builder(session, items):
+    """Attach recent sales velocity to every alert row.
+
+    Reads the ``sales_velocity`` table kept by the alert_materialization job
+    while it is fresh, and aggregates the daily_sales rollup otherwise. The
+    builder's ``velocity_as_of`` is when the figures were computed (None: now).
+    """
+    series = [(item.store_id, item.product_id) for item in items]
+    materialized = await read_sales_velocity(session, series, VELOCITY_MAX_AGE_SECONDS)
+    if materialized is not None:
+        velocity, as_of = materialized
+    else:
+        start = get_datetime_obj().date() + timedelta(days=1 - ALERT_SALES_WINDOW_DAYS)
+        velocity, as_of = await average_daily_sales(session, series, start, ALERT_SALES_WINDOW_DAYS), None
+
+    def build(item):
+        return _alert_item(item, velocity[(item.store_id, item.product_id)])
+
+    build.velocity_as_of = as_of
+    return build
+
+
+def _check_pricing_params(objective: str, max_change: float):
+    if objective not in OBJECTIVES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown pricing objective '{objective}', expected one of {', '.join(OBJECTIVES)}"
+        )
+    if not 0 < max_change <= MAX_PRICE_CHANGE:
+        raise HTTPException(status_code=400, detail=f"max_change must be in (0, {MAX_PRICE_CHANGE}]")
+
+
+def _price_item(item, result, row):
+    current_price = float(result["price"][row])
+    suggested_price = float(result["suggested_price"][row])
+    cost = result["cost"][row]
+    demand, expected = result["demand"][row], result["expected_demand"][row]
+
+    return {
+        "product_id": item.product_id,
+        "product_name": item.name,
+        "current_price": current_price,
+        "suggested_price": suggested_price,
+        "stock_level": item.stock_level,
+        "elasticity": round(float(result["elasticity"][row]), 3),
+        "expected_daily_demand": round(float(expected), 2),
+        # Per day, at the estimated elasticity
+        "potential_profit_increase": round(
+            float((suggested_price - cost) * expected - (current_price - cost) * demand), 2
+        ),
+        "expected_demand_change": f"{expected / demand - 1:+.1%}" if demand > 0 else None
+    }
+
+
+async def _price_builder(session, items, objective, max_change):
+    """Optimize every inventory row in one engine call and return a per-row builder."""
+    result = await PricingService(session).optimize_items(items, objective, max_change)
+    rows = {(item.store_id, item.product_id): row for row, item in enumerate(items)}
+
+    def build(item):
+        return _price_item(item, result, rows[(item.store_id, item.product_id)])
+
+    return build
+
+
+def _batch_store_ids(batch: StoreBatchRequest):
+    # Keep the caller's order but drop duplicates so each store is emitted once
+    store_ids = list(dict.fromkeys(batch.store_ids))
+    if not store_ids:
+        raise HTTPException(status_code=400, detail="store_ids must not be empty")
+    if len(store_ids) > MAX_BATCH_STORES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_BATCH_STORES} stores can be requested per batch"
+        )
+    return store_ids
+
+
+async def _stream_batch(session, store_ids, conditions, key, build, user_key, time_key, prepare=None):
+    """Run one set-based query for all stores and stream one NDJSON line per store.
+
+    ``prepare`` may be given instead of ``build``: an async callable receiving all
+    fetched rows and returning the per-row builder, for work done across stores.
+    """
+    query = _inventory_query(StoreInventory.store_id.in_(store_ids), *conditions).order_by(
+        StoreInventory.store_id, StoreInventory.product_id
+    )
+    result = await session.execute(query)
+    items = result.all()
+    if prepare is not None:
+        build = await prepare(items)
+    grouped = {
+        store_id: [build(item) for item in store_items]
+        for store_id, store_items in groupby(items, key=lambda item: item.store_id)
+    }
+
+    def lines():
+        for store_id in store_ids:
+            yield dumps({
+                "store_id": store_id,
+                key: grouped.get(store_id, []),
+                user_key: CURRENT_USER,
+                time_key: CURRENT_DATETIME
+            }) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+async def _cached_response(request: Request, endpoint: str, store_id: str, build, model):
+    """Serve ``build()``'s payload from the response cache, honouring If-None-Match.
+
+    The payload is checked against ``model`` once, when it is built, so a body
+    that does not match the route's ``response_model`` is never cached or sent.
+    """
+    key = (endpoint, store_id, str(request.query_params))
+    # Profiled requests (see app/services/metrics.py) must do the work to be worth profiling
+    entry = None if getattr(request.state, "profile", False) else response_cache.get(key)
+    cache_status = "HIT"
+    if entry is None:
+        cache_status = "MISS"
+        generation = response_cache.generation(store_id)
+        body = validated_dumps(await build(), model)
+        entry = response_cache.put(key, store_id, body, generation)
+
+    headers = {"ETag": entry.etag, "X-Cache": cache_status}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if entry.etag in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+async def _store_inventory(store_id: str, session: AsyncSession, fields=None, after: str = None,
+                           limit: int = None, category: str = None, min_stock: int = None, max_stock: int = None,
+                           as_of: datetime = None):
+    history = None
+    if as_of is not None:
+        history = await point_in_time(session, store_id, as_of)
+        if history is None:
+            raise HTTPException(
+                status_code=404, detail=f"No stock history for store {store_id} as of {as_of.isoformat()}"
+            )
+    try:
+        items, next_cursor = await inventory_page(
+            session, store_id, fields, after, limit, category, min_stock, max_stock,
+            None if history is None else history.levels
+        )
 
-        inventory_data = []
-        for item in items:
-            inventory_data.append(InventoryResponse(
-                product_id=item.Product.id,
-                name=item.Product.name,
-                category=item.Product.category,
-                current_stock=item.StoreInventory.stock_level,
-                min_threshold=item.StoreInventory.min_threshold,
-                price=item.Product.price,
-                last_updated=item.StoreInventory.last_updated_at.isoformat() if item.StoreInventory.last_updated_at else None
-            ))
+        filtered = after is not None or category is not None or min_stock is not None or max_stock is not None
+        if not items and not filtered:
+            raise HTTPException(status_code=404, detail=f"No inventory found for store {store_id}")
 
-        return {
+        response = {
             "store_id": store_id,
-            "inventory": [item.dict() for item in inventory_data],
+            "inventory": items,
             "checked_by": CURRENT_USER,
             "checked_at": CURRENT_DATETIME
         }
+        if limit is not None:
+            response["next_cursor"] = next_cursor
+        if history is not None:
+            response["as_of"] = as_of.isoformat()
+            response["snapshot"] = {
+                "id": history.snapshot_id,
+                "taken_at": history.taken_at.isoformat(),
+                "replayed_movements": history.replayed
+            }
+        return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/inventory/{store_id}", response_model=StoreInventoryResponse)
+async def get_store_inventory(
+    store_id: str,
+    request: Request,
+    fields: str = None,
+    after: str = None,
+    limit: int = None,
+    category: str = None,
+    min_stock: int = None,
+    max_stock: int = None,
+    as_of: datetime = None,
+    session: AsyncSession = Depends(get_session)
+):
+    """A store's inventory ordered by product_id.
+
+    ``fields`` is a comma-separated subset of the item fields. With ``limit`` the
+    response carries ``next_cursor``; pass it back as ``after`` for the next page.
+    With ``as_of`` current_stock (and min_stock/max_stock) is the stock at that
+    moment, rebuilt from the stock ledger; the other fields stay current.
+    """
+    try:
+        selected = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return await _cached_response(
+        request, "inventory", store_id,
+        lambda: _store_inventory(store_id, session, selected, after, limit, category, min_stock, max_stock, as_of),
+        StoreInventoryResponse
+    )
+
+
+def _check_update_kinds(updates):
+    kinds = {update.kind for update in updates} - {ADJUSTMENT, RECEIPT}
+    if kinds:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown kind {', '.join(sorted(kinds))}, expected {ADJUSTMENT} or {RECEIPT}"
+        )
+
+
 @router.post("/inventory/update")
 async def update_inventory(update_data: InventoryUpdate, session: AsyncSession = Depends(get_session)):
+    _check_update_kinds([update_data])
     try:
-        query = select(StoreInventory).where(
-            StoreInventory.store_id == update_data.store_id,
-            StoreInventory.product_id == update_data.product_id
+        level = await adjust_stock(
+            session, update_data.store_id, update_data.product_id, update_data.quantity, kind=update_data.kind
         )
-        result = await session.execute(query)
-        inventory_item = result.scalar_one_or_none()
 
-        if not inventory_item:
+        if level is None:
             raise HTTPException(status_code=404, detail="Product not found in store inventory")
 
-        inventory_item.stock_level += update_data.quantity
-        inventory_item.last_updated_by = CURRENT_USER
-        inventory_item.last_updated_at = get_datetime_obj()
-
         await session.commit()
+        response_cache.invalidate_stores([update_data.store_id])
+        broker.publish_stock(
+            update_data.store_id, update_data.product_id, level.stock_level, level.min_threshold,
+            update_data.quantity
+        )
 
         return {
             "message": "Inventory updated successfully",
             "store_id": update_data.store_id,
             "product_id": update_data.product_id,
-            "new_stock_level": inventory_item.stock_level,
+            "new_stock_level": level.stock_level,
+            "updated_by": CURRENT_USER,
+            "updated_at": CURRENT_DATETIME
+        }
+    except Exception as e:
+        await session.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/inventory/update/batch")
+async def update_inventory_batch(batch: InventoryBatchUpdate, session: AsyncSession = Depends(get_session)):
+    if len(batch.updates) > MAX_BATCH_ADJUSTMENTS:
+        raise HTTPException(
+            status_code=400, detail=f"At most {MAX_BATCH_ADJUSTMENTS} adjustments can be sent per batch"
+        )
+    _check_update_kinds(batch.updates)
+    try:
+        new_levels, missing = await adjust_stock_many(
+            session, ((item.store_id, item.product_id, item.quantity, item.kind) for item in batch.updates)
+        )
+        await session.commit()
+        response_cache.invalidate_stores(store_id for store_id, _ in new_levels)
+        deltas = Counter()
+        for item in batch.updates:
+            deltas[(item.store_id, item.product_id)] += item.quantity
+        broker.publish_levels(new_levels, deltas)
+
+        return {
+            "message": "Inventory updated successfully",
+            "updated": [
+                {"store_id": store_id, "product_id": product_id, "new_stock_level": level.stock_level}
+                for (store_id, product_id), level in new_levels.items()
+            ],
+            "not_found": [
+                {"store_id": store_id, "product_id": product_id} for store_id, product_id in missing
+            ],
             "updated_by": CURRENT_USER,
             "updated_at": CURRENT_DATETIME
         }
@@ -78,12 +399,92 @@ async def update_inventory(update_data: InventoryUpdate, session: AsyncSession =
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/forecast/{store_id}")
-async def get_forecast(store_id: str, session: AsyncSession = Depends(get_session)):
+@router.post("/inventory/transfer")
+async def transfer_inventory(transfer: StockTransfer, session: AsyncSession = Depends(get_session)):
+    if transfer.from_store_id == transfer.to_store_id:
+        raise HTTPException(status_code=400, detail="A transfer needs two different stores")
+    try:
+        from_level, to_level = await transfer_stock(
+            session, transfer.from_store_id, transfer.to_store_id, transfer.product_id, transfer.quantity
+        )
+        if from_level is None or to_level is None:
+            await session.rollback()
+            missing = transfer.from_store_id if from_level is None else transfer.to_store_id
+            raise HTTPException(status_code=404, detail=f"Product not found in store {missing} inventory")
+
+        await session.commit()
+        response_cache.invalidate_stores([transfer.from_store_id, transfer.to_store_id])
+        broker.publish_stock(transfer.from_store_id, transfer.product_id, from_level.stock_level,
+                             from_level.min_threshold, -transfer.quantity)
+        broker.publish_stock(transfer.to_store_id, transfer.product_id, to_level.stock_level,
+                             to_level.min_threshold, transfer.quantity)
+
+        return {
+            "message": "Stock transferred successfully",
+            "product_id": transfer.product_id,
+            "from": {"store_id": transfer.from_store_id, "new_stock_level": from_level.stock_level},
+            "to": {"store_id": transfer.to_store_id, "new_stock_level": to_level.stock_level},
+            "transferred_by": CURRENT_USER,
+            "transferred_at": CURRENT_DATETIME
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        await session.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/sales/bulk")
+async def record_sales_bulk(bulk: SalesBulkRequest, session: AsyncSession = Depends(get_session)):
+    if len(bulk.sales) > MAX_BULK_SALES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_SALES} sales lines per request")
+    async def publish(sold):
+        # Only stores somebody is watching need their new levels read back
+        keys = broker.subscribed_keys(sold)
+        if keys:
+            levels = await read_stock_levels(session, keys)
+            broker.publish_levels(levels, {key: -quantity for key, quantity in sold.items()})
+
+    try:
+        summary = await ingest_sales(session, (
+            {"store_id": sale.store_id, "product_id": sale.product_id,
+             "quantity": sale.quantity, "sale_date": sale.sale_date}
+            for sale in bulk.sales
+        ), on_commit=publish, atomic=True)
+        return {
+            "message": "Sales recorded successfully",
+            **summary,
+            "recorded_by": CURRENT_USER,
+            "recorded_at": CURRENT_DATETIME
+        }
+    except Exception as e:
+        # One transaction: nothing was recorded, so the client can retry the whole request
+        await session.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        # The commit may have gone through even if publishing afterwards failed
+        response_cache.invalidate_stores(sale.store_id for sale in bulk.sales)
+
+
+@router.get("/forecast/{store_id}", response_model=ForecastResponse)
+async def get_forecast(
+    store_id: str,
+    days: int = 7,
+    method: str = DEFAULT_METHOD,
+    explain: bool = False,
+    refresh: bool = False,
+    session: AsyncSession = Depends(get_session)
+):
+    """Forecasts served from the forecast store.
+
+    Stored forecasts are served as they are, with how many are stale; the
+    forecast_refresh job recomputes series whose sales changed. Only series
+    with no usable stored forecast are computed here, unless ``refresh=true``
+    asks for the stale ones too.
+    """
+    _check_forecast_params(days, method)
     try:
-        query = select(StoreInventory, Product).join(
-            Product, StoreInventory.product_id == Product.id
-        ).where(StoreInventory.store_id == store_id)
+        query = _inventory_query(StoreInventory.store_id == store_id)
 
         result = await session.execute(query)
         items = result.all()
@@ -91,32 +492,31 @@ async def get_forecast(store_id: str, session: AsyncSession = Depends(get_sessio
         if not items:
             raise HTTPException(status_code=404, detail=f"No inventory found for store {store_id}")
 
-        forecast_data = []
-        for item in items:
-            forecast_data.append(ForecastItem(
-                product_id=item.Product.id,
-                product_name=item.Product.name,
-                current_stock=item.StoreInventory.stock_level,
-                predicted_demand=int(item.StoreInventory.stock_level * (1 + np.random.uniform(-0.2, 0.4))),
-                confidence=round(0.85 + np.random.random() * 0.1, 2)
-            ))
-
-        return {
+        build = await _forecast_builder(session, items, days, method, refresh)
+        forecast = [build(item) for item in items]
+        response = {
             "store_id": store_id,
-            "forecast": [item.dict() for item in forecast_data],
+            "forecast": forecast,
+            "method": method,
+            "horizon_days": days,
+            "freshness": build.freshness,
             "generated_by": CURRENT_USER,
             "generated_at": CURRENT_DATETIME
         }
+        if explain:
+            # The model is slow: explain in the background and let the client poll the job
+            job_id = await enqueue(
+                session, "forecast_explanation", {"store_id": store_id, "days": days, "method": method}
+            )
+            response["explanation_job"] = {"id": job_id, "status_url": f"/api/jobs/{job_id}"}
+        return Response(content=validated_dumps(response, ForecastResponse), media_type="application/json")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/inventory-alerts/{store_id}")
-async def get_inventory_alerts(store_id: str, session: AsyncSession = Depends(get_session)):
+async def _inventory_alerts(store_id: str, session: AsyncSession):
     try:
-        query = select(StoreInventory, Product).join(
-            Product, StoreInventory.product_id == Product.id
-        ).where(
+        query = _inventory_query(
             StoreInventory.store_id == store_id,
             StoreInventory.stock_level < StoreInventory.min_threshold
         )
@@ -124,21 +524,11 @@ async def get_inventory_alerts(store_id: str, session: AsyncSession = Depends(ge
         result = await session.execute(query)
         items = result.all()
 
-        alerts = []
-        for item in items:
-            alerts.append(AlertItem(
-                product_id=item.Product.id,
-                product_name=item.Product.name,
-                current_stock=item.StoreInventory.stock_level,
-                min_threshold=item.StoreInventory.min_threshold,
-                urgency="HIGH" if item.StoreInventory.stock_level < (
-                            item.StoreInventory.min_threshold / 2) else "MEDIUM",
-                suggested_order=item.StoreInventory.min_threshold - item.StoreInventory.stock_level + 10
-            ))
-
+        build = await _alert_builder(session, items)
         return {
             "store_id": store_id,
-            "alerts": [alert.dict() for alert in alerts],
+            "alerts": [build(item) for item in items],
+            "velocity_as_of": build.velocity_as_of.isoformat() if build.velocity_as_of else None,
             "generated_by": CURRENT_USER,
             "generated_at": CURRENT_DATETIME
         }
@@ -146,12 +536,16 @@ async def get_inventory_alerts(store_id: str, session: AsyncSession = Depends(ge
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/price-optimization/{store_id}")
-async def optimize_prices(store_id: str, session: AsyncSession = Depends(get_session)):
+@router.get("/inventory-alerts/{store_id}", response_model=AlertsResponse)
+async def get_inventory_alerts(store_id: str, request: Request, session: AsyncSession = Depends(get_session)):
+    return await _cached_response(
+        request, "inventory-alerts", store_id, lambda: _inventory_alerts(store_id, session), AlertsResponse
+    )
+
+
+async def _price_optimization(store_id: str, objective: str, max_change: float, session: AsyncSession):
     try:
-        query = select(StoreInventory, Product).join(
-            Product, StoreInventory.product_id == Product.id
-        ).where(StoreInventory.store_id == store_id)
+        query = _inventory_query(StoreInventory.store_id == store_id)
 
         result = await session.execute(query)
         items = result.all()
@@ -159,34 +553,11 @@ async def optimize_prices(store_id: str, session: AsyncSession = Depends(get_ses
         if not items:
             raise HTTPException(status_code=404, detail=f"No inventory found for store {store_id}")
 
-        optimized_prices = []
-        for item in items:
-            current_price = item.Product.price
-            stock_level = item.StoreInventory.stock_level
-
-            # Price optimization logic
-            if stock_level > 100:
-                suggested_price = current_price * 0.9  # 10% discount
-            elif stock_level < 20:
-                suggested_price = current_price * 1.1  # 10% markup
-            else:
-                suggested_price = current_price * (1 + np.random.uniform(-0.05, 0.05))
-
-            potential_profit = (suggested_price - current_price) * stock_level
-
-            optimized_prices.append({
-                "product_id": item.Product.id,
-                "product_name": item.Product.name,
-                "current_price": current_price,
-                "suggested_price": round(suggested_price, 2),
-                "stock_level": stock_level,
-                "potential_profit_increase": round(potential_profit, 2),
-                "expected_demand_change": f"{-10 if suggested_price > current_price else 10}%"
-            })
-
+        build = await _price_builder(session, items, objective, max_change)
         return {
             "store_id": store_id,
-            "optimized_prices": optimized_prices,
+            "objective": objective,
+            "optimized_prices": [build(item) for item in items],
             "generated_by": CURRENT_USER,
             "generated_at": CURRENT_DATETIME
         }
@@ -194,19 +565,44 @@ async def optimize_prices(store_id: str, session: AsyncSession = Depends(get_ses
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/price-optimization/{store_id}", response_model=PriceOptimizationResponse)
+async def optimize_prices(
+    store_id: str,
+    request: Request,
+    objective: str = DEFAULT_OBJECTIVE,
+    max_change: float = DEFAULT_MAX_CHANGE,
+    session: AsyncSession = Depends(get_session)
+):
+    _check_pricing_params(objective, max_change)
+    return await _cached_response(
+        request, "price-optimization", store_id,
+        lambda: _price_optimization(store_id, objective, max_change, session), PriceOptimizationResponse
+    )
+
+
+async def _publish_prices(session, applied):
+    """Invalidate cached reads and publish "price" events for committed price changes."""
+    affected = await affected_prices(session, applied)
+    response_cache.invalidate_stores(store_id for store_id, _ in affected)
+    for store_id, product_id in broker.subscribed_keys(affected):
+        broker.publish(store_id, "price", {
+            "store_id": store_id,
+            "product_id": product_id,
+            "price": affected[(store_id, product_id)],
+            "at": CURRENT_DATETIME
+        })
+    return {store_id for store_id, _ in affected}
+
+
 @router.post("/update-price")
 async def update_price(update_data: PriceUpdate, session: AsyncSession = Depends(get_session)):
     try:
-        query = select(Product).where(Product.id == update_data.product_id)
-        result = await session.execute(query)
-        product = result.scalar_one_or_none()
-
-        if not product:
+        # Prices are catalog-wide unless set per store through /prices/bulk
+        applied, missing, _ = await change_prices(session, [(None, update_data.product_id, update_data.new_price)])
+        if missing:
             raise HTTPException(status_code=404, detail="Product not found")
-
-        product.price = update_data.new_price
-        product.last_updated = get_datetime_obj()
         await session.commit()
+        await _publish_prices(session, applied)
 
         return {
             "message": "Price updated successfully",
@@ -218,4 +614,216 @@ async def update_price(update_data: PriceUpdate, session: AsyncSession = Depends
         }
     except Exception as e:
         await session.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/prices/bulk")
+async def bulk_update_prices(request: BulkPriceUpdate, session: AsyncSession = Depends(get_session)):
+    """Apply many catalog-wide or store-scoped price changes in one transaction.
+
+    Every applied change is recorded in ``price_history``. Changes naming an
+    unknown product, or a product the store does not stock, are reported as
+    missing and leave the rest of the batch applied.
+    """
+    if len(request.changes) > MAX_BULK_PRICE_CHANGES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {MAX_BULK_PRICE_CHANGES} price changes per request"
+        )
+    try:
+        applied, missing, unchanged = await change_prices(
+            session, [(change.store_id, change.product_id, change.new_price) for change in request.changes],
+            reason=request.reason
+        )
+        await session.commit()
+        stores = await _publish_prices(session, applied)
+
+        return {
+            "requested": len(request.changes),
+            "applied": len(applied),
+            "catalog_changes": sum(1 for change in applied if change.store_id is None),
+            "store_changes": sum(1 for change in applied if change.store_id is not None),
+            "unchanged": unchanged,
+            "missing": [{"store_id": store_id, "product_id": product_id} for store_id, product_id in missing],
+            "stores_affected": len(stores),
+            "updated_by": CURRENT_USER,
+            "updated_at": CURRENT_DATETIME
+        }
+    except Exception as e:
+        await session.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/inventory/batch")
+async def get_batch_inventory(batch: StoreBatchRequest, session: AsyncSession = Depends(get_session)):
+    store_ids = _batch_store_ids(batch)
+    try:
+        return await _stream_batch(
+            session, store_ids, (), "inventory", _inventory_item, "checked_by", "checked_at"
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/forecast/batch")
+async def get_batch_forecast(
+    batch: StoreBatchRequest,
+    days: int = 7,
+    method: str = DEFAULT_METHOD,
+    session: AsyncSession = Depends(get_session)
+):
+    store_ids = _batch_store_ids(batch)
+    _check_forecast_params(days, method)
+    try:
+        return await _stream_batch(
+            session, store_ids, (), "forecast", None, "generated_by", "generated_at",
+            prepare=lambda items: _forecast_builder(session, items, days, method)
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/inventory-alerts/batch")
+async def get_batch_inventory_alerts(batch: StoreBatchRequest, session: AsyncSession = Depends(get_session)):
+    store_ids = _batch_store_ids(batch)
+    try:
+        return await _stream_batch(
+            session, store_ids, (StoreInventory.stock_level < StoreInventory.min_threshold,),
+            "alerts", None, "generated_by", "generated_at",
+            prepare=lambda items: _alert_builder(session, items)
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/price-optimization/batch")
+async def optimize_batch_prices(
+    batch: StoreBatchRequest,
+    objective: str = DEFAULT_OBJECTIVE,
+    max_change: float = DEFAULT_MAX_CHANGE,
+    session: AsyncSession = Depends(get_session)
+):
+    store_ids = _batch_store_ids(batch)
+    _check_pricing_params(objective, max_change)
+    try:
+        return await _stream_batch(
+            session, store_ids, (), "optimized_prices", None, "generated_by", "generated_at",
+            prepare=lambda items: _price_builder(session, items, objective, max_change)
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/export/{dataset}")
+async def export_dataset(
+    dataset: str,
+    format: str = "ndjson",
+    store_id: str = None,
+    since: datetime = None,
+    until: datetime = None,
+    session: AsyncSession = Depends(get_session)
+):
+    """Stream inventory, sales, stock movements or forecasts for one store or the whole chain.
+
+    ``since``/``until`` filter sales by sale date, movements by when they
+    occurred and forecasts by forecast date.
+    """
+    if dataset not in DATASETS:
+        raise HTTPException(
+            status_code=404, detail=f"Unknown export '{dataset}', expected one of {', '.join(DATASETS)}"
+        )
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format '{format}', expected one of {', '.join(FORMATS)}")
+    if format == "arrow" and not arrow_available():
+        raise HTTPException(status_code=400, detail="Arrow export needs pyarrow installed on the server")
+
+    query = export_query(dataset, store_id, since, until)
+    filename = f"{dataset}-{store_id or 'all'}.{'arrows' if format == 'arrow' else format}"
+    return StreamingResponse(
+        stream_export(session.bind, query, format), media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.post("/jobs", status_code=202)
+async def create_job(request: JobRequest, session: AsyncSession = Depends(get_session)):
+    if request.name not in JOBS:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown job '{request.name}', expected one of {', '.join(sorted(JOBS))}"
+        )
+    try:
+        job_id = await enqueue(session, request.name, request.params, request.run_at)
+        row = await session.get(Job, job_id)
+        return job_payload(row)
+    except Exception as e:
+        await session.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/jobs")
+async def list_jobs(
+    status: str = None,
+    name: str = None,
+    limit: int = 50,
+    session: AsyncSession = Depends(get_session)
+):
+    if status is not None and status not in STATUSES:
+        raise HTTPException(status_code=400, detail=f"Unknown status '{status}', expected one of {', '.join(STATUSES)}")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    try:
+        query = select(Job).order_by(Job.id.desc()).limit(limit)
+        if status is not None:
+            query = query.where(Job.status == status)
+        if name is not None:
+            query = query.where(Job.name == name)
+        rows = (await session.execute(query)).scalars().all()
+        return {"jobs": [job_payload(row) for row in rows]}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/jobs/schedules")
+async def get_job_schedules():
+    return {"running": bool(scheduler.tasks), "schedules": scheduler.describe()}
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: int, session: AsyncSession = Depends(get_session)):
+    row = await session.get(Job, job_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job_payload(row)
+
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    return response_cache.stats()
+
+@router.get("/stream/{store_id}")
+async def stream_store_events(store_id: str):
+    """Server-sent events with stock, price and alert changes for one store.
+
+    Clients load the snapshot once from the read endpoints and then apply these
+    deltas; a ``resync`` event means events were dropped and the snapshot must
+    be fetched again.
+    """
+    # Subscribed before the response starts, so a full broker is a 503 rather than an empty
+    # stream that EventSource would keep reconnecting to
+    subscription = broker.subscribe(store_id)
+    if subscription is None:
+        raise HTTPException(status_code=503, detail="Too many stream subscribers, try again later")
+
+    async def events():
+        try:
+            yield b"retry: 3000\n\n" + encode_event("ready", {"store_id": store_id})
+            while True:
+                message = await subscription.next(STREAM_HEARTBEAT_SECONDS)
+                yield b": keep-alive\n\n" if message is None else message
+        finally:
+            broker.unsubscribe(subscription)
+
+    # The background task also unsubscribes if the body is never iterated; unsubscribing twice is harmless
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    }, background=BackgroundTask(broker.unsubscribe, subscription))
@@ -5,4 +5,47 @@ CURRENT_DATETIME = "2025-04-10 15:31:06"
 DATABASE_URL = "sqlite+aiosqlite:///retail_inventory.db"
 
 def get_datetime_obj():
-    return datetime.strptime(CURRENT_DATETIME, "%Y-%m-%d %H:%M:%S")
\ No newline at end of file
+    return datetime.strptime(CURRENT_DATETIME, "%Y-%m-%d %H:%M:%S")
+
+# Upper bound on store_ids per batch request; keeps the IN (...) list under SQLite's variable limit
+MAX_BATCH_STORES = 500
+# Largest page of GET /api/inventory/{store_id}?limit=
+MAX_PAGE_SIZE = 5000
+MAX_FORECAST_DAYS = 90
+# Horizon of the stored forecasts; longer requests are computed without being stored
+FORECAST_STORE_DAYS = 14
+# Largest relative price move a price-optimization request may allow
+MAX_PRICE_CHANGE = 0.5
+# Trailing window of daily_sales used for sales velocity on alerts
+ALERT_SALES_WINDOW_DAYS = 28
+# Sales ingestion: lines per request and lines written per transaction
+MAX_BULK_SALES = 100000
+SALES_INGEST_CHUNK_SIZE = 20000
+MAX_BATCH_ADJUSTMENTS = 5000
+MAX_BULK_PRICE_CHANGES = 50000
+# Response cache for the per-store read endpoints
+CACHE_MAX_ENTRIES = 2048
+CACHE_TTL_SECONDS = 60
+# Live event stream: per-client queue bound, subscriber cap and keep-alive interval
+STREAM_QUEUE_SIZE = 256
+STREAM_MAX_SUBSCRIBERS = 10000
+STREAM_HEARTBEAT_SECONDS = 15
+# Background jobs (app/services/jobs.py): retries, backoff before retry n is
+# JOB_RETRY_BACKOFF_SECONDS * 2**(n-1), and cron schedules of the recurring jobs
+JOB_MAX_ATTEMPTS = 3
+JOB_RETRY_BACKOFF_SECONDS = 30
+# A running job's process refreshes its heartbeat this often; another process
+# requeues the job once the heartbeat is older than the timeout
+JOB_HEARTBEAT_SECONDS = 15
+JOB_HEARTBEAT_TIMEOUT_SECONDS = 120
+JOB_SCHEDULES = {
+    "rollup_compaction": "30 1 * * *",
+    "forecast_refresh": "15 2 * * *",
+    "alert_materialization": "*/10 * * * *",
+    "stock_snapshot": "*/15 * * * *",
+}
+# Alerts read materialized sales_velocity while its last refresh is at most this old
+VELOCITY_MAX_AGE_SECONDS = 1800
+# A store is snapshotted once it has this many stock movements since its last
+# snapshot, which bounds the ledger replay behind ?as_of= reads
+STOCK_SNAPSHOT_MIN_MOVEMENTS = 5000
@@ -1,17 +1,77 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import (
+    create_engine, event, Column, Integer, String, Float, Date, DateTime, Text, ForeignKey, Index
+)
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 from datetime import datetime
-from app.config.constants import CURRENT_USER, get_datetime_obj, DATABASE_URL
+from app.config.constants import CURRENT_USER, get_datetime_obj
+from app.config.settings import get_settings
 import logging
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+def sqlite_pragmas(settings):
+    """PRAGMA statements for a new SQLite connection, skipping unset options."""
+    pragmas = {
+        "journal_mode": settings.sqlite_journal_mode,
+        "synchronous": settings.sqlite_synchronous,
+        "busy_timeout": settings.sqlite_busy_timeout_ms,
+        # Negative cache_size is in KiB rather than pages
+        "cache_size": -settings.sqlite_cache_size_kib if settings.sqlite_cache_size_kib else 0,
+        "mmap_size": settings.sqlite_mmap_size
+    }
+    return [f"PRAGMA {name}={value}" for name, value in pragmas.items() if value]
+
+
+def create_engine_from_settings(settings=None, **overrides):
+    """Build the async engine from settings; ``overrides`` replace individual settings.
+
+    SQLite files get a queue pool (SQLAlchemy's default for aiosqlite is NullPool,
+    which opens a new connection per session) and the configured PRAGMAs on every
+    new connection. Other backends, e.g. postgresql+asyncpg, get the pool options.
+    """
+    settings = (settings or get_settings()).copy(update=overrides)
+    url = make_url(settings.database_url)
+    options = {"echo": settings.db_echo}
+
+    is_sqlite = url.get_backend_name() == "sqlite"
+    in_memory = is_sqlite and url.database in (None, "", ":memory:")
+    if not in_memory:
+        if settings.db_pool_size > 0:
+            options.update(
+                poolclass=AsyncAdaptedQueuePool,
+                pool_size=settings.db_pool_size,
+                max_overflow=settings.db_max_overflow,
+                pool_timeout=settings.db_pool_timeout,
+                pool_recycle=settings.db_pool_recycle,
+                pool_pre_ping=settings.db_pool_pre_ping
+            )
+        else:
+            options["poolclass"] = NullPool
+
+    new_engine = create_async_engine(url, **options)
+
+    if is_sqlite:
+        pragmas = sqlite_pragmas(settings)
+
+        @event.listens_for(new_engine.sync_engine, "connect")
+        def apply_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma in pragmas:
+                cursor.execute(pragma)
+            cursor.close()
+
+    return new_engine
+
+
 # Create async engine
-engine = create_async_engine(DATABASE_URL, echo=True)
+engine = create_engine_from_settings()
 async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 Base = declarative_base()
 
@@ -22,6 +82,8 @@ class Product(Base):
     name = Column(String)
     category = Column(String)
     price = Column(Float)
+    # Optional; price optimization assumes a share of the price when it is missing
+    unit_cost = Column(Float, nullable=True)
     supplier_id = Column(String)
     created_by = Column(String, default=CURRENT_USER)
     created_at = Column(DateTime, default=get_datetime_obj())
@@ -35,9 +97,15 @@ class StoreInventory(Base):
     product_id = Column(String, ForeignKey("products.id"))
     stock_level = Column(Integer)
     min_threshold = Column(Integer)
+    # Store-specific price; NULL means the catalog price (Product.price) applies
+    store_price = Column(Float, nullable=True)
     last_updated_by = Column(String, default=CURRENT_USER)
     last_updated_at = Column(DateTime, default=get_datetime_obj())
 
+    __table_args__ = (
+        Index("ix_store_inventory_store_product", "store_id", "product_id", unique=True),
+    )
+
 class SalesHistory(Base):
     __tablename__ = "sales_history"
 
@@ -48,11 +116,199 @@ class SalesHistory(Base):
     sale_date = Column(DateTime, default=get_datetime_obj())
     recorded_by = Column(String, default=CURRENT_USER)
 
+    __table_args__ = (
+        Index("ix_sales_history_store_product_date", "store_id", "product_id", "sale_date"),
+    )
+
+class PriceHistory(Base):
+    """Append-only log of price changes, written by ``app.services.prices``.
+
+    ``store_id`` is NULL for catalog-wide changes to ``Product.price`` and set
+    for store-scoped changes to ``StoreInventory.store_price``.
+    """
+    __tablename__ = "price_history"
+
+    id = Column(Integer, primary_key=True)
+    product_id = Column(String, ForeignKey("products.id"))
+    store_id = Column(String, nullable=True)
+    old_price = Column(Float)
+    new_price = Column(Float)
+    reason = Column(String, nullable=True)
+    changed_by = Column(String, default=CURRENT_USER)
+    changed_at = Column(DateTime, default=get_datetime_obj())
+
+    __table_args__ = (
+        Index("ix_price_history_product_changed", "product_id", "changed_at"),
+    )
+
+class StockMovement(Base):
+    """Append-only ledger of stock changes, written by ``app.services.stock_ledger``.
+
+    ``quantity`` is the signed change to ``StoreInventory.stock_level``. A
+    transfer is two rows, out of one store and into the other, each naming the
+    other store in ``counterparty_store_id``. ``occurred_at`` is the wall-clock
+    time the row was recorded. Rows are never updated or deleted.
+    """
+    __tablename__ = "stock_movements"
+
+    id = Column(Integer, primary_key=True)
+    store_id = Column(String, nullable=False)
+    product_id = Column(String, ForeignKey("products.id"), nullable=False)
+    kind = Column(String, nullable=False)
+    quantity = Column(Integer, nullable=False)
+    counterparty_store_id = Column(String, nullable=True)
+    recorded_by = Column(String, default=CURRENT_USER)
+    occurred_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_stock_movements_store_id", "store_id", "id"),
+        Index("ix_stock_movements_store_product_occurred", "store_id", "product_id", "occurred_at"),
+    )
+
+class StockSnapshot(Base):
+    """A store's stock levels as of ``taken_at``, i.e. after its movements up to ``last_movement_id``."""
+    __tablename__ = "stock_snapshots"
+
+    id = Column(Integer, primary_key=True)
+    store_id = Column(String, nullable=False)
+    taken_at = Column(DateTime, nullable=False)
+    last_movement_id = Column(Integer, nullable=False, default=0)
+    items = Column(Integer, nullable=False, default=0)
+    created_by = Column(String, default=CURRENT_USER)
+
+    __table_args__ = (
+        Index("ix_stock_snapshots_store_taken", "store_id", "taken_at"),
+    )
+
+class StockSnapshotItem(Base):
+    __tablename__ = "stock_snapshot_items"
+
+    snapshot_id = Column(Integer, ForeignKey("stock_snapshots.id"), primary_key=True)
+    product_id = Column(String, ForeignKey("products.id"), primary_key=True)
+    stock_level = Column(Integer, nullable=False)
+
+class DailySales(Base):
+    """Per-day sales rollup of ``sales_history``, maintained by ``app.services.rollups``."""
+    __tablename__ = "daily_sales"
+
+    store_id = Column(String, primary_key=True)
+    product_id = Column(String, ForeignKey("products.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    qty = Column(Integer, nullable=False, default=0)
+
+class DemandForecast(Base):
+    """Materialized forecasts, one row per series and day, maintained by ``app.services.forecast_store``."""
+    __tablename__ = "demand_forecast"
+
+    id = Column(Integer, primary_key=True)
+    store_id = Column(String)
+    product_id = Column(String, ForeignKey("products.id"))
+    forecast_date = Column(DateTime)
+    predicted_demand = Column(Integer)
+    confidence = Column(Float)
+    generation = Column(Integer)
+    created_by = Column(String, default=CURRENT_USER)
+    created_at = Column(DateTime, default=get_datetime_obj())
+
+    __table_args__ = (
+        Index("ix_demand_forecast_store_product_date", "store_id", "product_id", "forecast_date", unique=True),
+    )
+
+class ForecastGeneration(Base):
+    """One forecast refresh: every series it recomputed carries its ID."""
+    __tablename__ = "forecast_generations"
+
+    id = Column(Integer, primary_key=True)
+    method = Column(String, nullable=False)
+    horizon_days = Column(Integer, nullable=False)
+    history_end = Column(Date, nullable=False)
+    series = Column(Integer, nullable=False, default=0)
+    created_by = Column(String, default=CURRENT_USER)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+class ForecastSeries(Base):
+    """Per-series bookkeeping of the forecast store.
+
+    ``sales_version`` is bumped whenever the series' daily sales change;
+    ``forecast_sales_version`` is the value it had when the stored forecast was
+    computed, so the forecast is stale while the two differ.
+    """
+    __tablename__ = "forecast_series"
+
+    store_id = Column(String, primary_key=True)
+    product_id = Column(String, ForeignKey("products.id"), primary_key=True)
+    sales_version = Column(Integer, nullable=False, default=0)
+    forecast_sales_version = Column(Integer)
+    generation = Column(Integer)
+    method = Column(String)
+    horizon_days = Column(Integer)
+    history_end = Column(Date)
+    computed_at = Column(DateTime)
+
+class SalesVelocity(Base):
+    """Average daily sales per series over a trailing window, materialized by a scheduled job."""
+    __tablename__ = "sales_velocity"
+
+    store_id = Column(String, primary_key=True)
+    product_id = Column(String, ForeignKey("products.id"), primary_key=True)
+    avg_daily_sales = Column(Float, nullable=False)
+    window_days = Column(Integer, nullable=False)
+    computed_at = Column(DateTime)
+
+class Job(Base):
+    """Persisted state of a background job run by ``app.services.jobs``.
+
+    ``params`` and ``result`` hold JSON. Timestamps are wall-clock times, as
+    they schedule and measure real work. A running job names the scheduler
+    process that claimed it in ``worker_id``; that process refreshes
+    ``heartbeat_at`` while it runs. Cron runs carry their slot in
+    ``scheduled_for``, unique per name, so each slot is queued once however
+    many processes schedule it.
+    """
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+    params = Column(Text)
+    status = Column(String, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    result = Column(Text)
+    error = Column(Text)
+    run_at = Column(DateTime, nullable=False)
+    scheduled_for = Column(DateTime)
+    worker_id = Column(String)
+    heartbeat_at = Column(DateTime)
+    created_by = Column(String, default=CURRENT_USER)
+    created_at = Column(DateTime)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+    __table_args__ = (
+        Index("ix_jobs_status_run_at", "status", "run_at"),
+        Index("ix_jobs_name_status", "name", "status", "finished_at"),
+        Index("ix_jobs_name_scheduled_for", "name", "scheduled_for", unique=True),
+    )
+
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+
+    version = Column(Integer, primary_key=True)
+    description = Column(String)
+    applied_by = Column(String, default=CURRENT_USER)
+    applied_at = Column(DateTime, default=get_datetime_obj())
+
 async def init_db():
+    # Imported here because migrations needs the models defined above
+    from app.models.migrations import upgrade
+
     try:
         logger.info(f"Initializing database as {CURRENT_USER}")
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+            version = await conn.run_sync(upgrade)
+        logger.info(f"Database schema at version {version}")
         logger.info("Database initialized successfully!")
     except Exception as e:
         logger.error(f"Error initializing database: {str(e)}")
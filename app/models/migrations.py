@@ -0,0 +1,170 @@
+"""Versioned, in-place schema migrations.
+
+``Base.metadata.create_all`` only creates tables that are missing, so changes to
+tables that already exist in a deployed ``retail_inventory.db`` (indexes, new
+columns, backfills) are added here as numbered steps. ``upgrade`` applies every
+step newer than the highest version recorded in ``schema_version`` and is safe
+to run on every startup.
+
+Usage: python -m app.models.migrations
+"""
+import asyncio
+import logging
+
+from sqlalchemy import select, delete, func, inspect, text
+
+from app.models.database import (
+    engine, Base, SchemaVersion, Product, StoreInventory, SalesHistory, DailySales, DemandForecast,
+    PriceHistory, SalesVelocity, Job, ForecastGeneration, ForecastSeries, StockMovement, StockSnapshot,
+    StockSnapshotItem
+)
+from app.config.constants import CURRENT_USER, get_datetime_obj
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS = []
+
+
+def migration(version: int, description: str):
+    def register(step):
+        MIGRATIONS.append((version, description, step))
+        return step
+    return register
+
+
+def _create_index(conn, model, name):
+    index = next(index for index in model.__table__.indexes if index.name == name)
+    index.create(conn, checkfirst=True)
+
+
+@migration(1, "Composite indexes on store_inventory, sales_history and demand_forecast")
+def _hot_table_indexes(conn):
+    # The unique index cannot be built while duplicate (store, product) rows exist. Which row's
+    # stock is right is a business decision, so stop and name them instead of dropping any.
+    duplicates = conn.execute(
+        select(StoreInventory.store_id, StoreInventory.product_id, func.count(), func.sum(StoreInventory.stock_level))
+        .group_by(StoreInventory.store_id, StoreInventory.product_id).having(func.count() > 1)
+        .order_by(StoreInventory.store_id, StoreInventory.product_id)
+    ).all()
+    if duplicates:
+        listing = "\n".join(
+            f"  store_id={store_id} product_id={product_id}: {rows} rows, stock_level total {stock}"
+            for store_id, product_id, rows, stock in duplicates[:50]
+        )
+        more = f"\n  ... and {len(duplicates) - 50} more" if len(duplicates) > 50 else ""
+        raise RuntimeError(
+            f"store_inventory has {len(duplicates)} (store_id, product_id) pairs with several rows; merge them "
+            f"into one row each and rerun the migration:\n{listing}{more}"
+        )
+
+    _create_index(conn, StoreInventory, "ix_store_inventory_store_product")
+    _create_index(conn, SalesHistory, "ix_sales_history_store_product_date")
+    # ix_demand_forecast_store_product_date is unique now and built by migration 6, after deduplication
+
+
+@migration(2, "daily_sales rollup backfilled from sales_history")
+def _daily_sales_rollup(conn):
+    from app.services.rollups import rebuild_daily_sales
+
+    DailySales.__table__.create(conn, checkfirst=True)
+    # forecast_series only exists from migration 6, and no forecast predates the rollup anyway
+    rows = rebuild_daily_sales(conn, mark_changed=False)
+    logger.info(f"Backfilled {rows} daily_sales rows")
+
+
+@migration(3, "products.unit_cost for margin-based price optimization")
+def _product_unit_cost(conn):
+    columns = {column["name"] for column in inspect(conn).get_columns(Product.__tablename__)}
+    if "unit_cost" not in columns:
+        conn.execute(text(f"ALTER TABLE {Product.__tablename__} ADD COLUMN unit_cost FLOAT"))
+
+
+@migration(4, "price_history table and store_inventory.store_price")
+def _price_history(conn):
+    PriceHistory.__table__.create(conn, checkfirst=True)
+    columns = {column["name"] for column in inspect(conn).get_columns(StoreInventory.__tablename__)}
+    if "store_price" not in columns:
+        conn.execute(text(f"ALTER TABLE {StoreInventory.__tablename__} ADD COLUMN store_price FLOAT"))
+
+
+@migration(5, "jobs and sales_velocity tables for the background scheduler")
+def _job_tables(conn):
+    Job.__table__.create(conn, checkfirst=True)
+    SalesVelocity.__table__.create(conn, checkfirst=True)
+
+
+@migration(6, "Materialized forecast store: unique series-day forecasts, generations and series versions")
+def _forecast_store(conn):
+    columns = {column["name"] for column in inspect(conn).get_columns(DemandForecast.__tablename__)}
+    if "generation" not in columns:
+        conn.execute(text(f"ALTER TABLE {DemandForecast.__tablename__} ADD COLUMN generation INTEGER"))
+
+    # Forecasts used to be appended; keep the latest row per series and day so the index can be unique
+    latest = select(func.max(DemandForecast.id)).group_by(
+        DemandForecast.store_id, DemandForecast.product_id, DemandForecast.forecast_date
+    )
+    removed = conn.execute(delete(DemandForecast).where(DemandForecast.id.not_in(latest))).rowcount
+    if removed:
+        logger.warning(f"Removed {removed} duplicate demand_forecast rows")
+    conn.execute(text("DROP INDEX IF EXISTS ix_demand_forecast_store_product_date"))
+    _create_index(conn, DemandForecast, "ix_demand_forecast_store_product_date")
+
+    ForecastGeneration.__table__.create(conn, checkfirst=True)
+    ForecastSeries.__table__.create(conn, checkfirst=True)
+
+
+@migration(7, "stock_movements ledger and per-store stock snapshots, opened with a snapshot of current stock")
+def _stock_ledger(conn):
+    from app.services.stock_ledger import opening_snapshots
+
+    StockMovement.__table__.create(conn, checkfirst=True)
+    StockSnapshot.__table__.create(conn, checkfirst=True)
+    StockSnapshotItem.__table__.create(conn, checkfirst=True)
+    # Stock before the ledger existed is unknown; point-in-time reads start from here
+    stores = opening_snapshots(conn)
+    logger.info(f"Took opening stock snapshots of {stores} stores")
+
+
+@migration(8, "jobs.worker_id, heartbeat_at and scheduled_for for schedulers in several processes")
+def _job_leases(conn):
+    columns = {column["name"] for column in inspect(conn).get_columns(Job.__tablename__)}
+    for name, type_ in (("scheduled_for", "TIMESTAMP"), ("worker_id", "VARCHAR"), ("heartbeat_at", "TIMESTAMP")):
+        if name not in columns:
+            conn.execute(text(f"ALTER TABLE {Job.__tablename__} ADD COLUMN {name} {type_}"))
+    # Existing rows have no scheduled_for, and NULLs never conflict in a unique index
+    _create_index(conn, Job, "ix_jobs_name_scheduled_for")
+
+
+def current_version(conn) -> int:
+    SchemaVersion.__table__.create(conn, checkfirst=True)
+    return conn.execute(select(func.max(SchemaVersion.version))).scalar() or 0
+
+
+def upgrade(conn, target: int = None) -> int:
+    """Apply pending migrations on a sync connection; returns the resulting version."""
+    version = current_version(conn)
+    for number, description, step in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if number <= version or (target is not None and number > target):
+            continue
+        logger.info(f"Applying migration {number}: {description}")
+        step(conn)
+        conn.execute(SchemaVersion.__table__.insert().values(
+            version=number,
+            description=description,
+            applied_by=CURRENT_USER,
+            applied_at=get_datetime_obj()
+        ))
+        version = number
+    return version
+
+
+async def migrate():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        version = await conn.run_sync(upgrade)
+    await engine.dispose()
+    print(f"Database schema at version {version}")
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
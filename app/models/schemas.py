@@ -1,25 +1,62 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict, Any
 from datetime import datetime
 
 class InventoryUpdate(BaseModel):
     store_id: str
     product_id: str
     quantity: int
+    # Stock ledger movement kind: "adjustment" or "receipt"
+    kind: str = "adjustment"
+
+class InventoryBatchUpdate(BaseModel):
+    updates: List[InventoryUpdate]
+
+class StockTransfer(BaseModel):
+    from_store_id: str
+    to_store_id: str
+    product_id: str
+    quantity: int = Field(..., gt=0)
 
 class PriceUpdate(BaseModel):
     store_id: str
     product_id: str
     new_price: float
 
-class InventoryResponse(BaseModel):
+class PriceChange(BaseModel):
     product_id: str
-    name: str
-    category: str
-    current_stock: int
-    min_threshold: int
-    price: float
-    last_updated: Optional[str]
+    new_price: float = Field(..., gt=0)
+    # Omit for a catalog-wide change
+    store_id: Optional[str] = None
+
+class BulkPriceUpdate(BaseModel):
+    changes: List[PriceChange]
+    reason: Optional[str] = None
+
+# Read-route payloads. Those routes encode their responses themselves (see
+# app/services/serialization.py), checking them against these models first;
+# the models also document them in the OpenAPI schema.
+
+class InventoryResponse(BaseModel):
+    # Any subset of the fields, as selected with ?fields=
+    product_id: Optional[str] = None
+    name: Optional[str] = None
+    category: Optional[str] = None
+    current_stock: Optional[int] = None
+    min_threshold: Optional[int] = None
+    price: Optional[float] = None
+    last_updated: Optional[str] = None
+
+class StoreInventoryResponse(BaseModel):
+    store_id: str
+    inventory: List[InventoryResponse]
+    # Only with ?limit=; None on the last page
+    next_cursor: Optional[str] = None
+    # Only with ?as_of=: current_stock is the stock then, rebuilt from this snapshot and movements
+    as_of: Optional[str] = None
+    snapshot: Optional[Dict[str, Any]] = None
+    checked_by: str
+    checked_at: str
 
 class ForecastItem(BaseModel):
     product_id: str
@@ -27,6 +64,17 @@ class ForecastItem(BaseModel):
     current_stock: int
     predicted_demand: int
     confidence: float
+    daily_demand: List[int] = []
+
+class ForecastResponse(BaseModel):
+    store_id: str
+    forecast: List[ForecastItem]
+    method: str
+    horizon_days: int
+    freshness: Dict[str, Any]
+    explanation_job: Optional[Dict[str, Any]] = None
+    generated_by: str
+    generated_at: str
 
 class AlertItem(BaseModel):
     product_id: str
@@ -34,4 +82,49 @@ class AlertItem(BaseModel):
     current_stock: int
     min_threshold: int
     urgency: str
-    suggested_order: int
\ No newline at end of file
+    suggested_order: int
+    avg_daily_sales: Optional[float] = None
+    days_of_cover: Optional[float] = None
+
+class AlertsResponse(BaseModel):
+    store_id: str
+    alerts: List[AlertItem]
+    velocity_as_of: Optional[str] = None
+    generated_by: str
+    generated_at: str
+
+class PriceSuggestion(BaseModel):
+    product_id: str
+    product_name: str
+    current_price: float
+    suggested_price: float
+    stock_level: int
+    elasticity: float
+    expected_daily_demand: float
+    potential_profit_increase: float
+    expected_demand_change: Optional[str] = None
+
+class PriceOptimizationResponse(BaseModel):
+    store_id: str
+    objective: str
+    optimized_prices: List[PriceSuggestion]
+    generated_by: str
+    generated_at: str
+
+class StoreBatchRequest(BaseModel):
+    store_ids: List[str]
+
+class SaleLine(BaseModel):
+    store_id: str
+    product_id: str
+    quantity: int = Field(..., gt=0)
+    sale_date: Optional[datetime] = None
+
+class SalesBulkRequest(BaseModel):
+    sales: List[SaleLine]
+
+class JobRequest(BaseModel):
+    name: str
+    params: Dict[str, Any] = {}
+    # Omit to run as soon as a worker is free
+    run_at: Optional[datetime] = None
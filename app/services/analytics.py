@@ -0,0 +1,190 @@
+"""Process-pool execution of CPU-bound analytics, off the event loop.
+
+The NumPy engines (``forecast_engine``, ``price_engine``) would otherwise run
+inside the request's coroutine and hold the event loop, and with it every other
+request, for as long as they compute. ``analytics.run(fn, *args, **kwargs)``
+runs them in a pool of worker processes instead:
+
+- ndarray arguments of at least ``analytics_shm_min_bytes`` are copied once
+  into a shared memory segment and mapped back as arrays in the worker, so no
+  row lists are pickled; results come back pickled with protocol 5, where an
+  array is a single raw buffer
+- calls whose arrays total less than ``analytics_offload_min_bytes`` run inline,
+  as the round trip would cost more than the work
+- a call that outlives ``analytics_timeout_seconds`` raises
+  ``AnalyticsTimeout`` and the pool is replaced, killing the runaway worker;
+  other calls caught by the replacement are retried once on the new pool
+- a caller cancelled before its call started (e.g. the client went away)
+  drops it from the queue
+
+Workers are spawned, not forked, since the app process has running threads,
+and run at a lower CPU priority (``analytics_worker_nice``) so request handling
+keeps precedence on machines with few cores. ``fn`` must be a module-level
+function importable by the worker.
+"""
+import asyncio
+import logging
+import os
+import pickle
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context, shared_memory
+
+from app.services.lazy_imports import numpy as np
+
+from app.config.settings import get_settings
+from app.services.metrics import analytics_latency, add_request_time
+
+logger = logging.getLogger(__name__)
+
+
+class AnalyticsTimeout(TimeoutError):
+    pass
+
+
+class _Shared:
+    """Stands in for an ndarray placed in a shared memory segment."""
+    __slots__ = ("name", "shape", "dtype")
+
+    def __init__(self, name, shape, dtype):
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+
+    def __getstate__(self):
+        return self.name, self.shape, self.dtype
+
+    def __setstate__(self, state):
+        self.name, self.shape, self.dtype = state
+
+
+def _init_worker(nice: int):
+    if nice:
+        os.nice(nice)
+
+
+def _noop():
+    return os.getpid()
+
+
+def _call(fn, args, kwargs):
+    """Worker side: map shared arguments, run ``fn`` and return its pickled result."""
+    segments = []
+
+    def attach(value):
+        if not isinstance(value, _Shared):
+            return value
+        segment = shared_memory.SharedMemory(name=value.name)
+        segments.append(segment)
+        return np.ndarray(value.shape, dtype=value.dtype, buffer=segment.buf)
+
+    try:
+        args = [attach(value) for value in args]
+        kwargs = {key: attach(value) for key, value in kwargs.items()}
+        # Pickle here: results may be views of the shared inputs, which are unmapped below
+        return pickle.dumps(fn(*args, **kwargs), protocol=5)
+    finally:
+        del args, kwargs
+        for segment in segments:
+            segment.close()
+
+
+class AnalyticsExecutor:
+    def __init__(self, workers: int = None, timeout: float = None, offload_min_bytes: int = None,
+                 shm_min_bytes: int = None, nice: int = None):
+        settings = get_settings()
+        self.workers = settings.analytics_workers if workers is None else workers
+        self.timeout = timeout or settings.analytics_timeout_seconds
+        self.offload_min_bytes = (settings.analytics_offload_min_bytes if offload_min_bytes is None
+                                  else offload_min_bytes)
+        self.shm_min_bytes = settings.analytics_shm_min_bytes if shm_min_bytes is None else shm_min_bytes
+        self.nice = settings.analytics_worker_nice if nice is None else nice
+        self.pool = None
+        self.stats = Counter()
+
+    def _pool(self):
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(
+                self.workers, mp_context=get_context("spawn"), initializer=_init_worker, initargs=(self.nice,)
+            )
+        return self.pool
+
+    async def start(self):
+        """Spawn the workers now rather than on the first call that needs them."""
+        if self.workers > 0:
+            loop = asyncio.get_running_loop()
+            pool = self._pool()
+            await asyncio.gather(*(loop.run_in_executor(pool, _noop) for _ in range(self.workers)))
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+    def _recycle(self, pool):
+        """Replace ``pool``, terminating its workers and whatever they are running."""
+        if self.pool is pool:
+            self.pool = None
+        # ProcessPoolExecutor cannot cancel a running call; its processes are only reachable privately
+        for process in list((getattr(pool, "_processes", None) or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _share(self, value, segments):
+        if not isinstance(value, np.ndarray) or value.nbytes < self.shm_min_bytes:
+            return value
+        segment = shared_memory.SharedMemory(create=True, size=value.nbytes)
+        segments.append(segment)
+        np.ndarray(value.shape, dtype=value.dtype, buffer=segment.buf)[...] = value
+        return _Shared(segment.name, value.shape, value.dtype.str)
+
+    async def run(self, fn, *args, timeout: float = None, **kwargs):
+        """``fn(*args, **kwargs)`` in a worker process, or inline for small inputs or with no workers."""
+        size = sum(value.nbytes for value in (*args, *kwargs.values()) if isinstance(value, np.ndarray))
+        inline = self.workers <= 0 or size < self.offload_min_bytes
+        started = time.perf_counter()
+        try:
+            if inline:
+                self.stats["inline"] += 1
+                return fn(*args, **kwargs)
+            return await self._offload(fn, args, kwargs, timeout)
+        finally:
+            elapsed = time.perf_counter() - started
+            analytics_latency.observe(elapsed, fn.__name__, "inline" if inline else "pool")
+            add_request_time("analytics", elapsed)
+
+    async def _offload(self, fn, args, kwargs, timeout: float = None):
+        loop = asyncio.get_running_loop()
+        timeout = timeout or self.timeout
+        segments = []
+        try:
+            shared_args = [self._share(value, segments) for value in args]
+            shared_kwargs = {key: self._share(value, segments) for key, value in kwargs.items()}
+            for attempt in range(2):
+                pool = self._pool()
+                self.stats["offloaded"] += 1
+                try:
+                    payload = await asyncio.wait_for(
+                        loop.run_in_executor(pool, _call, fn, shared_args, shared_kwargs), timeout
+                    )
+                except asyncio.TimeoutError:
+                    self.stats["timeouts"] += 1
+                    self._recycle(pool)
+                    raise AnalyticsTimeout(f"{fn.__name__} did not finish within {timeout:g}s")
+                except BrokenProcessPool:
+                    # Another call's timeout replaced the pool under this one
+                    self._recycle(pool)
+                    if attempt:
+                        raise
+                    self.stats["retries"] += 1
+                    continue
+                return pickle.loads(payload)
+        finally:
+            for segment in segments:
+                segment.close()
+                segment.unlink()
+
+
+analytics = AnalyticsExecutor()
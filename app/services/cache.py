@@ -0,0 +1,98 @@
+"""In-process response cache for the read-heavy per-store endpoints.
+
+Entries are keyed by (endpoint, store_id, query string) and hold the encoded
+JSON body and its ETag. The cache is bounded (LRU eviction) and entries expire
+after a TTL, but correctness comes from the write routes calling
+``invalidate_stores`` after they commit. A per-store generation counter keeps a
+read that raced with a write from caching its now-stale result.
+"""
+import hashlib
+import time
+from collections import OrderedDict
+
+from app.config.constants import CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS
+
+
+class CacheEntry:
+    __slots__ = ("body", "etag", "expires_at")
+
+    def __init__(self, body: bytes, ttl: float):
+        self.body = body
+        self.etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        self.expires_at = time.monotonic() + ttl
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.keys_by_store = {}
+        self.generations = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def generation(self, store_id: str) -> int:
+        return self.generations.get(store_id, 0)
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None or entry.expires_at <= time.monotonic():
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, store_id: str, body: bytes, generation: int):
+        """Store ``body`` unless ``store_id`` was invalidated since ``generation`` was read."""
+        entry = CacheEntry(body, self.ttl)
+        if generation != self.generation(store_id):
+            return entry
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = entry
+        self.keys_by_store.setdefault(store_id, set()).add(key)
+        while len(self.entries) > self.max_entries:
+            self._remove(next(iter(self.entries)))
+            self.evictions += 1
+        return entry
+
+    def invalidate_stores(self, store_ids):
+        for store_id in set(store_ids):
+            self.generations[store_id] = self.generation(store_id) + 1
+            for key in self.keys_by_store.pop(store_id, ()):
+                if self.entries.pop(key, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.keys_by_store.clear()
+
+    def _remove(self, key):
+        self.entries.pop(key, None)
+        keys = self.keys_by_store.get(key[1])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.keys_by_store[key[1]]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,146 @@
+"""In-process pub/sub for live stock, price and alert changes.
+
+Write paths publish after they commit; ``/api/stream/{store_id}`` subscribers
+receive the events as server-sent events, so dashboards no longer re-poll the
+read endpoints. Each event is encoded once and the same bytes are queued for
+every subscriber of the store.
+
+Every subscriber has a bounded queue. Publishing never waits: when a slow
+client's queue is full its pending events are dropped and replaced by a single
+``resync`` event telling it to refetch the store snapshot once, so memory stays
+bounded and one stalled connection cannot hold back writers or other clients.
+"""
+import asyncio
+import json
+from collections import Counter
+
+from app.config.constants import STREAM_QUEUE_SIZE, STREAM_MAX_SUBSCRIBERS, CURRENT_DATETIME
+
+
+def encode_event(event: str, data: dict) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+class Subscription:
+    __slots__ = ("store_id", "queue", "overflowed")
+
+    def __init__(self, store_id: str, queue_size: int):
+        self.store_id = store_id
+        self.queue = asyncio.Queue(queue_size)
+        self.overflowed = False
+
+    def offer(self, message: bytes) -> bool:
+        """Queue ``message`` without blocking; on overflow swap the backlog for a resync."""
+        if self.overflowed:
+            return False
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(encode_event("resync", {"store_id": self.store_id}))
+            self.overflowed = True
+            return False
+
+    async def next(self, timeout: float):
+        """Next queued message, or None if nothing arrived within ``timeout`` seconds."""
+        if not self.queue.empty():
+            message = self.queue.get_nowait()
+        else:
+            try:
+                message = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        if self.queue.empty():
+            self.overflowed = False
+        return message
+
+
+class EventBroker:
+    def __init__(self, queue_size: int = STREAM_QUEUE_SIZE, max_subscribers: int = STREAM_MAX_SUBSCRIBERS):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.subscribers = {}
+        self.count = 0
+        self.stats = Counter()
+
+    def subscribe(self, store_id: str):
+        """Register a subscriber for ``store_id``; returns None when the broker is full."""
+        if self.count >= self.max_subscribers:
+            self.stats["rejected"] += 1
+            return None
+        subscription = Subscription(store_id, self.queue_size)
+        self.subscribers.setdefault(store_id, set()).add(subscription)
+        self.count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self.subscribers.get(subscription.store_id)
+        if subscribers is not None and subscription in subscribers:
+            subscribers.discard(subscription)
+            self.count -= 1
+            if not subscribers:
+                del self.subscribers[subscription.store_id]
+
+    def has_subscribers(self, store_id: str) -> bool:
+        return store_id in self.subscribers
+
+    def publish(self, store_id: str, event: str, data: dict) -> int:
+        """Fan ``event`` out to the store's subscribers; returns how many received it."""
+        subscribers = self.subscribers.get(store_id)
+        if not subscribers:
+            return 0
+        message = encode_event(event, data)
+        delivered = sum(subscription.offer(message) for subscription in subscribers)
+        self.stats["published"] += 1
+        self.stats["delivered"] += delivered
+        self.stats["dropped"] += len(subscribers) - delivered
+        return delivered
+
+    def publish_stock(self, store_id: str, product_id: str, stock_level: int, min_threshold: int, delta: int):
+        """Publish a stock change, plus an alert if it crossed ``min_threshold``."""
+        if not self.has_subscribers(store_id):
+            return
+        self.publish(store_id, "stock", {
+            "store_id": store_id,
+            "product_id": product_id,
+            "stock_level": stock_level,
+            "delta": delta,
+            "min_threshold": min_threshold,
+            "at": CURRENT_DATETIME
+        })
+        was_low = stock_level - delta < min_threshold
+        is_low = stock_level < min_threshold
+        if was_low != is_low:
+            self.publish(store_id, "alert", {
+                "store_id": store_id,
+                "product_id": product_id,
+                "state": "low" if is_low else "cleared",
+                "urgency": ("HIGH" if stock_level < min_threshold / 2 else "MEDIUM") if is_low else None,
+                "stock_level": stock_level,
+                "min_threshold": min_threshold,
+                "at": CURRENT_DATETIME
+            })
+
+    def publish_levels(self, levels, deltas):
+        """Publish ``{(store_id, product_id): StockLevel}`` changes with their ``deltas``."""
+        for (store_id, product_id), level in levels.items():
+            self.publish_stock(store_id, product_id, level.stock_level, level.min_threshold,
+                               deltas[(store_id, product_id)])
+
+    def subscribed_keys(self, keys):
+        """The (store_id, product_id) keys whose store has at least one subscriber."""
+        return [key for key in keys if key[0] in self.subscribers]
+
+    def snapshot(self):
+        return {
+            "subscribers": self.count,
+            "stores": len(self.subscribers),
+            "max_subscribers": self.max_subscribers,
+            "queue_size": self.queue_size,
+            **self.stats
+        }
+
+
+broker = EventBroker()
@@ -0,0 +1,200 @@
+"""Streaming exports of inventory, sales, stock movements and forecasts.
+
+Rows are read through a server-side cursor (``stream_results`` with
+``yield_per``) and encoded one chunk at a time, so the first bytes leave as
+soon as the first chunk is fetched and memory stays flat however many rows the
+export has. Formats: NDJSON, CSV and, when pyarrow is installed, the Arrow IPC
+stream format (one record batch per chunk). The Arrow schema follows the SQL
+types of the selected columns, so it holds for columns that are NULL in some
+chunks, and an export with no rows is still a valid stream.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from functools import partial
+
+from sqlalchemy import select, func, Boolean, Integer, Numeric, DateTime, Date, String
+
+from app.models.database import Product, StoreInventory, SalesHistory, StockMovement, DemandForecast
+
+FORMATS = ("ndjson", "csv", "arrow")
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+EXPORT_CHUNK_ROWS = 5000
+
+
+def _inventory_query():
+    return select(
+        StoreInventory.store_id, StoreInventory.product_id, Product.name, Product.category,
+        func.coalesce(StoreInventory.store_price, Product.price).label("price"),
+        StoreInventory.stock_level, StoreInventory.min_threshold,
+        StoreInventory.last_updated_by, StoreInventory.last_updated_at
+    ).join(Product, StoreInventory.product_id == Product.id).order_by(
+        StoreInventory.store_id, StoreInventory.product_id
+    )
+
+
+def _sales_query():
+    return select(
+        SalesHistory.id, SalesHistory.store_id, SalesHistory.product_id, SalesHistory.quantity,
+        SalesHistory.sale_date, SalesHistory.recorded_by
+    ).order_by(SalesHistory.id)
+
+
+def _movements_query():
+    return select(
+        StockMovement.id, StockMovement.store_id, StockMovement.product_id, StockMovement.kind,
+        StockMovement.quantity, StockMovement.counterparty_store_id, StockMovement.recorded_by,
+        StockMovement.occurred_at
+    ).order_by(StockMovement.id)
+
+
+def _forecast_query():
+    return select(
+        DemandForecast.store_id, DemandForecast.product_id, DemandForecast.forecast_date,
+        DemandForecast.predicted_demand, DemandForecast.confidence, DemandForecast.generation,
+        DemandForecast.created_at
+    ).order_by(DemandForecast.store_id, DemandForecast.product_id, DemandForecast.forecast_date)
+
+
+# Dataset name -> (base query, store_id column, date column for since/until)
+DATASETS = {
+    "inventory": (_inventory_query, StoreInventory.store_id, None),
+    "sales": (_sales_query, SalesHistory.store_id, SalesHistory.sale_date),
+    "movements": (_movements_query, StockMovement.store_id, StockMovement.occurred_at),
+    "forecasts": (_forecast_query, DemandForecast.store_id, DemandForecast.forecast_date),
+}
+
+
+def export_query(dataset: str, store_id: str = None, since: datetime = None, until: datetime = None):
+    """The SELECT for ``dataset``, optionally limited to one store and a ``[since, until)`` range."""
+    build, store_column, date_column = DATASETS[dataset]
+    query = build()
+    if store_id is not None:
+        query = query.where(store_column == store_id)
+    if date_column is not None and since is not None:
+        query = query.where(date_column >= since)
+    if date_column is not None and until is not None:
+        query = query.where(date_column < until)
+    return query
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _ndjson(columns, rows) -> bytes:
+    return "".join(
+        json.dumps(dict(zip(columns, map(_plain, row))), separators=(",", ":")) + "\n" for row in rows
+    ).encode()
+
+
+class _CsvEncoder:
+    def __init__(self, columns):
+        self.columns = columns
+        self.header = True
+
+    def __call__(self, rows) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if self.header:
+            writer.writerow(self.columns)
+            self.header = False
+        writer.writerows([_plain(value) for value in row] for row in rows)
+        return buffer.getvalue().encode()
+
+
+def _arrow_type(pyarrow, sql_type):
+    """The Arrow type for a column of ``sql_type``; anything unrecognised is exported as a string."""
+    for base, arrow_type in (
+        (Boolean, pyarrow.bool_()),
+        (Integer, pyarrow.int64()),
+        (Numeric, pyarrow.float64()),
+        (DateTime, pyarrow.timestamp("us")),
+        (Date, pyarrow.date32()),
+        (String, pyarrow.string()),
+    ):
+        if isinstance(sql_type, base):
+            return arrow_type
+    return None
+
+
+class _ArrowEncoder:
+    """Arrow IPC stream: the schema, from the columns' SQL types, then one record batch per chunk."""
+
+    def __init__(self, columns, sql_types):
+        import pyarrow
+
+        self.pyarrow = pyarrow
+        self.columns = columns
+        types = [_arrow_type(pyarrow, sql_type) for sql_type in sql_types]
+        # Columns of other types are sent as their text
+        self.as_text = [arrow_type is None for arrow_type in types]
+        self.schema = pyarrow.schema([
+            (name, arrow_type or pyarrow.string()) for name, arrow_type in zip(columns, types)
+        ])
+        self.sink = io.BytesIO()
+        # Writes the schema message now, so even an export with no rows is a readable stream
+        self.writer = pyarrow.ipc.new_stream(self.sink, self.schema)
+
+    def _take(self) -> bytes:
+        data = self.sink.getvalue()
+        self.sink.seek(0)
+        self.sink.truncate()
+        return data
+
+    def _values(self, rows, index):
+        if self.as_text[index]:
+            return [None if row[index] is None else str(_plain(row[index])) for row in rows]
+        return [row[index] for row in rows]
+
+    def __call__(self, rows) -> bytes:
+        self.writer.write_batch(self.pyarrow.RecordBatch.from_arrays(
+            [self.pyarrow.array(self._values(rows, index), type=field.type) for index, field in enumerate(self.schema)],
+            schema=self.schema
+        ))
+        return self._take()
+
+    def close(self) -> bytes:
+        self.writer.close()
+        return self._take()
+
+
+def arrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+async def stream_export(engine, query, fmt: str, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    """Yield ``query``'s rows encoded as ``fmt``, one chunk of ``chunk_rows`` rows at a time.
+
+    Uses its own connection from ``engine`` so the stream outlives the request's
+    session, and closes it when the client disconnects.
+    """
+    async with engine.connect() as connection:
+        result = await connection.stream(query.execution_options(stream_results=True, yield_per=chunk_rows))
+        columns = list(result.keys())
+        if fmt == "ndjson":
+            encode = partial(_ndjson, columns)
+        elif fmt == "csv":
+            encode = _CsvEncoder(columns)
+        else:
+            encode = _ArrowEncoder(columns, [column.type for column in query.selected_columns])
+
+        wrote_any = False
+        async for rows in result.partitions(chunk_rows):
+            wrote_any = True
+            yield encode(rows)
+        if fmt == "csv" and not wrote_any:
+            yield encode([])
+        if fmt == "arrow":
+            yield encode.close()
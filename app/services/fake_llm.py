@@ -0,0 +1,55 @@
+"""Offline stand-in for the Ollama client, for benchmarks and local runs without a model.
+
+``FakeLLM`` has the ``agenerate`` interface the LLM gateway calls. It reads the
+compact inventory table from each prompt (see ``prompt_context``) and answers
+with the products below their minimum, as a model following the prompt would,
+after sleeping ``latency`` seconds per prompt (langchain's Ollama client sends a
+batch's prompts one after another).
+"""
+import asyncio
+import json
+
+
+class _Generation:
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _Result:
+    __slots__ = ("generations",)
+
+    def __init__(self, texts):
+        self.generations = [[_Generation(text)] for text in texts]
+
+
+def restock_answer(prompt: str) -> str:
+    """JSON list of ``{"product_id", "quantity"}`` for table rows with stock below the minimum."""
+    needs = []
+    for line in prompt.splitlines():
+        fields = line.strip().split("|")
+        if len(fields) < 4:
+            continue
+        try:
+            stock, minimum = int(fields[2]), int(fields[3])
+        except ValueError:
+            continue
+        if stock < minimum:
+            needs.append({"product_id": fields[0], "quantity": minimum - stock + 10})
+    return json.dumps(needs)
+
+
+class FakeLLM:
+    def __init__(self, latency: float = 0.0, respond=restock_answer):
+        self.latency = latency
+        self.respond = respond
+        self.calls = 0
+        self.prompts = 0
+
+    async def agenerate(self, prompts):
+        self.calls += 1
+        self.prompts += len(prompts)
+        if self.latency:
+            await asyncio.sleep(self.latency * len(prompts))
+        return _Result([self.respond(prompt) for prompt in prompts])
@@ -0,0 +1,140 @@
+"""Vectorized demand forecasting.
+
+Every model takes a ``history`` matrix of shape ``(n_series, n_days)`` holding the
+daily quantity sold for each (store, product) series, oldest day first, and
+forecasts all series at once. Recursive models loop over time only; each step is
+a single array operation across every series.
+"""
+from __future__ import annotations
+
+from app.services.lazy_imports import numpy as np
+
+METHODS = ("moving_average", "exponential_smoothing", "holt_winters", "day_of_week")
+DEFAULT_METHOD = "holt_winters"
+DEFAULT_HISTORY_DAYS = 56
+SEASON_LENGTH = 7
+
+
+def moving_average(history: np.ndarray, horizon: int, window: int = 7):
+    n_series, n_days = history.shape
+    window = max(1, min(window, n_days))
+    totals = np.cumsum(np.pad(history, ((0, 0), (1, 0))), axis=1)
+
+    # fitted[:, i] is the mean of the (up to) ``window`` days before day i
+    starts = np.maximum(np.arange(n_days) - window, 0)
+    counts = np.maximum(np.arange(n_days) - starts, 1)
+    fitted = (totals[:, :-1] - totals[:, starts]) / counts
+    fitted[:, 0] = history[:, 0]
+
+    level = history[:, -window:].mean(axis=1)
+    return np.repeat(level[:, None], horizon, axis=1), fitted
+
+
+def exponential_smoothing(history: np.ndarray, horizon: int, alpha: float = 0.3, beta: float = None):
+    """Simple exponential smoothing, or Holt's linear trend method when ``beta`` is set."""
+    n_series, n_days = history.shape
+    level = history[:, 0].astype(float)
+    trend = np.zeros(n_series)
+    fitted = np.empty(history.shape)
+
+    for day in range(n_days):
+        fitted[:, day] = level + trend
+        previous = level
+        level = alpha * history[:, day] + (1 - alpha) * (level + trend)
+        if beta is not None:
+            trend = beta * (level - previous) + (1 - beta) * trend
+
+    steps = np.arange(1, horizon + 1)
+    return level[:, None] + trend[:, None] * steps, fitted
+
+
+def holt_winters(history: np.ndarray, horizon: int, alpha: float = 0.3, beta: float = 0.05,
+                 gamma: float = 0.2, period: int = SEASON_LENGTH):
+    """Additive Holt-Winters with a weekly season; needs at least two full seasons."""
+    n_series, n_days = history.shape
+    if n_days < 2 * period:
+        return exponential_smoothing(history, horizon, alpha, beta)
+
+    level = history[:, :period].mean(axis=1)
+    trend = (history[:, period:2 * period].mean(axis=1) - level) / period
+    seasonal = history[:, :period] - level[:, None]
+    fitted = np.empty(history.shape)
+
+    for day in range(n_days):
+        slot = day % period
+        season = seasonal[:, slot]
+        fitted[:, day] = level + trend + season
+        previous = level
+        level = alpha * (history[:, day] - season) + (1 - alpha) * (level + trend)
+        trend = beta * (level - previous) + (1 - beta) * trend
+        seasonal[:, slot] = gamma * (history[:, day] - level) + (1 - gamma) * season
+
+    steps = np.arange(1, horizon + 1)
+    slots = (n_days + steps - 1) % period
+    return level[:, None] + trend[:, None] * steps + seasonal[:, slots], fitted
+
+
+def day_of_week(history: np.ndarray, horizon: int, weeks: int = 4, period: int = SEASON_LENGTH):
+    """Average of the same weekday over the last ``weeks`` weeks."""
+    n_series, n_days = history.shape
+    weeks = max(1, min(weeks, n_days // period))
+    if n_days < period:
+        return moving_average(history, horizon, window=n_days)
+
+    # Reshape the trailing whole weeks so column j lines up with day (n_days + j) % period
+    profile = history[:, -weeks * period:].reshape(n_series, weeks, period).mean(axis=1)
+
+    fitted = np.empty(history.shape)
+    fitted[:, :period] = history[:, :period]
+    for day in range(period, n_days):
+        past = history[:, max(day - weeks * period, day % period):day:period]
+        fitted[:, day] = past.mean(axis=1)
+
+    slots = np.arange(horizon) % period
+    return profile[:, slots], fitted
+
+
+MODELS = {
+    "moving_average": moving_average,
+    "exponential_smoothing": exponential_smoothing,
+    "holt_winters": holt_winters,
+    "day_of_week": day_of_week,
+}
+
+
+def confidence_scores(history: np.ndarray, fitted: np.ndarray, window: int = 28) -> np.ndarray:
+    """1 - weighted absolute percentage error of the in-sample fit over the last ``window`` days."""
+    actual = history[:, -window:]
+    errors = np.abs(actual - fitted[:, -window:]).sum(axis=1)
+    totals = actual.sum(axis=1)
+    wape = np.divide(errors, totals, out=np.ones_like(errors, dtype=float), where=totals > 0)
+    scores = np.clip(1 - wape, 0.05, 0.99)
+    # Series that never sold carry no evidence either way
+    scores[totals == 0] = 0.5
+    return np.round(scores, 2)
+
+
+def forecast(history: np.ndarray, horizon: int, method: str = DEFAULT_METHOD, **params):
+    """Forecast every series in ``history``.
+
+    Returns ``(predictions, confidence)`` where ``predictions`` has shape
+    ``(n_series, horizon)`` and is clipped at zero.
+    """
+    if method not in MODELS:
+        raise ValueError(f"Unknown forecasting method '{method}', expected one of {', '.join(METHODS)}")
+    history = np.asarray(history, dtype=float)
+    if history.ndim != 2 or history.shape[1] == 0:
+        raise ValueError("history must be a non-empty (n_series, n_days) matrix")
+
+    predictions, fitted = MODELS[method](history, horizon, **params)
+    return np.clip(predictions, 0, None), confidence_scores(history, fitted)
+
+
+def mape(actual: np.ndarray, predicted: np.ndarray) -> float:
+    """Mean absolute percentage error over the non-zero actuals, in percent."""
+    actual = np.asarray(actual, dtype=float)
+    predicted = np.asarray(predicted, dtype=float)
+    mask = actual != 0
+    if not mask.any():
+        return 0.0
+    return float(np.mean(np.abs((actual[mask] - predicted[mask]) / actual[mask])) * 100)
@@ -0,0 +1,226 @@
+"""Materialized forecast store.
+
+Forecasts live in ``demand_forecast``, one row per (store, product, day),
+upserted on that key, so a refresh overwrites the days it recomputes instead of
+appending. Every refresh opens a ``forecast_generations`` row and stamps its ID
+on the rows it writes; ``forecast_series`` records per series which generation
+is current and with which method, horizon and history window it was computed.
+
+The store holds ``DEFAULT_METHOD`` forecasts over ``FORECAST_STORE_DAYS``
+days, one per series, kept up to date by the forecast_refresh job. A series
+is recomputed only when its stored forecast is unusable (never computed, from
+another method or a shorter horizon, or an older history window) or when its
+sales changed since: the rollup writers bump ``forecast_series.sales_version``
+(see ``app.services.rollups``) and the store remembers the version each
+forecast was computed from.
+
+``load_forecasts`` serves requests the store can answer from it. Requests for
+another method or a longer horizon are computed for that request only and
+never written, so they cannot overwrite the stored forecasts other readers
+rely on.
+
+Generation and ``computed_at`` timestamps are wall-clock times; forecast dates
+follow the business date of ``get_datetime_obj``.
+"""
+from datetime import datetime, timedelta
+
+from app.services.lazy_imports import numpy as np
+from sqlalchemy import select, or_, and_, func
+
+from app.models.database import StoreInventory, DemandForecast, ForecastGeneration, ForecastSeries
+from app.models.bulk import executemany, datetime_converter, dialect_insert
+from app.services.forecasting import ForecastingService
+from app.services.forecast_engine import DEFAULT_METHOD
+from app.config.constants import CURRENT_USER, FORECAST_STORE_DAYS, get_datetime_obj
+
+# Series forecast and written per statement batch during a refresh
+REFRESH_BATCH_SERIES = 20000
+# The only method the store holds
+STORED_METHOD = DEFAULT_METHOD
+
+_FORECAST_KEYS = ["store_id", "product_id", "forecast_date", "predicted_demand", "confidence", "generation",
+                  "created_by", "created_at"]
+_SERIES_KEYS = ["store_id", "product_id", "sales_version", "forecast_sales_version", "generation", "method",
+                "horizon_days", "history_end", "computed_at"]
+
+
+def _forecast_upsert(dialect_name: str):
+    table = DemandForecast.__table__
+    statement = dialect_insert(dialect_name)(table)
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.store_id, table.c.product_id, table.c.forecast_date],
+        set_={name: statement.excluded[name] for name in ("predicted_demand", "confidence", "generation",
+                                                           "created_by", "created_at")}
+    )
+
+
+def _series_upsert(dialect_name: str):
+    # sales_version is left alone on conflict: a sale recorded meanwhile keeps the series stale
+    table = ForecastSeries.__table__
+    statement = dialect_insert(dialect_name)(table)
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.store_id, table.c.product_id],
+        set_={name: statement.excluded[name] for name in _SERIES_KEYS[3:]}
+    )
+
+
+def _unusable(days: int, history_end):
+    """Stored forecasts that cannot answer a ``days`` request for the current history window."""
+    return or_(
+        ForecastSeries.forecast_sales_version.is_(None),
+        ForecastSeries.method != STORED_METHOD,
+        ForecastSeries.horizon_days < days,
+        ForecastSeries.history_end != history_end
+    )
+
+
+def _sales_changed():
+    return ForecastSeries.forecast_sales_version < ForecastSeries.sales_version
+
+
+async def refresh_forecasts(session, store_ids=None, days: int = FORECAST_STORE_DAYS, include_stale: bool = True,
+                            force: bool = False, horizon: int = None):
+    """Recompute the stocked series of ``store_ids`` (all stores when None) that need it, with ``STORED_METHOD``.
+
+    Series that cannot answer ``days`` days are recomputed over ``horizon``
+    days (``days`` when None), so a short request still stores a full horizon.
+
+    ``include_stale`` False leaves series whose only problem is newer sales
+    alone; ``force`` recomputes everything. Commits after every batch. Returns
+    the generation ID (None when nothing needed recomputing) and series count.
+    """
+    service = ForecastingService(session)
+    history_end = service.history_window()[1]
+    query = select(
+        StoreInventory.store_id, StoreInventory.product_id, func.coalesce(ForecastSeries.sales_version, 0)
+    ).outerjoin(ForecastSeries, and_(
+        ForecastSeries.store_id == StoreInventory.store_id, ForecastSeries.product_id == StoreInventory.product_id
+    )).order_by(StoreInventory.store_id, StoreInventory.product_id)
+    if store_ids is not None:
+        query = query.where(StoreInventory.store_id.in_(store_ids))
+    if not force:
+        query = query.where(or_(_unusable(days, history_end), _sales_changed()) if include_stale
+                            else _unusable(days, history_end))
+    pending = (await session.execute(query)).all()
+    if not pending:
+        return {"generation": None, "series": 0}
+    horizon = max(days, horizon or days)
+
+    generation = ForecastGeneration(
+        method=STORED_METHOD, horizon_days=horizon, history_end=history_end, series=len(pending),
+        created_by=CURRENT_USER, started_at=datetime.now()
+    )
+    session.add(generation)
+    await session.commit()
+
+    first_day = datetime.combine(history_end, datetime.min.time())
+    for start in range(0, len(pending), REFRESH_BATCH_SERIES):
+        batch = pending[start:start + REFRESH_BATCH_SERIES]
+        # Versions were read before the history, so a sale landing in between leaves the series stale
+        predictions, confidence = await service.forecast_series(
+            [(store_id, product_id) for store_id, product_id, _ in batch], horizon, STORED_METHOD
+        )
+        demand = np.rint(predictions).astype(int).tolist()
+
+        connection = await session.connection()
+        convert = datetime_converter(connection)
+        dialect_name = connection.dialect.name
+        dates = [convert(first_day + timedelta(days=offset)) for offset in range(horizon)]
+        created_at, computed_at, end = convert(get_datetime_obj()), convert(datetime.now()), convert(history_end)
+        await executemany(connection, _forecast_upsert(dialect_name), _FORECAST_KEYS, [
+            (store_id, product_id, dates[offset], demand[row][offset], float(confidence[row]), generation.id,
+             CURRENT_USER, created_at)
+            for row, (store_id, product_id, _) in enumerate(batch)
+            for offset in range(horizon)
+        ])
+        await executemany(connection, _series_upsert(dialect_name), _SERIES_KEYS, [
+            (store_id, product_id, version, version, generation.id, STORED_METHOD, horizon, end, computed_at)
+            for store_id, product_id, version in batch
+        ])
+        await session.commit()
+
+    generation.finished_at = datetime.now()
+    await session.commit()
+    return {"generation": generation.id, "series": len(pending)}
+
+
+async def read_forecasts(session, store_ids, days: int = 7):
+    """Stored forecasts of the current generation for ``store_ids``, ``days`` days from tomorrow.
+
+    Returns ``{(store_id, product_id): (daily_demand, confidence, generation, computed_at, stale)}``;
+    ``stale`` is True when sales changed after the forecast was computed. Series
+    stored with a shorter horizon, or with a method other than ``STORED_METHOD``, are left out.
+    """
+    first_day = datetime.combine(get_datetime_obj().date() + timedelta(days=1), datetime.min.time())
+    result = await session.execute(
+        select(
+            DemandForecast.store_id, DemandForecast.product_id, DemandForecast.forecast_date,
+            DemandForecast.predicted_demand, DemandForecast.confidence, ForecastSeries.generation,
+            ForecastSeries.computed_at, _sales_changed()
+        ).join(ForecastSeries, and_(
+            ForecastSeries.store_id == DemandForecast.store_id,
+            ForecastSeries.product_id == DemandForecast.product_id,
+            ForecastSeries.generation == DemandForecast.generation
+        )).where(
+            ForecastSeries.method == STORED_METHOD,
+            ForecastSeries.horizon_days >= days,
+            DemandForecast.store_id.in_(store_ids),
+            DemandForecast.forecast_date >= first_day,
+            DemandForecast.forecast_date < first_day + timedelta(days=days)
+        )
+    )
+    stored = {}
+    for store_id, product_id, forecast_date, demand, confidence, generation, computed_at, stale in result:
+        entry = stored.get((store_id, product_id))
+        if entry is None:
+            entry = stored[(store_id, product_id)] = ([0] * days, confidence, generation, computed_at, bool(stale))
+        entry[0][(forecast_date - first_day).days] = demand
+    return stored
+
+
+async def _compute(session, series, days: int, method: str):
+    """Forecasts of ``series`` computed for one request, in ``read_forecasts``' shape, without storing them."""
+    if not series:
+        return {}
+    predictions, confidence = await ForecastingService(session).forecast_series(series, days, method)
+    demand = np.rint(predictions).astype(int).tolist()
+    computed_at = datetime.now()
+    return {key: (demand[row], float(confidence[row]), None, computed_at, False) for row, key in enumerate(series)}
+
+
+async def load_forecasts(session, store_ids, days: int = 7, method: str = DEFAULT_METHOD, include_stale: bool = False):
+    """Forecasts of every stocked series of ``store_ids``, from the store where it can answer.
+
+    Returns ``(forecasts, recomputed)``: ``read_forecasts``' mapping, covering
+    every series, and how many series were computed for this call. With
+    ``STORED_METHOD`` and at most ``FORECAST_STORE_DAYS`` days, unusable series
+    (and with ``include_stale`` those whose sales changed) are recomputed into
+    the store first. Other requests are computed without touching the store.
+    """
+    series = [tuple(row) for row in (await session.execute(
+        select(StoreInventory.store_id, StoreInventory.product_id).where(StoreInventory.store_id.in_(store_ids))
+        .order_by(StoreInventory.store_id, StoreInventory.product_id)
+    )).all()]
+    if method != STORED_METHOD or days > FORECAST_STORE_DAYS:
+        return await _compute(session, series, days, method), len(series)
+
+    recomputed = (await refresh_forecasts(
+        session, store_ids, days, include_stale, horizon=FORECAST_STORE_DAYS
+    ))["series"]
+    stored = await read_forecasts(session, store_ids, days)
+    # Stocked since the refresh, or rewritten meanwhile by a job run with a shorter horizon
+    missing = [key for key in series if key not in stored]
+    stored.update(await _compute(session, missing, days, method))
+    return stored, recomputed + len(missing)
+
+
+def freshness(stored, recomputed: int = 0):
+    """Staleness metadata for a set of stored forecasts, as returned with a forecast response."""
+    entries = list(stored.values())
+    computed = [entry[3] for entry in entries if entry[3] is not None]
+    return {
+        "generation": max((entry[2] for entry in entries if entry[2] is not None), default=None),
+        "computed_at": min(computed).isoformat() if computed else None,
+        "stale_series": sum(entry[4] for entry in entries),
+        "recomputed_series": recomputed
+    }
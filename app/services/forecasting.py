@@ -1,60 +1,65 @@
-from langchain.llms import Ollama
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.models.database import SalesHistory, DemandForecast
+from app.services.forecast_engine import forecast, DEFAULT_METHOD, DEFAULT_HISTORY_DAYS
+from app.services.rollups import daily_sales_matrix
+from app.services.analytics import analytics
+from app.services.llm_gateway import get_llm_gateway
+from app.services.prompt_context import encode_forecast
+from app.config.constants import get_datetime_obj
+from app.config.settings import get_settings
 from datetime import datetime, timedelta
-import json
+
 
 class ForecastingService:
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, history_days: int = DEFAULT_HISTORY_DAYS):
         self.session = session
-        self.llm = Ollama(base_url="http://localhost:11434", model="mistral")
-
-    async def generate_forecast(self, store_id: str, days: int = 7):
-        # Get historical sales data
-        query = select(SalesHistory).where(
-            SalesHistory.store_id == store_id,
-            SalesHistory.sale_date >= datetime.now() - timedelta(days=30)
-        ).order_by(SalesHistory.sale_date.desc())
-        
-        result = await self.session.execute(query)
-        historical_data = result.fetchall()
-
-        # Prepare data for LLM
-        sales_data = [
+        self.history_days = history_days
+        self.llm = get_llm_gateway()
+
+    def history_window(self):
+        end = get_datetime_obj().date() + timedelta(days=1)
+        return end - timedelta(days=self.history_days), end
+
+    async def load_history(self, series):
+        """Daily sales matrix with one row per (store_id, product_id) in ``series``."""
+        start, _ = self.history_window()
+        return await daily_sales_matrix(self.session, series, start, self.history_days)
+
+    async def forecast_series(self, series, days: int = 7, method: str = DEFAULT_METHOD):
+        """Forecast the next ``days`` days for every series in one batched computation, off the event loop.
+
+        Returns ``(predictions, confidence)`` aligned with ``series``.
+        """
+        history = await self.load_history(series)
+        return await analytics.run(forecast, history, days, method)
+
+    async def generate_forecast(self, store_id: str, days: int = 7, method: str = DEFAULT_METHOD):
+        """Bring ``store_id``'s stored forecasts up to date and return them day by day."""
+        from app.services.forecast_store import load_forecasts
+
+        stored, _ = await load_forecasts(self.session, [store_id], days, method)
+        first_day = datetime.combine(self.history_window()[1], datetime.min.time())
+        return [
             {
-                "product_id": sale.product_id,
-                "quantity": sale.quantity,
-                "date": sale.sale_date.isoformat()
+                "product_id": product_id,
+                "date": (first_day + timedelta(days=offset)).isoformat(),
+                "quantity": daily_demand[offset],
+                "confidence": float(confidence)
             }
-            for sale in historical_data
+            for (_, product_id), (daily_demand, confidence, *_) in sorted(stored.items())
+            for offset in range(days)
         ]
 
+    async def explain_forecast(self, store_id: str, forecast_items):
+        """Optional LLM commentary on an already computed forecast."""
+        context = encode_forecast(store_id, forecast_items, self.history_window()[1],
+                                  get_settings().llm_prompt_token_budget)
         prompt = f"""
-        Based on this historical sales data:
-        {json.dumps(sales_data)}
-        
-        Predict daily sales for the next {days} days considering:
-        1. Historical patterns
-        2. Seasonal trends
-        3. Recent changes in demand
-        
-        Return the forecast as a JSON array with dates and predicted quantities.
+        These are the demand forecasts for store {store_id}, computed from historical sales:
+        {context}
+
+        In a few sentences, explain the main demand trends and which products need attention.
+        Do not change the numbers.
         """
 
-        response = await self.llm.agenerate([prompt])
-        forecast_data = json.loads(response.generations[0].text)
-        
-        # Store forecasts in database
-        for day_forecast in forecast_data:
-            forecast = DemandForecast(
-                store_id=store_id,
-                product_id=day_forecast["product_id"],
-                forecast_date=datetime.fromisoformat(day_forecast["date"]),
-                predicted_demand=day_forecast["quantity"],
-                confidence=day_forecast.get("confidence", 0.8)
-            )
-            self.session.add(forecast)
-        
-        await self.session.commit()
-        return forecast_data
\ No newline at end of file
+        response = await self.llm.generate(prompt)
+        return response.strip()
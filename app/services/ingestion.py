@@ -0,0 +1,156 @@
+"""Bulk sales ingestion.
+
+The CLI importer writes sales lines in chunked transactions, so a file of
+any size streams through bounded memory; a failure rolls back only the chunk
+being written and the import has to resume after the lines already committed.
+The HTTP endpoint passes ``atomic=True``: its lines (at most
+``MAX_BULK_SALES``) are written chunk by chunk but commit once, so a failed
+request changes nothing and can simply be retried. Each chunk is four
+driver-level executemany calls, whatever its size: the raw insert into
+``sales_history``, the ``daily_sales`` upsert (one row per touched series-day),
+an UPDATE decrementing ``store_inventory`` once per touched series and the
+matching "sale" movements in the stock ledger.
+
+Usage: python -m app.services.ingestion sales.csv|sales.ndjson [--chunk-size N]
+"""
+import argparse
+import asyncio
+import csv
+import json
+import time
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import update, bindparam
+
+from app.models.database import async_session, engine, SalesHistory, StoreInventory
+from app.models.bulk import executemany, datetime_converter
+from app.services.rollups import add_daily_totals
+from app.services.stock_ledger import record_movements, SALE
+from app.config.constants import CURRENT_USER, SALES_INGEST_CHUNK_SIZE, get_datetime_obj
+
+_insert_sales = SalesHistory.__table__.insert()
+_SALES_COLUMNS = ["store_id", "product_id", "quantity", "sale_date", "recorded_by"]
+
+_decrement_stock = update(StoreInventory.__table__).where(
+    StoreInventory.__table__.c.store_id == bindparam("b_store_id"),
+    StoreInventory.__table__.c.product_id == bindparam("b_product_id")
+).values(
+    stock_level=StoreInventory.__table__.c.stock_level - bindparam("b_quantity"),
+    last_updated_by=bindparam("b_user"),
+    last_updated_at=bindparam("b_time")
+)
+_DECREMENT_KEYS = ["b_quantity", "b_user", "b_time", "b_store_id", "b_product_id"]
+
+
+def _normalize(sale, now):
+    sale_date = sale.get("sale_date") or now
+    if isinstance(sale_date, str):
+        sale_date = datetime.fromisoformat(sale_date)
+    return sale["store_id"], sale["product_id"], int(sale["quantity"]), sale_date
+
+
+async def _write_chunk(session, rows, now):
+    """Write one chunk without committing; returns the units sold per (store_id, product_id) and rows updated."""
+    connection = await session.connection()
+    convert = datetime_converter(connection)
+    await executemany(connection, _insert_sales, _SALES_COLUMNS, [
+        (store_id, product_id, quantity, convert(sale_date), CURRENT_USER)
+        for store_id, product_id, quantity, sale_date in rows
+    ])
+
+    sold = Counter()
+    daily = Counter()
+    for store_id, product_id, quantity, sale_date in rows:
+        sold[(store_id, product_id)] += quantity
+        daily[(store_id, product_id, sale_date.date())] += quantity
+    await add_daily_totals(connection, daily)
+
+    updated_at = convert(now)
+    updated = await executemany(connection, _decrement_stock, _DECREMENT_KEYS, [
+        (quantity, CURRENT_USER, updated_at, store_id, product_id)
+        for (store_id, product_id), quantity in sold.items()
+    ])
+    await record_movements(connection, [
+        (store_id, product_id, SALE, -quantity, None) for (store_id, product_id), quantity in sold.items()
+    ])
+    return sold, updated
+
+
+async def ingest_sales(session, sales, chunk_size: int = SALES_INGEST_CHUNK_SIZE, on_commit=None,
+                       atomic: bool = False):
+    """Record ``sales`` (mappings with store_id, product_id, quantity and optional sale_date).
+
+    ``sales`` may be any iterable, including a generator over a large file; at most
+    ``chunk_size`` lines are held in memory. Each chunk commits on its own, so a
+    failure rolls back only the chunk being written. With ``atomic`` everything
+    commits once at the end and a failure leaves nothing behind; the caller
+    rolls back. ``on_commit`` is awaited after each commit with the units sold
+    per (store_id, product_id).
+    """
+    now = get_datetime_obj()
+    started = time.perf_counter()
+    received = series = inventory_rows = 0
+    pending = Counter()
+
+    async def write(chunk):
+        nonlocal received, series, inventory_rows
+        sold, updated = await _write_chunk(session, chunk, now)
+        received += len(chunk)
+        series += len(sold)
+        inventory_rows += updated
+        pending.update(sold)
+        if not atomic:
+            await commit()
+
+    async def commit():
+        await session.commit()
+        if on_commit is not None and pending:
+            await on_commit(Counter(pending))
+        pending.clear()
+
+    chunk = []
+    for sale in sales:
+        chunk.append(_normalize(sale, now))
+        if len(chunk) >= chunk_size:
+            await write(chunk)
+            chunk = []
+    if chunk:
+        await write(chunk)
+    if atomic:
+        await commit()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "inserted": received,
+        "inventory_rows_updated": inventory_rows,
+        "series_without_inventory": series - inventory_rows,
+        "elapsed_seconds": round(elapsed, 4),
+        "rows_per_second": round(received / elapsed, 1) if elapsed else None
+    }
+
+
+def read_sales_file(path: str):
+    """Yield sales from a CSV (with a header row) or NDJSON file without loading it whole."""
+    with open(path, newline="") as handle:
+        if path.endswith((".ndjson", ".jsonl")):
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(handle)
+
+
+async def import_file(path: str, chunk_size: int):
+    async with async_session() as session:
+        summary = await ingest_sales(session, read_sales_file(path), chunk_size)
+    await engine.dispose()
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import POS sales lines from CSV or NDJSON")
+    parser.add_argument("path", help="CSV file with store_id,product_id,quantity[,sale_date] or NDJSON")
+    parser.add_argument("--chunk-size", type=int, default=SALES_INGEST_CHUNK_SIZE)
+    args = parser.parse_args()
+    asyncio.run(import_file(args.path, args.chunk_size))
@@ -0,0 +1,120 @@
+"""Atomic stock adjustments.
+
+Stock is changed with ``UPDATE ... SET stock_level = stock_level + :q`` so the
+database applies the delta under its own row/write lock; concurrent adjustments
+can never overwrite each other the way a read-modify-write in Python can.
+Every adjustment also appends its movement to the stock ledger
+(``app.services.stock_ledger``) in the same transaction.
+"""
+from collections import Counter, namedtuple
+from datetime import datetime
+
+from sqlalchemy import update, select, bindparam, tuple_
+
+from app.models.database import StoreInventory
+from app.models.bulk import executemany, datetime_converter
+from app.services.stock_ledger import record_movements, ADJUSTMENT, TRANSFER
+from app.config.constants import CURRENT_USER, get_datetime_obj
+
+_table = StoreInventory.__table__
+
+_adjust_many = update(_table).where(
+    _table.c.store_id == bindparam("b_store_id"),
+    _table.c.product_id == bindparam("b_product_id")
+).values(
+    stock_level=_table.c.stock_level + bindparam("b_quantity"),
+    last_updated_by=bindparam("b_user"),
+    last_updated_at=bindparam("b_time")
+)
+_ADJUST_KEYS = ["b_quantity", "b_user", "b_time", "b_store_id", "b_product_id"]
+
+StockLevel = namedtuple("StockLevel", ["stock_level", "min_threshold"])
+_KEYS_PER_QUERY = 5000
+
+
+async def adjust_stock(session, store_id: str, product_id: str, quantity: int,
+                       user: str = CURRENT_USER, updated_at: datetime = None, kind: str = ADJUSTMENT,
+                       counterparty_store_id: str = None):
+    """Add ``quantity`` (may be negative) to one inventory row in a single statement.
+
+    ``kind`` is the ledger movement kind. Returns the new ``StockLevel``, or
+    None if the store does not stock the product. Does not commit.
+    """
+    updated_at = updated_at or get_datetime_obj()
+    statement = update(_table).where(
+        _table.c.store_id == store_id,
+        _table.c.product_id == product_id
+    ).values(
+        stock_level=_table.c.stock_level + quantity,
+        last_updated_by=user,
+        last_updated_at=updated_at
+    ).returning(_table.c.stock_level, _table.c.min_threshold)
+    row = (await session.execute(statement)).one_or_none()
+    if row is None:
+        return None
+    await record_movements(
+        await session.connection(), [(store_id, product_id, kind, quantity, counterparty_store_id)], user
+    )
+    return StockLevel(*row)
+
+
+async def transfer_stock(session, from_store_id: str, to_store_id: str, product_id: str, quantity: int,
+                         user: str = CURRENT_USER):
+    """Move ``quantity`` units of a product from one store to another.
+
+    Returns the new ``(from_level, to_level)``; either is None if that store does
+    not stock the product, in which case the caller must roll back. Does not commit.
+    """
+    updated_at = get_datetime_obj()
+    from_level = await adjust_stock(session, from_store_id, product_id, -quantity, user, updated_at,
+                                    TRANSFER, to_store_id)
+    to_level = await adjust_stock(session, to_store_id, product_id, quantity, user, updated_at,
+                                  TRANSFER, from_store_id)
+    return from_level, to_level
+
+
+async def read_stock_levels(session, keys):
+    """Current ``StockLevel`` per (store_id, product_id) in ``keys``; absent rows are left out."""
+    keys = list(keys)
+    levels = {}
+    # Two bound parameters per key; stay well below SQLite's variable limit
+    for start in range(0, len(keys), _KEYS_PER_QUERY):
+        result = await session.execute(
+            select(_table.c.store_id, _table.c.product_id, _table.c.stock_level, _table.c.min_threshold).where(
+                tuple_(_table.c.store_id, _table.c.product_id).in_(keys[start:start + _KEYS_PER_QUERY])
+            )
+        )
+        for store_id, product_id, level, threshold in result:
+            levels[(store_id, product_id)] = StockLevel(level, threshold)
+    return levels
+
+
+async def adjust_stock_many(session, adjustments, user: str = CURRENT_USER):
+    """Apply many ``(store_id, product_id, quantity, kind)`` adjustments in one executemany.
+
+    Deltas for the same row are summed first, and recorded in the ledger per
+    row and movement kind. Returns ``(new_levels, missing)``:
+    the new ``StockLevel`` per (store_id, product_id) and the keys with no inventory
+    row. The levels are read back inside the same transaction, while the updated
+    rows are still locked by it. Does not commit.
+    """
+    deltas = Counter()
+    movements = Counter()
+    for store_id, product_id, quantity, kind in adjustments:
+        deltas[(store_id, product_id)] += quantity
+        movements[(store_id, product_id, kind)] += quantity
+    if not deltas:
+        return {}, []
+
+    connection = await session.connection()
+    updated_at = datetime_converter(connection)(get_datetime_obj())
+    await executemany(connection, _adjust_many, _ADJUST_KEYS, [
+        (quantity, user, updated_at, store_id, product_id)
+        for (store_id, product_id), quantity in deltas.items()
+    ])
+    await record_movements(connection, [
+        (store_id, product_id, kind, quantity, None) for (store_id, product_id, kind), quantity in movements.items()
+    ], user)
+
+    new_levels = await read_stock_levels(session, list(deltas))
+    return new_levels, [key for key in deltas if key not in new_levels]
@@ -0,0 +1,95 @@
+"""Paged, projected inventory reads.
+
+``inventory_page`` selects only the columns behind the requested fields, so
+rows come back as plain tuples without building ``StoreInventory``/``Product``
+entities. Pages are keyset-paginated on ``product_id``: the cursor is the last
+product ID returned and the next page starts strictly after it. That lets the
+``(store_id, product_id)`` index seek straight to the page, so every page costs
+the same however deep the client has paged, unlike OFFSET.
+
+Given ``levels`` (see ``app.services.stock_ledger.point_in_time``), the page
+reads ``current_stock`` from there instead, and the stock filters apply to it.
+"""
+from sqlalchemy import select, func
+
+from app.models.database import Product, StoreInventory
+
+# Response field -> column expression; the order is the response's field order
+INVENTORY_FIELDS = {
+    "product_id": StoreInventory.product_id,
+    "name": Product.name,
+    "category": Product.category,
+    "current_stock": StoreInventory.stock_level,
+    "min_threshold": StoreInventory.min_threshold,
+    "price": func.coalesce(StoreInventory.store_price, Product.price),
+    "last_updated": StoreInventory.last_updated_at,
+}
+_PRODUCT_FIELDS = {"name", "category", "price"}
+
+
+def parse_fields(fields: str = None):
+    """Requested field names in response order; all fields when ``fields`` is empty.
+
+    Raises ValueError naming any unknown field.
+    """
+    if not fields:
+        return list(INVENTORY_FIELDS)
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - set(INVENTORY_FIELDS)
+    if unknown:
+        raise ValueError(
+            f"Unknown fields {', '.join(sorted(unknown))}, expected some of {', '.join(INVENTORY_FIELDS)}"
+        )
+    return [name for name in INVENTORY_FIELDS if name in requested]
+
+
+async def inventory_page(session, store_id: str, fields=None, after: str = None, limit: int = None,
+                         category: str = None, min_stock: int = None, max_stock: int = None, levels=None):
+    """One page of a store's inventory as dicts with ``fields``, ordered by product_id.
+
+    Returns ``(items, next_cursor)``; ``next_cursor`` is None on the last page.
+    ``limit`` None returns every remaining row. With ``levels`` only the
+    products it has are returned.
+    """
+    fields = fields or list(INVENTORY_FIELDS)
+    stock = StoreInventory.stock_level if levels is None else levels.c.stock_level
+    # product_id is always read: it orders the page and is the cursor
+    columns = [
+        (stock if name == "current_stock" else INVENTORY_FIELDS[name]).label(name)
+        for name in fields if name != "product_id"
+    ]
+    query = select(StoreInventory.product_id, *columns).where(StoreInventory.store_id == store_id)
+    if levels is not None:
+        query = query.join(levels, levels.c.product_id == StoreInventory.product_id)
+    if _PRODUCT_FIELDS.intersection(fields) or category is not None:
+        query = query.join(Product, StoreInventory.product_id == Product.id)
+    if category is not None:
+        query = query.where(Product.category == category)
+    if min_stock is not None:
+        query = query.where(stock >= min_stock)
+    if max_stock is not None:
+        query = query.where(stock <= max_stock)
+    if after is not None:
+        query = query.where(StoreInventory.product_id > after)
+    query = query.order_by(StoreInventory.product_id)
+    if limit is not None:
+        # One extra row tells whether another page follows
+        query = query.limit(limit + 1)
+
+    rows = (await session.execute(query)).all()
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1][0]
+
+    names = ["product_id"] + [name for name in fields if name != "product_id"]
+    keep_id = "product_id" in fields
+    items = []
+    for row in rows:
+        item = dict(zip(names, row))
+        if not keep_id:
+            del item["product_id"]
+        if "last_updated" in item and item["last_updated"] is not None:
+            item["last_updated"] = item["last_updated"].isoformat()
+        items.append(item)
+    return items, next_cursor
@@ -0,0 +1,378 @@
+"""In-process background jobs with persisted state, retries and concurrency limits.
+
+Jobs are rows in the ``jobs`` table: ``enqueue`` inserts one as "queued", a
+pool of worker tasks claims due jobs, runs the registered function and records
+"succeeded" with its JSON result, or requeues it with a growing delay until
+``max_attempts`` is used up and marks it "failed". A claim is a conditional
+UPDATE on the queued row, so a job runs once even if several workers (or
+processes sharing the database) race for it.
+
+Every scheduler process has its own ``worker_id``, stamps it on the jobs it
+claims and refreshes their ``heartbeat_at`` every ``JOB_HEARTBEAT_SECONDS``.
+Any process requeues running jobs whose heartbeat is older than
+``JOB_HEARTBEAT_TIMEOUT_SECONDS``. Those are jobs of a process that died or
+stalled, never those of a live one. A process only records the outcome of jobs
+it still holds. The timeout must exceed the clock skew between hosts.
+
+Functions are registered with ``@job(name)`` and receive a fresh session plus
+the job's params. Each name may cap how many of its jobs run at once. The cap
+counts running jobs in the database, across all processes, and the claiming
+UPDATE checks it. On PostgreSQL an advisory lock per name serializes those
+claims; SQLite serializes writers anyway. The scheduler also enqueues jobs on
+cron-style schedules (``minute hour day-of-month month day-of-week``, with
+``*``, ``*/n``, ranges and lists). Each run is queued with its slot in
+``scheduled_for``, which is unique per name, so every process may run the
+schedule and each slot is still queued once. Runs missed while no process was
+up are not caught up.
+
+Schedules and job timestamps use the wall clock, unlike the business date of
+``get_datetime_obj``, which is what the jobs themselves compute against.
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update, insert, func, or_
+from sqlalchemy.exc import IntegrityError
+
+from app.models.database import async_session, Job
+from app.config.constants import (
+    CURRENT_USER, JOB_MAX_ATTEMPTS, JOB_RETRY_BACKOFF_SECONDS, JOB_SCHEDULES, JOB_HEARTBEAT_SECONDS,
+    JOB_HEARTBEAT_TIMEOUT_SECONDS
+)
+from app.config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+STATUSES = (QUEUED, RUNNING, SUCCEEDED, FAILED)
+
+# Job name -> _JobSpec, filled by @job
+JOBS = {}
+
+_running_jobs = Job.__table__.alias("running_jobs")
+
+
+class _JobSpec:
+    __slots__ = ("name", "run", "max_concurrency", "max_attempts")
+
+    def __init__(self, name, run, max_concurrency, max_attempts):
+        self.name = name
+        self.run = run
+        self.max_concurrency = max_concurrency
+        self.max_attempts = max_attempts
+
+
+def job(name: str, max_concurrency: int = 1, max_attempts: int = JOB_MAX_ATTEMPTS):
+    """Register ``async def run(session, **params) -> dict`` as the job ``name``."""
+    def register(run):
+        JOBS[name] = _JobSpec(name, run, max_concurrency, max_attempts)
+        return run
+    return register
+
+
+def _cron_field(spec: str, low: int, high: int):
+    values = set()
+    for part in spec.split(","):
+        step = 1
+        if "/" in part:
+            part, step = part.split("/")
+            step = int(step)
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, end = (int(value) for value in part.split("-"))
+        else:
+            start = end = int(part)
+            if step > 1:
+                end = high
+        if not low <= start <= end <= high or step < 1:
+            raise ValueError(f"Invalid cron field '{spec}'")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class Cron:
+    """A five-field cron expression; ``next_after`` gives the next matching minute."""
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression '{expression}' must have 5 fields")
+        self.expression = expression
+        self.minutes = _cron_field(fields[0], 0, 59)
+        self.hours = _cron_field(fields[1], 0, 23)
+        self.days = _cron_field(fields[2], 1, 31)
+        self.months = _cron_field(fields[3], 1, 12)
+        # Both 0 and 7 mean Sunday; Python's weekday() has Monday as 0
+        self.weekdays = {(day - 1) % 7 for day in _cron_field(fields[4], 0, 7)}
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day, weekday = moment.day in self.days, moment.weekday() in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day and weekday
+        # Standard cron: with both restricted, either one matching is enough
+        return day or weekday
+
+    def next_after(self, moment: datetime) -> datetime:
+        moment = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 5)
+        while moment < limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+        raise ValueError(f"Cron expression '{self.expression}' never matches")
+
+
+async def enqueue(session, name: str, params: dict = None, run_at: datetime = None,
+                  max_attempts: int = None, scheduled_for: datetime = None) -> int:
+    """Queue job ``name`` and commit; returns the job ID. Raises KeyError for unknown jobs.
+
+    ``scheduled_for`` marks a cron run; queueing the same name and slot twice
+    raises IntegrityError.
+    """
+    spec = JOBS[name]
+    now = datetime.now()
+    job_id = (await session.execute(insert(Job).values(
+        name=name,
+        params=json.dumps(params or {}),
+        status=QUEUED,
+        attempts=0,
+        max_attempts=max_attempts or spec.max_attempts,
+        run_at=run_at or now,
+        scheduled_for=scheduled_for,
+        created_by=CURRENT_USER,
+        created_at=now
+    ).returning(Job.id))).scalar_one()
+    await session.commit()
+    scheduler.wake()
+    return job_id
+
+
+def job_payload(row: Job) -> dict:
+    return {
+        "id": row.id,
+        "name": row.name,
+        "status": row.status,
+        "params": json.loads(row.params) if row.params else {},
+        "attempts": row.attempts,
+        "max_attempts": row.max_attempts,
+        "result": json.loads(row.result) if row.result else None,
+        "error": row.error,
+        "run_at": row.run_at.isoformat() if row.run_at else None,
+        "scheduled_for": row.scheduled_for.isoformat() if row.scheduled_for else None,
+        "worker_id": row.worker_id,
+        "heartbeat_at": row.heartbeat_at.isoformat() if row.heartbeat_at else None,
+        "created_by": row.created_by,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        "started_at": row.started_at.isoformat() if row.started_at else None,
+        "finished_at": row.finished_at.isoformat() if row.finished_at else None
+    }
+
+
+async def last_success(session, name: str):
+    """When job ``name`` last succeeded, or None."""
+    return await session.scalar(
+        select(Job.finished_at).where(Job.name == name, Job.status == SUCCEEDED)
+        .order_by(Job.finished_at.desc()).limit(1)
+    )
+
+
+class JobScheduler:
+    def __init__(self, session_factory=async_session, workers: int = None, poll_seconds: float = None,
+                 schedules: dict = None, heartbeat_seconds: float = JOB_HEARTBEAT_SECONDS,
+                 heartbeat_timeout_seconds: float = JOB_HEARTBEAT_TIMEOUT_SECONDS):
+        settings = get_settings()
+        self.session_factory = session_factory
+        self.workers = workers or settings.scheduler_workers
+        self.poll_seconds = poll_seconds or settings.scheduler_poll_seconds
+        self.schedules = {name: Cron(expression) for name, expression in (schedules or {}).items()}
+        self.heartbeat_seconds = heartbeat_seconds
+        self.heartbeat_timeout_seconds = heartbeat_timeout_seconds
+        self.worker_id = None
+        self.next_runs = {}
+        self.tasks = []
+        self._wakeup = asyncio.Event()
+
+    def wake(self):
+        self._wakeup.set()
+
+    async def start(self):
+        """Requeue jobs whose process stopped heartbeating and start the schedule, heartbeat and worker tasks."""
+        # Made here rather than in __init__ so forked workers never share one
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        await self._requeue_expired()
+
+        now = datetime.now()
+        self.next_runs = {name: cron.next_after(now) for name, cron in self.schedules.items()}
+        self.tasks = [asyncio.ensure_future(self._schedule_loop()), asyncio.ensure_future(self._heartbeat_loop())]
+        self.tasks += [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    def describe(self):
+        """The cron schedules and, while running, when each next fires."""
+        return [
+            {
+                "name": name,
+                "cron": cron.expression,
+                "next_run": self.next_runs[name].isoformat() if name in self.next_runs else None
+            }
+            for name, cron in self.schedules.items()
+        ]
+
+    async def _requeue_expired(self):
+        """Requeue running jobs whose heartbeat expired, without spending an attempt."""
+        expired = datetime.now() - timedelta(seconds=self.heartbeat_timeout_seconds)
+        async with self.session_factory() as session:
+            requeued = (await session.execute(
+                update(Job).where(
+                    Job.status == RUNNING, or_(Job.heartbeat_at.is_(None), Job.heartbeat_at < expired)
+                ).values(status=QUEUED, run_at=datetime.now(), worker_id=None, heartbeat_at=None)
+            )).rowcount
+            await session.commit()
+        if requeued:
+            logger.warning(f"Requeued {requeued} jobs whose process stopped heartbeating")
+            self.wake()
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                async with self.session_factory() as session:
+                    await session.execute(
+                        update(Job).where(Job.worker_id == self.worker_id, Job.status == RUNNING)
+                        .values(heartbeat_at=datetime.now())
+                    )
+                    await session.commit()
+                await self._requeue_expired()
+            except Exception as e:
+                logger.error(f"Job heartbeat failed: {e}")
+
+    async def _schedule_loop(self):
+        while True:
+            now = datetime.now()
+            for name, next_run in list(self.next_runs.items()):
+                if next_run <= now:
+                    self.next_runs[name] = self.schedules[name].next_after(now)
+                    try:
+                        async with self.session_factory() as session:
+                            await enqueue(session, name, run_at=next_run, scheduled_for=next_run)
+                    except IntegrityError:
+                        logger.debug(f"Scheduled job {name} at {next_run} already queued by another process")
+                    except Exception as e:
+                        logger.error(f"Could not enqueue scheduled job {name}: {e}")
+            if self.next_runs:
+                await asyncio.sleep(max(0.0, (min(self.next_runs.values()) - datetime.now()).total_seconds()))
+            else:
+                await asyncio.sleep(3600)
+
+    async def _claim(self):
+        """Mark the oldest due job whose name is below its concurrency cap as running.
+
+        The cap counts running jobs of every process and is checked again by
+        the claiming UPDATE, so racing claims cannot exceed it.
+        """
+        async with self.session_factory() as session:
+            running = dict((await session.execute(
+                select(Job.name, func.count()).where(Job.status == RUNNING).group_by(Job.name)
+            )).all())
+            # Names at their cap are skipped in the query, so their backlog never blocks other jobs
+            saturated = [name for name, spec in JOBS.items() if running.get(name, 0) >= spec.max_concurrency]
+            candidates = (await session.execute(
+                select(Job.id, Job.name).where(Job.status == QUEUED, Job.run_at <= datetime.now(),
+                                               Job.name.not_in(saturated))
+                .order_by(Job.run_at, Job.id).limit(self.workers)
+            )).all()
+            connection = await session.connection()
+            for job_id, name in candidates:
+                # Unknown names are claimed like any other so that _run marks them failed
+                cap = JOBS[name].max_concurrency if name in JOBS else 1
+                if connection.dialect.name == "postgresql":
+                    # Concurrent transactions would each count the others' claims as not yet committed
+                    await session.execute(select(func.pg_advisory_xact_lock(func.hashtext(name))))
+                running_now = select(func.count()).select_from(_running_jobs).where(
+                    _running_jobs.c.name == name, _running_jobs.c.status == RUNNING
+                ).scalar_subquery()
+                now = datetime.now()
+                claimed = (await session.execute(
+                    update(Job).where(Job.id == job_id, Job.status == QUEUED, running_now < cap)
+                    .values(status=RUNNING, attempts=Job.attempts + 1, started_at=now, worker_id=self.worker_id,
+                            heartbeat_at=now)
+                )).rowcount
+                await session.commit()
+                if claimed:
+                    return (await session.execute(select(Job).where(Job.id == job_id))).scalar_one()
+                connection = await session.connection()
+        return None
+
+    async def _worker(self):
+        while True:
+            try:
+                row = await self._claim()
+            except Exception as e:
+                logger.error(f"Job claim failed: {e}")
+                row = None
+            if row is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(row)
+
+    async def _run(self, row: Job):
+        spec = JOBS.get(row.name)
+        try:
+            if spec is None:
+                raise KeyError(f"No job registered as '{row.name}'")
+            async with self.session_factory() as session:
+                result = await spec.run(session, **json.loads(row.params or "{}"))
+            values = dict(status=SUCCEEDED, result=json.dumps(result), error=None, finished_at=datetime.now())
+        except asyncio.CancelledError:
+            # Stopped mid-run at shutdown: run it again on the next start, without spending an attempt
+            values = dict(status=QUEUED, attempts=row.attempts - 1, run_at=datetime.now())
+            raise
+        except Exception as e:
+            logger.error(f"Job {row.id} ({row.name}) attempt {row.attempts} failed: {e}")
+            if spec is not None and row.attempts < row.max_attempts:
+                delay = JOB_RETRY_BACKOFF_SECONDS * 2 ** (row.attempts - 1)
+                values = dict(status=QUEUED, run_at=datetime.now() + timedelta(seconds=delay), error=str(e))
+            else:
+                values = dict(status=FAILED, error=str(e), finished_at=datetime.now())
+        finally:
+            await self._record(row.id, values)
+
+    async def _record(self, job_id: int, values: dict):
+        """Record a job's outcome, unless its heartbeat expired and another process took it over meanwhile."""
+        if values["status"] != RUNNING:
+            values = dict(values, worker_id=None, heartbeat_at=None)
+        async with self.session_factory() as session:
+            recorded = (await session.execute(
+                update(Job).where(Job.id == job_id, Job.status == RUNNING, Job.worker_id == self.worker_id)
+                .values(**values)
+            )).rowcount
+            await session.commit()
+        if not recorded:
+            logger.warning(f"Job {job_id} was requeued by another process; its outcome here is dropped")
+
+
+scheduler = JobScheduler(schedules=JOB_SCHEDULES)
@@ -0,0 +1,41 @@
+"""Modules that load on first attribute access rather than at import.
+
+Importing the app used to load NumPy through every analytics service that
+routes.py pulls in, so a fresh worker paid for it before serving its first
+request, even if it only ever answered inventory reads. Modules here are
+registered in ``sys.modules`` as ``importlib.util.LazyLoader`` stubs: ``import``
+statements and ``from app.services.lazy_imports import numpy as np`` are free,
+and the first ``np.something`` executes the real module. Annotations that
+name ``np.ndarray`` count as access, so modules using them add
+``from __future__ import annotations``.
+
+The LLM stack needs none of this: the gateway imports langchain when it first
+builds its client.
+"""
+import importlib.util
+import sys
+
+
+def lazy_module(name: str):
+    """``name``'s module, or a stub that imports it when first used."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def is_loaded(name: str) -> bool:
+    """Whether ``name`` has been imported for real, not just registered lazily."""
+    module = sys.modules.get(name)
+    return module is not None and not isinstance(module, importlib.util._LazyModule)
+
+
+numpy = lazy_module("numpy")
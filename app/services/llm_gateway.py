@@ -0,0 +1,243 @@
+"""Shared gateway for every LLM call in the application.
+
+One ``LLMGateway`` owns the single Ollama client and adds, in order:
+
+1. a disk cache of completions keyed by a hash of model + prompt, with a TTL;
+2. coalescing, so identical prompts in flight share one model call;
+3. micro-batching, which gathers prompts arriving within a short window into a
+   single ``agenerate`` call;
+4. a semaphore capping how many ``agenerate`` calls run at once.
+
+``generate_json`` adds tolerant JSON extraction with re-prompting on failure.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from collections import Counter
+from functools import lru_cache
+
+from app.config.settings import get_settings
+from app.services.metrics import observe_llm_call, add_request_time
+
+_FENCE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+
+JSON_RETRY_SUFFIX = """
+
+Your previous answer could not be parsed. Respond with only the JSON value, without any explanation or code fences."""
+
+
+def parse_json(text: str):
+    """Extract the JSON value from a model completion.
+
+    Accepts bare JSON, JSON inside a Markdown code fence, or JSON surrounded by
+    prose. Raises ValueError if nothing parseable is found.
+    """
+    candidates = [text.strip()]
+    candidates += [match.strip() for match in _FENCE.findall(text)]
+    for opening, closing in (("[", "]"), ("{", "}")):
+        start, end = text.find(opening), text.rfind(closing)
+        if start != -1 and end > start:
+            candidates.append(text[start:end + 1])
+
+    for candidate in candidates:
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            continue
+    raise ValueError(f"No JSON value found in model output: {text[:200]!r}")
+
+
+class PromptCache:
+    """Completion cache with one JSON file per prompt hash."""
+
+    def __init__(self, directory: str, ttl: float):
+        self.directory = directory
+        self.ttl = ttl
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str):
+        try:
+            with open(self._path(key)) as handle:
+                entry = json.load(handle)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry["created_at"] > self.ttl:
+            self.discard(key)
+            return None
+        return entry["text"]
+
+    def set(self, key: str, text: str):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename so concurrent readers never see partial JSON
+        descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(descriptor, "w") as handle:
+            json.dump({"created_at": time.time(), "text": text}, handle)
+        os.replace(temp_path, path)
+
+    def discard(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+
+class LLMGateway:
+    def __init__(self, base_url: str, model: str, max_concurrency: int = 4, batch_size: int = 8,
+                 batch_window: float = 0.02, cache: PromptCache = None, max_retries: int = 2,
+                 timeout: int = 120, client=None):
+        self.base_url = base_url
+        self.model = model
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.cache = cache
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.client = client
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = {}
+        self.pending = []
+        self.flush_timer = None
+        # Running batch tasks; the event loop only keeps weak references to tasks
+        self.batches = set()
+        self.stats = Counter()
+
+    def _client(self):
+        if self.client is None:
+            from langchain.llms import Ollama
+            self.client = Ollama(base_url=self.base_url, model=self.model, timeout=self.timeout)
+        return self.client
+
+    def _key(self, prompt: str) -> str:
+        return hashlib.sha256(f"{self.model}\0{prompt}".encode()).hexdigest()
+
+    async def generate(self, prompt: str, use_cache: bool = True) -> str:
+        """Return the completion for ``prompt``, via cache, an in-flight twin or a batched call."""
+        key = self._key(prompt)
+        if use_cache and self.cache is not None:
+            text = self.cache.get(key)
+            if text is not None:
+                self.stats["cache_hits"] += 1
+                return text
+
+        started = time.perf_counter()
+        if key in self.in_flight:
+            self.stats["coalesced"] += 1
+            try:
+                return await asyncio.shield(self.in_flight[key])
+            finally:
+                add_request_time("llm", time.perf_counter() - started)
+
+        future = asyncio.get_running_loop().create_future()
+        # Nobody may be waiting on the shared future when it fails; mark the error retrieved
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self.in_flight[key] = future
+        try:
+            text = await self._submit(prompt)
+            if self.cache is not None:
+                self.cache.set(key, text)
+            future.set_result(text)
+            return text
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as error:
+            future.set_exception(error)
+            raise
+        finally:
+            del self.in_flight[key]
+            add_request_time("llm", time.perf_counter() - started)
+
+    async def generate_json(self, prompt: str):
+        """Generate and parse a JSON answer, re-prompting up to ``max_retries`` times."""
+        attempt_prompt = prompt
+        for attempt in range(self.max_retries + 1):
+            text = await self.generate(attempt_prompt)
+            try:
+                return parse_json(text)
+            except ValueError:
+                self.stats["parse_failures"] += 1
+                if self.cache is not None:
+                    self.cache.discard(self._key(attempt_prompt))
+                if attempt == self.max_retries:
+                    raise
+                attempt_prompt = prompt + JSON_RETRY_SUFFIX
+
+    def _submit(self, prompt: str):
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((prompt, future))
+        if len(self.pending) >= self.batch_size:
+            self._flush()
+        elif self.flush_timer is None:
+            self.flush_timer = asyncio.get_running_loop().call_later(self.batch_window, self._flush)
+        return future
+
+    def _flush(self):
+        if self.flush_timer is not None:
+            self.flush_timer.cancel()
+            self.flush_timer = None
+        while self.pending:
+            batch, self.pending = self.pending[:self.batch_size], self.pending[self.batch_size:]
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self.batches.add(task)
+            task.add_done_callback(self.batches.discard)
+
+    async def close(self):
+        """Cancel queued prompts and running batches and wait for the batches to finish; callers get CancelledError."""
+        if self.flush_timer is not None:
+            self.flush_timer.cancel()
+            self.flush_timer = None
+        pending, self.pending = self.pending, []
+        for _, future in pending:
+            future.cancel()
+        batches = list(self.batches)
+        for task in batches:
+            task.cancel()
+        await asyncio.gather(*batches, return_exceptions=True)
+
+    async def _run_batch(self, batch):
+        prompts = [prompt for prompt, _ in batch]
+        async with self.semaphore:
+            self.stats["model_calls"] += 1
+            self.stats["prompts_sent"] += len(prompts)
+            started = time.perf_counter()
+            try:
+                result = await self._client().agenerate(prompts)
+            except asyncio.CancelledError:
+                for _, future in batch:
+                    future.cancel()
+                raise
+            except Exception as error:
+                observe_llm_call(time.perf_counter() - started, prompts, None, failed=True)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                return
+            finally:
+                self.stats["model_seconds"] += time.perf_counter() - started
+            observe_llm_call(time.perf_counter() - started, prompts, result.generations)
+
+        for (_, future), generations in zip(batch, result.generations):
+            if not future.done():
+                future.set_result(generations[0].text)
+
+
+@lru_cache()
+def get_llm_gateway() -> LLMGateway:
+    settings = get_settings()
+    return LLMGateway(
+        base_url=settings.ollama_base_url,
+        model=settings.ollama_model,
+        max_concurrency=settings.llm_max_concurrency,
+        batch_size=settings.llm_batch_size,
+        batch_window=settings.llm_batch_window_ms / 1000,
+        cache=PromptCache(settings.llm_cache_dir, settings.llm_cache_ttl_seconds),
+        max_retries=settings.llm_max_retries,
+        timeout=settings.llm_timeout_seconds
+    )
@@ -0,0 +1,371 @@
+"""Request metrics in the Prometheus text format, and an opt-in per-request profiler.
+
+``MetricsMiddleware`` times every HTTP request and, through a per-request
+``RequestStats`` in a context variable, adds up where the time went:
+
+- SQL, from SQLAlchemy cursor events on every engine (query count and time)
+- the LLM gateway (time spent waiting for completions)
+- the analytics executor (forecasting and price optimization)
+
+Per route (the path template, e.g. ``/api/inventory/{store_id}``) it records
+request counts by status and latency histograms overall and per phase, and
+sends the phases as a ``Server-Timing`` header, so a slow response shows in
+the browser's network panel whether SQL, the model or NumPy took the time.
+Model calls, token counts and analytics calls have their own histograms, and
+components that keep a ``stats()``/``Counter`` (response cache, LLM gateway,
+analytics executor, event broker) are read at scrape time through
+``REGISTRY.add_stats``. ``GET /metrics`` renders it all.
+
+With ``profiling_enabled`` set, ``?profile=1`` on any request runs it under
+pyinstrument when installed, cProfile otherwise, writes the report to
+``profile_dir`` and names the file, relative to ``profile_dir``, in an
+``X-Profile-Report`` header. Profiled requests bypass the response cache. One
+request is profiled at a time.
+pyinstrument follows the request's task across awaits; cProfile sees the whole
+thread, so concurrent requests show up in its report too.
+"""
+import contextvars
+import os
+import re
+import time
+from datetime import datetime
+from urllib.parse import parse_qsl, urlencode
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+from app.services.prompt_context import estimate_tokens
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500, 1000)
+TOKEN_BUCKETS = (16, 64, 256, 512, 1024, 2048, 4096, 8192)
+PHASES = ("db", "llm", "analytics")
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.values = {}
+
+    def inc(self, *labels, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in sorted(self.values.items()):
+            yield f"{self.name}{_labels(self.label_names, labels)} {_number(value)}"
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket (not cumulative) + overflow, sum, count]
+        self.values = {}
+
+    def observe(self, value: float, *labels):
+        entry = self.values.get(labels)
+        if entry is None:
+            entry = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        index = 0
+        while index < len(self.buckets) and value > self.buckets[index]:
+            index += 1
+        entry[0][index] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, (counts, total, count) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                le = f'le="{_number(bound)}"'
+                yield f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.label_names, labels)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.label_names, labels)} {count}"
+
+
+class Registry:
+    def __init__(self, prefix: str = "retail"):
+        self.prefix = prefix
+        self.metrics = []
+        self.stats_sources = []
+
+    def counter(self, name: str, help: str, labels=()) -> Counter:
+        metric = Counter(f"{self.prefix}_{name}", help, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(f"{self.prefix}_{name}", help, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def add_stats(self, component: str, source):
+        """Export ``source()``'s numeric values as ``<prefix>_<component>_<key>`` gauges at scrape time."""
+        self.stats_sources.append((component, source))
+
+    def _stats_lines(self):
+        for component, source in self.stats_sources:
+            for key, value in sorted(dict(source() or {}).items()):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"{self.prefix}_{component}_{re.sub(r'[^a-zA-Z0-9_]', '_', key)}"
+                yield f"# TYPE {name} gauge"
+                yield f"{name} {_number(value)}"
+
+    def render(self) -> str:
+        lines = [line for metric in self.metrics for line in metric.render()]
+        lines.extend(self._stats_lines())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+http_requests = REGISTRY.counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+)
+http_latency = REGISTRY.histogram(
+    "http_request_duration_seconds", "Time from request to the last response byte", ("method", "route")
+)
+http_phase_latency = REGISTRY.histogram(
+    "http_request_phase_seconds", "Time per request spent in SQL, LLM calls and analytics", ("route", "phase")
+)
+http_queries = REGISTRY.histogram(
+    "http_request_db_queries", "SQL statements executed per request", ("route",), QUERY_COUNT_BUCKETS
+)
+db_query_latency = REGISTRY.histogram("db_query_duration_seconds", "SQL statement execution time", ("operation",))
+db_query_errors = REGISTRY.counter("db_query_errors_total", "SQL statements that raised", ("operation",))
+llm_call_latency = REGISTRY.histogram(
+    "llm_call_duration_seconds", "Model calls made by the LLM gateway, per batch", ("outcome",)
+)
+llm_prompts = REGISTRY.counter("llm_prompts_total", "Prompts sent to the model")
+llm_tokens = REGISTRY.counter("llm_tokens_total", "Prompt and completion tokens of model calls", ("kind",))
+llm_prompt_tokens = REGISTRY.histogram(
+    "llm_prompt_tokens", "Prompt tokens per prompt sent to the model", buckets=TOKEN_BUCKETS
+)
+analytics_latency = REGISTRY.histogram(
+    "analytics_call_duration_seconds", "CPU-bound analytics calls, inline or in the process pool",
+    ("function", "mode")
+)
+
+
+class RequestStats:
+    __slots__ = ("db_queries", "db", "llm", "analytics")
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db = 0.0
+        self.llm = 0.0
+        self.analytics = 0.0
+
+
+_request_stats = contextvars.ContextVar("request_stats", default=None)
+
+
+def request_stats():
+    """The current request's ``RequestStats``, or ``None`` outside a request."""
+    return _request_stats.get()
+
+
+def _operation(statement: str) -> str:
+    word = statement.lstrip().split(None, 1)[:1]
+    return word[0].lower() if word else "other"
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    db_query_latency.observe(elapsed, _operation(statement))
+    # SQLAlchemy's async engines run this in a greenlet that shares the caller's context
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.db_queries += 1
+        stats.db += elapsed
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        started.pop()
+    db_query_errors.inc(_operation(context.statement or ""))
+
+
+def observe_llm_call(seconds: float, prompts, completions, failed: bool = False):
+    """Record one model call of the gateway; ``completions`` are langchain generations or ``None``."""
+    llm_call_latency.observe(seconds, "error" if failed else "ok")
+    llm_prompts.inc(amount=len(prompts))
+    for index, prompt in enumerate(prompts):
+        generation = completions[index][0] if completions else None
+        # Ollama reports exact counts in generation_info; other clients get an estimate
+        info = getattr(generation, "generation_info", None) or {}
+        prompt_tokens = info.get("prompt_eval_count") or estimate_tokens(prompt)
+        llm_prompt_tokens.observe(prompt_tokens)
+        llm_tokens.inc("prompt", amount=prompt_tokens)
+        if generation is not None:
+            llm_tokens.inc("completion", amount=info.get("eval_count") or estimate_tokens(generation.text))
+
+
+def add_request_time(phase: str, seconds: float):
+    """Add ``seconds`` of ``phase`` (one of ``PHASES``) to the current request, if any."""
+    stats = _request_stats.get()
+    if stats is not None:
+        setattr(stats, phase, getattr(stats, phase) + seconds)
+
+
+def _route_template(scope) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    app, endpoint = scope.get("app"), scope.get("endpoint")
+    if app is None or endpoint is None:
+        return "unmatched"
+    templates = getattr(app.state, "route_templates", None)
+    if templates is None:
+        templates = app.state.route_templates = {
+            getattr(route, "endpoint", None) or getattr(route, "app", None): route.path for route in app.routes
+        }
+    return templates.get(endpoint, "unmatched")
+
+
+class _Profile:
+    """One profiled request: pyinstrument when installed, else cProfile."""
+
+    active = False
+
+    def __init__(self, directory: str, path: str):
+        try:
+            from pyinstrument import Profiler
+            self.profiler = Profiler(async_mode="enabled")
+            extension = "html"
+        except ImportError:
+            import cProfile
+            self.profiler = cProfile.Profile()
+            extension = "txt"
+        slug = re.sub(r"[^a-zA-Z0-9]+", "-", path).strip("-") or "root"
+        # Only the file name goes out in X-Profile-Report, never the server's directory layout
+        self.name = f"{datetime.now():%Y%m%d-%H%M%S-%f}-{slug}.{extension}"
+        self.path = os.path.join(directory, self.name)
+        os.makedirs(directory, exist_ok=True)
+
+    def start(self):
+        _Profile.active = True
+        if hasattr(self.profiler, "enable"):
+            self.profiler.enable()
+        else:
+            self.profiler.start()
+
+    def stop(self):
+        try:
+            if hasattr(self.profiler, "disable"):
+                import io
+                import pstats
+
+                self.profiler.disable()
+                report = io.StringIO()
+                pstats.Stats(self.profiler, stream=report).sort_stats("cumulative").print_stats(80)
+                text = report.getvalue()
+            else:
+                self.profiler.stop()
+                text = self.profiler.output_html()
+            with open(self.path, "w") as f:
+                f.write(text)
+        finally:
+            _Profile.active = False
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request metrics and running ``?profile=1`` requests under a profiler."""
+
+    def __init__(self, app, profiling: bool = False, profile_dir: str = "profiles"):
+        self.app = app
+        self.profiling = profiling
+        self.profile_dir = profile_dir
+
+    def _profile(self, scope):
+        """Strip ``profile`` from the query string; returns a ``_Profile`` to run, "busy" or ``None``."""
+        query = parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True)
+        if not any(name == "profile" for name, _ in query):
+            return None
+        wanted = any(name == "profile" and value not in ("0", "false") for name, value in query)
+        scope["query_string"] = urlencode([(name, value) for name, value in query if name != "profile"]).encode()
+        if not wanted:
+            return None
+        if _Profile.active:
+            return "busy"
+        scope.setdefault("state", {})["profile"] = True
+        return _Profile(self.profile_dir, scope["path"])
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = self._profile(scope) if self.profiling else None
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                timings = [f"app;dur={(time.perf_counter() - started) * 1000:.1f}",
+                           f'db;dur={stats.db * 1000:.1f};desc="{stats.db_queries} queries"']
+                timings.extend(f"{phase};dur={getattr(stats, phase) * 1000:.1f}"
+                               for phase in PHASES[1:] if getattr(stats, phase))
+                headers.append("Server-Timing", ", ".join(timings))
+                if profile == "busy":
+                    headers.append("X-Profile-Report", "busy")
+                elif profile is not None:
+                    headers.append("X-Profile-Report", profile.name)
+            await send(message)
+
+        if isinstance(profile, _Profile):
+            profile.start()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            if isinstance(profile, _Profile):
+                profile.stop()
+            _request_stats.reset(token)
+            elapsed = time.perf_counter() - started
+            route = _route_template(scope)
+            http_requests.inc(scope["method"], route, str(status))
+            http_latency.observe(elapsed, scope["method"], route)
+            http_queries.observe(stats.db_queries, route)
+            for phase in PHASES:
+                http_phase_latency.observe(getattr(stats, phase), route, phase)
@@ -0,0 +1,119 @@
+"""Vectorized price optimization under constant-elasticity demand.
+
+Demand for a (store, product) series at price ``p`` is modelled as
+``q(p) = q0 * (p / p0) ** e`` around the current price ``p0`` and daily demand
+``q0``, with price elasticity ``e < 0``. Elasticities are estimated per product
+from daily sales and prices, and every series is optimized at once with array
+operations; nothing is random, so the same inputs always give the same prices.
+"""
+from __future__ import annotations
+
+from app.services.lazy_imports import numpy as np
+
+OBJECTIVES = ("margin", "revenue")
+DEFAULT_OBJECTIVE = "margin"
+# Typical retail elasticity, used where the data shows no price variation
+DEFAULT_ELASTICITY = -1.5
+ELASTICITY_BOUNDS = (-4.0, -0.3)
+# Unit cost as a share of price for products without a recorded cost
+DEFAULT_COST_RATIO = 0.6
+DEFAULT_MAX_CHANGE = 0.10
+MIN_MARGIN = 0.05
+# Weight of the prior, in units of summed squared log-price deviation
+# (30 days of a 10% price difference is about 0.07)
+SHRINKAGE = 0.05
+SELL_THROUGH_DAYS = 14
+
+
+def estimate_elasticity(prices: np.ndarray, quantities: np.ndarray, product_index: np.ndarray,
+                        product_category: np.ndarray, prior: float = DEFAULT_ELASTICITY,
+                        shrinkage: float = SHRINKAGE) -> np.ndarray:
+    """Per-product elasticities from ``(n_series, n_days)`` price and quantity matrices.
+
+    Each series contributes the log-log least-squares moments of quantity on
+    price over its days with sales; ``product_index`` maps series to products,
+    whose moments are pooled across stores. Products are shrunk toward their
+    category (``product_category`` maps products to category numbers), and
+    categories toward ``prior``, so products whose price never moved get the
+    category estimate and categories without variation get the prior.
+    """
+    prices = np.asarray(prices, dtype=float)
+    quantities = np.asarray(quantities, dtype=float)
+    product_category = np.asarray(product_category)
+    n_products = len(product_category)
+    n_categories = int(product_category.max()) + 1 if n_products else 0
+
+    sold = (quantities > 0) & (prices > 0)
+    log_price = np.log(np.where(sold, prices, 1))
+    log_quantity = np.log(np.where(sold, quantities, 1))
+    days = np.maximum(sold.sum(axis=1, keepdims=True), 1)
+    x = (log_price - (log_price * sold).sum(axis=1, keepdims=True) / days) * sold
+    y = (log_quantity - (log_quantity * sold).sum(axis=1, keepdims=True) / days) * sold
+
+    product_sxx = np.bincount(product_index, (x * x).sum(axis=1), n_products)
+    product_sxy = np.bincount(product_index, (x * y).sum(axis=1), n_products)
+    category_sxx = np.bincount(product_category, product_sxx, n_categories)
+    category_sxy = np.bincount(product_category, product_sxy, n_categories)
+
+    category = (category_sxy + shrinkage * prior) / (category_sxx + shrinkage)
+    product = (product_sxy + shrinkage * category[product_category]) / (product_sxx + shrinkage)
+    return np.clip(product, *ELASTICITY_BOUNDS)
+
+
+def optimize(price, cost, demand, stock, elasticity, objective: str = DEFAULT_OBJECTIVE,
+             max_change: float = DEFAULT_MAX_CHANGE, min_margin: float = MIN_MARGIN, price_floor=None,
+             sell_through_days: float = SELL_THROUGH_DAYS):
+    """Best price for every series; all array arguments broadcast together.
+
+    ``objective`` is "margin" (``(p - cost) * q``) or "revenue" (``p * q``).
+    Prices move at most ``max_change`` from the current price, never go below
+    ``cost * (1 + min_margin)`` or ``price_floor``, and are raised when the
+    expected demand over ``sell_through_days`` would exceed the stock on hand.
+    Series without demand keep their price unless it is below the floor.
+
+    Returns ``(suggested_price, expected_daily_demand)``.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown pricing objective '{objective}', expected one of {', '.join(OBJECTIVES)}")
+    price, cost, demand, stock, elasticity = np.broadcast_arrays(*(
+        np.asarray(value, dtype=float) for value in (price, cost, demand, stock, elasticity)
+    ))
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        if objective == "margin":
+            # (p - c) * p ** e peaks at the markup price c * e / (1 + e) when demand is
+            # elastic and keeps growing with p when it is not
+            target = np.where(elasticity < -1, cost * elasticity / (1 + elasticity), np.inf)
+        else:
+            # p * p ** e rises with p for inelastic demand and falls for elastic demand
+            target = np.where(elasticity > -1, np.inf, np.where(elasticity < -1, 0.0, price))
+        # Lowest price at which the stock lasts sell_through_days; both objectives are
+        # unimodal in p, so raising the target to it gives the constrained optimum
+        scarcity = price * (np.maximum(stock, 0) / (demand * sell_through_days)) ** (1 / elasticity)
+        target = np.maximum(target, np.where(demand > 0, scarcity, 0.0))
+
+    lower = np.maximum(price * (1 - max_change), cost * (1 + min_margin))
+    if price_floor is not None:
+        lower = np.maximum(lower, price_floor)
+    upper = np.maximum(price * (1 + max_change), lower)
+    suggested = np.where(demand > 0, np.clip(target, lower, upper), np.maximum(price, lower))
+    suggested = np.round(suggested, 2)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        expected = np.where(price > 0, demand * (suggested / price) ** elasticity, demand)
+    return suggested, expected
+
+
+def suggest_prices(price, cost, stock, prices, quantities, product_index, product_category,
+                   objective: str = DEFAULT_OBJECTIVE, max_change: float = DEFAULT_MAX_CHANGE):
+    """Estimate elasticities and optimize every series in one call, for running in a worker process.
+
+    ``prices`` and ``quantities`` are the ``(n_series, n_days)`` history matrices;
+    ``product_index`` maps series to products and ``product_category`` products
+    to categories, as for ``estimate_elasticity``. Returns a dict of arrays
+    aligned with the series: suggested_price, demand, expected_demand and elasticity.
+    """
+    elasticity = estimate_elasticity(prices, quantities, product_index, product_category)[product_index]
+    demand = np.asarray(quantities, dtype=float).mean(axis=1)
+    suggested, expected = optimize(price, cost, demand, stock, elasticity, objective, max_change)
+    return {"suggested_price": suggested, "demand": demand, "expected_demand": expected, "elasticity": elasticity}
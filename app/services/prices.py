@@ -0,0 +1,183 @@
+"""Price changes with an append-only history.
+
+Every price change, single or bulk, goes through ``change_prices``. Catalog-wide
+changes update ``products.price``; store-scoped ones set
+``store_inventory.store_price``, which overrides the catalog price for that
+store only. Each applied change appends one ``price_history`` row with the old
+and new price, so price paths can be reconstructed for elasticity estimation.
+
+A batch is applied with a few set-based statements whatever its size: one read
+of the current prices per few thousand keys, then one executemany per table.
+"""
+from collections import namedtuple
+from datetime import datetime
+
+from app.services.lazy_imports import numpy as np
+from sqlalchemy import select, update, insert, bindparam, tuple_
+
+from app.models.database import Product, StoreInventory, PriceHistory
+from app.models.bulk import executemany, datetime_converter
+from app.config.constants import CURRENT_USER, get_datetime_obj
+
+_products = Product.__table__
+_inventory = StoreInventory.__table__
+
+_set_catalog_price = update(_products).where(_products.c.id == bindparam("b_id")).values(
+    price=bindparam("b_price"), last_updated=bindparam("b_time")
+)
+_set_store_price = update(_inventory).where(
+    _inventory.c.store_id == bindparam("b_store_id"),
+    _inventory.c.product_id == bindparam("b_product_id")
+).values(store_price=bindparam("b_price"))
+_KEYS_PER_QUERY = 5000
+
+AppliedPrice = namedtuple("AppliedPrice", ["store_id", "product_id", "old_price", "new_price"])
+
+
+def effective_price(inventory: StoreInventory, product: Product):
+    """The price a store charges: its own price if set, else the catalog price."""
+    return inventory.store_price if inventory.store_price is not None else product.price
+
+
+async def _current_prices(session, catalog_ids, store_keys):
+    """Current catalog prices by product_id and store prices by (store_id, product_id).
+
+    A store key maps to the store's effective price, and is absent if the store
+    does not stock the product.
+    """
+    catalog, stores = {}, {}
+    for start in range(0, len(catalog_ids), _KEYS_PER_QUERY):
+        result = await session.execute(
+            select(_products.c.id, _products.c.price).where(
+                _products.c.id.in_(catalog_ids[start:start + _KEYS_PER_QUERY])
+            )
+        )
+        catalog.update(result.all())
+    for start in range(0, len(store_keys), _KEYS_PER_QUERY):
+        result = await session.execute(
+            select(_inventory.c.store_id, _inventory.c.product_id, _inventory.c.store_price, _products.c.price)
+            .join(_products, _inventory.c.product_id == _products.c.id)
+            .where(tuple_(_inventory.c.store_id, _inventory.c.product_id).in_(
+                store_keys[start:start + _KEYS_PER_QUERY]
+            ))
+        )
+        for store_id, product_id, store_price, price in result:
+            stores[(store_id, product_id)] = store_price if store_price is not None else price
+    return catalog, stores
+
+
+async def change_prices(session, changes, user: str = CURRENT_USER, reason: str = None):
+    """Apply ``(store_id, product_id, new_price)`` changes; ``store_id`` None means catalog-wide.
+
+    The last change per (store_id, product_id) wins. Changes to unknown products,
+    or to products the store does not stock, are reported as missing; changes
+    to the current price are skipped. Returns ``(applied, missing, unchanged)``
+    with ``applied`` a list of ``AppliedPrice``. Does not commit.
+    """
+    latest = {}
+    for store_id, product_id, new_price in changes:
+        latest[(store_id, product_id)] = round(float(new_price), 2)
+    if not latest:
+        return [], [], 0
+
+    catalog_ids = [product_id for store_id, product_id in latest if store_id is None]
+    store_keys = [key for key in latest if key[0] is not None]
+    catalog, stores = await _current_prices(session, catalog_ids, store_keys)
+
+    applied, missing, unchanged = [], [], 0
+    for (store_id, product_id), new_price in latest.items():
+        current = catalog if store_id is None else stores
+        key = product_id if store_id is None else (store_id, product_id)
+        old_price = current.get(key)
+        if key not in current:
+            missing.append((store_id, product_id))
+        elif old_price == new_price:
+            unchanged += 1
+        else:
+            applied.append(AppliedPrice(store_id, product_id, old_price, new_price))
+
+    connection = await session.connection()
+    convert = datetime_converter(connection)
+    changed_at = convert(get_datetime_obj())
+    await executemany(connection, _set_catalog_price, ["b_price", "b_time", "b_id"], [
+        (change.new_price, changed_at, change.product_id) for change in applied if change.store_id is None
+    ])
+    await executemany(connection, _set_store_price, ["b_price", "b_store_id", "b_product_id"], [
+        (change.new_price, change.store_id, change.product_id) for change in applied if change.store_id is not None
+    ])
+    history = PriceHistory.__table__
+    await executemany(connection, insert(history), [
+        "product_id", "store_id", "old_price", "new_price", "reason", "changed_by", "changed_at"
+    ], [
+        (change.product_id, change.store_id, change.old_price, change.new_price, reason, user, changed_at)
+        for change in applied
+    ])
+    return applied, missing, unchanged
+
+
+async def affected_prices(session, applied):
+    """New effective price per (store_id, product_id) touched by ``applied`` changes.
+
+    A catalog change reaches every store stocking the product, except stores
+    with their own price for it.
+    """
+    catalog = {change.product_id: change.new_price for change in applied if change.store_id is None}
+    affected = {(change.store_id, change.product_id): change.new_price for change in applied if change.store_id}
+    product_ids = list(catalog)
+    for start in range(0, len(product_ids), _KEYS_PER_QUERY):
+        result = await session.execute(
+            select(_inventory.c.store_id, _inventory.c.product_id).where(
+                _inventory.c.product_id.in_(product_ids[start:start + _KEYS_PER_QUERY]),
+                _inventory.c.store_price.is_(None)
+            )
+        )
+        for store_id, product_id in result:
+            affected.setdefault((store_id, product_id), catalog[product_id])
+    return affected
+
+
+async def price_matrix(session, series, current_prices, start, days: int):
+    """Daily effective price per (store_id, product_id) in ``series`` for ``[start, start + days)``.
+
+    Starts from ``current_prices`` and walks ``price_history`` backwards: before
+    each change the series had the change's old price. A series follows its
+    store-scoped changes once it has any in the window, otherwise the catalog's.
+    A change takes effect on the day it was made.
+    """
+    prices = np.repeat(np.asarray(current_prices, dtype=float)[:, None], days, axis=1)
+    if not series:
+        return prices
+
+    rows_by_key = {}
+    for row, key in enumerate(series):
+        rows_by_key.setdefault(key, []).append(row)
+    rows_by_product = {}
+    for (store_id, product_id), rows in rows_by_key.items():
+        rows_by_product.setdefault(product_id, []).extend(rows)
+    product_ids = list(rows_by_product)
+
+    first = datetime.combine(start, datetime.min.time())
+    changes = []
+    for offset in range(0, len(product_ids), _KEYS_PER_QUERY):
+        result = await session.execute(
+            select(PriceHistory.store_id, PriceHistory.product_id, PriceHistory.old_price,
+                   PriceHistory.changed_at, PriceHistory.id)
+            .where(PriceHistory.product_id.in_(product_ids[offset:offset + _KEYS_PER_QUERY]),
+                   PriceHistory.changed_at >= first)
+        )
+        changes.extend(result.all())
+
+    store_scoped = {(change.store_id, change.product_id) for change in changes if change.store_id is not None}
+    # Newest first (by time, then insertion), so older changes overwrite the earlier days last
+    changes.sort(key=lambda change: (change.changed_at, change.id), reverse=True)
+    for store_id, product_id, old_price, changed_at, _ in changes:
+        day = (changed_at.date() - start).days
+        if day <= 0:
+            continue
+        if store_id is None:
+            rows = [row for row in rows_by_product[product_id] if (series[row][0], product_id) not in store_scoped]
+        else:
+            rows = rows_by_key.get((store_id, product_id), [])
+        prices[rows, :min(day, days)] = old_price
+    return prices
+
@@ -0,0 +1,53 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.services.price_engine import suggest_prices, DEFAULT_OBJECTIVE, DEFAULT_MAX_CHANGE, DEFAULT_COST_RATIO
+from app.services.forecast_engine import DEFAULT_HISTORY_DAYS
+from app.services.rollups import daily_sales_matrix
+from app.services.prices import price_matrix
+from app.services.analytics import analytics
+from app.config.constants import get_datetime_obj
+from datetime import timedelta
+from app.services.lazy_imports import numpy as np
+
+
+class PricingService:
+    def __init__(self, session: AsyncSession, history_days: int = DEFAULT_HISTORY_DAYS):
+        self.session = session
+        self.history_days = history_days
+
+    def history_window(self):
+        end = get_datetime_obj().date() + timedelta(days=1)
+        return end - timedelta(days=self.history_days), end
+
+    async def load_prices(self, series, current_prices):
+        """Daily price matrix aligned with ``series``, reconstructed from ``price_history``."""
+        start, _ = self.history_window()
+        return await price_matrix(self.session, series, current_prices, start, self.history_days)
+
+    async def optimize_items(self, items, objective: str = DEFAULT_OBJECTIVE, max_change: float = DEFAULT_MAX_CHANGE):
+        """Suggest prices for inventory rows (see ``_inventory_query`` in the API routes) in one computation.
+
+        Elasticities are estimated from the daily sales and prices of these rows,
+        pooled per product across the stores present. Returns a dict of arrays
+        aligned with ``items``: price, suggested_price, cost, demand,
+        expected_demand and elasticity.
+        """
+        series = [(item.store_id, item.product_id) for item in items]
+        start, _ = self.history_window()
+        quantities = await daily_sales_matrix(self.session, series, start, self.history_days)
+        price = np.array([item.price or 0.0 for item in items], dtype=float)
+        prices = await self.load_prices(series, price)
+
+        product_ids, product_index = np.unique([product_id for _, product_id in series], return_inverse=True)
+        first_row = np.unique(product_index, return_index=True)[1]
+        _, product_category = np.unique([str(items[row].category) for row in first_row], return_inverse=True)
+
+        cost = np.array([
+            item.unit_cost if item.unit_cost is not None else current * DEFAULT_COST_RATIO
+            for item, current in zip(items, price)
+        ], dtype=float)
+        stock = np.array([item.stock_level for item in items], dtype=float)
+        result = await analytics.run(
+            suggest_prices, price, cost, stock, prices, quantities, product_index, product_category,
+            objective, max_change
+        )
+        return {"price": price, "cost": cost, **result}
@@ -0,0 +1,182 @@
+"""Compact, budgeted encodings of store data for LLM prompts.
+
+Prompts used to embed ``json.dumps`` of every inventory row or sale, so prompt
+size (and local-model latency, which grows with prompt tokens) scaled with data
+volume. These encoders instead emit one pipe-separated row per product with
+aggregates (average daily sales, trend, days of cover, days since update), list
+only anomalous sales days, and name the usual last updater once. Rows are
+ordered by urgency and added until the token budget is spent; the rest are
+summarized in a single line.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+
+from app.services.lazy_imports import numpy as np
+
+# Rough size of a token for English text and numbers; good enough for budgeting
+CHARS_PER_TOKEN = 4
+RECENT_DAYS = 7
+ANOMALY_Z = 3.0
+MAX_ANOMALIES_PER_PRODUCT = 3
+# Ignore "spikes" of a few units on slow movers
+MIN_SPIKE_UNITS = 5
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def sales_profile(history: np.ndarray, recent_days: int = RECENT_DAYS, z: float = ANOMALY_Z):
+    """Per-row average, recent trend and anomaly mask of a ``(series, days)`` sales matrix.
+
+    The trend is the change of the last ``recent_days`` average over the earlier
+    average (NaN when there were no earlier sales). A day is anomalous when it
+    lies more than ``z`` standard deviations above the row mean and is at least
+    twice the mean and ``MIN_SPIKE_UNITS``.
+    """
+    history = np.asarray(history, dtype=float)
+    average = history.mean(axis=1)
+    recent = history[:, -recent_days:].mean(axis=1)
+    earlier = history[:, :-recent_days].mean(axis=1) if history.shape[1] > recent_days else recent
+    with np.errstate(divide="ignore", invalid="ignore"):
+        trend = np.where(earlier > 0, recent / earlier - 1, np.nan)
+    spread = history.std(axis=1, keepdims=True)
+    anomalies = (
+        (spread > 0) & (history > average[:, None] + z * spread)
+        & (history >= 2 * average[:, None]) & (history >= MIN_SPIKE_UNITS)
+    )
+    return average, trend, anomalies
+
+
+def _number(value: float) -> str:
+    return f"{value:.1f}".rstrip("0").rstrip(".") if value % 1 else str(int(value))
+
+
+def _trend(value: float, recent_sales: bool) -> str:
+    if np.isnan(value):
+        return "new" if recent_sales else "-"
+    return f"{value:+.0%}"
+
+
+def _timestamp(value) -> str:
+    return value.strftime("%Y-%m-%d %H:%M") if isinstance(value, datetime) else str(value)
+
+
+class _Budget:
+    """Accumulates lines while their estimated token count stays within ``limit``."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.lines = []
+        self.used = 0
+
+    def fits(self, line: str, reserve: int = 0) -> bool:
+        return self.used + estimate_tokens(line) + 1 + reserve <= self.limit
+
+    def add(self, line: str, reserve: int = 0) -> bool:
+        if not self.fits(line, reserve):
+            return False
+        self.lines.append(line)
+        self.used += estimate_tokens(line) + 1
+        return True
+
+    def text(self) -> str:
+        return "\n".join(self.lines)
+
+
+def encode_inventory(store_id: str, inventory, history: np.ndarray, start: date, now: datetime,
+                     budget: int) -> str:
+    """Encode a store's inventory and recent sales within roughly ``budget`` tokens.
+
+    ``inventory`` is a list of mappings with product_id, name, current_stock,
+    min_threshold, last_updated_by and last_updated_at; ``history`` is the
+    matching daily sales matrix starting at ``start``.
+    """
+    days = history.shape[1]
+    average, trend, anomalies = sales_profile(history)
+    recent_sales = history[:, -RECENT_DAYS:].sum(axis=1) > 0
+    stock = np.array([max(row["current_stock"], 0) for row in inventory], dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cover = np.where(average > 0, stock / average, np.inf)
+
+    # Below-threshold rows first, then the fewest days of cover
+    order = sorted(range(len(inventory)), key=lambda row: (
+        inventory[row]["current_stock"] >= inventory[row]["min_threshold"], cover[row]
+    ))
+
+    users = [row["last_updated_by"] for row in inventory]
+    common_user = max(set(users), key=users.count) if users else None
+
+    out = _Budget(budget)
+    out.add(f"Store {store_id} at {_timestamp(now)}; sales {start.isoformat()}..{(start + timedelta(days=days - 1)).isoformat()}")
+    out.add(f"avg=units/day, trend=last {RECENT_DAYS}d vs before, cover=days of stock at avg, "
+            f"upd=days since last update (by {common_user} unless noted)")
+    out.add("id|name|stock|min|avg|trend|cover|upd|note")
+
+    footer_reserve = 40
+    included = []
+    for row in order:
+        item = inventory[row]
+        updated = item["last_updated_at"]
+        line = "|".join([
+            item["product_id"], item["name"], str(item["current_stock"]), str(item["min_threshold"]),
+            _number(round(average[row], 1)), _trend(trend[row], recent_sales[row]),
+            "-" if np.isinf(cover[row]) else _number(round(cover[row], 1)),
+            str((now - updated).days) if isinstance(updated, datetime) else "-",
+            "" if users[row] == common_user else f"by {users[row]}"
+        ])
+        if not out.add(line, reserve=footer_reserve):
+            break
+        included.append(row)
+
+    omitted = order[len(included):]
+    if omitted:
+        short = sum(inventory[row]["current_stock"] < inventory[row]["min_threshold"] for row in omitted)
+        lowest = min(cover[row] for row in omitted)
+        out.add(f"(+{len(omitted)} more products omitted, {short} of them below minimum, lowest cover "
+                + ("-" if np.isinf(lowest) else f"{_number(round(lowest, 1))} days") + ")")
+
+    spikes = []
+    for row in included:
+        days_hit = np.flatnonzero(anomalies[row])[-MAX_ANOMALIES_PER_PRODUCT:]
+        if len(days_hit):
+            spikes.append(inventory[row]["product_id"] + " " + ",".join(
+                f"{(start + timedelta(days=int(day))).strftime('%m-%d')}:{int(history[row, day])}" for day in days_hit
+            ))
+    if spikes and out.add("Sales spikes (day:units):"):
+        for line in spikes:
+            if not out.add(line):
+                break
+    return out.text()
+
+
+def encode_forecast(store_id: str, forecast_items, first_day: date, budget: int) -> str:
+    """Encode forecast items (``ForecastItem`` dicts) within roughly ``budget`` tokens.
+
+    Products whose forecast demand most exceeds current stock come first.
+    """
+    order = sorted(forecast_items, key=lambda item: item["current_stock"] - item["predicted_demand"])
+    horizon = len(order[0]["daily_demand"]) if order else 0
+
+    out = _Budget(budget)
+    out.add(f"Store {store_id} demand forecast, {horizon} days from {first_day.isoformat()}")
+    out.add("id|name|stock|demand|conf|daily")
+
+    footer_reserve = 30
+    shown = 0
+    for item in order:
+        line = "|".join([
+            item["product_id"], item["product_name"], str(item["current_stock"]), str(item["predicted_demand"]),
+            f"{item['confidence']:.2f}", " ".join(str(value) for value in item.get("daily_demand", []))
+        ])
+        if not out.add(line, reserve=footer_reserve):
+            break
+        shown += 1
+
+    rest = order[shown:]
+    if rest:
+        short = sum(item["predicted_demand"] > item["current_stock"] for item in rest)
+        out.add(f"(+{len(rest)} more products omitted, {short} of them forecast to run short, "
+                f"total demand {sum(item['predicted_demand'] for item in rest)})")
+    return out.text()
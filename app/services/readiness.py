@@ -0,0 +1,122 @@
+"""Readiness of this worker, for load balancers and the autoscaler.
+
+A worker goes through three states:
+
+- ``starting``: the app is importing or running its lifespan startup (schema
+  check); it cannot take requests yet
+- ``serving``: startup is done and requests are answered, but the first calls
+  to the analytics engines, the process pool or a cold connection pool still
+  pay their setup cost
+- ``warm``: the warm-up steps have run in the background, so no request pays
+  for loading NumPy, spawning analytics workers or opening connections
+
+``GET /ready`` is 200 from ``serving`` on; ``/ready?warm=true`` only once warm.
+A failed warm-up step is logged and reported but does not hold the worker back,
+since the request that needs it would set it up anyway.
+"""
+import asyncio
+import importlib
+import logging
+import time
+
+from sqlalchemy import text
+
+from app.models.database import engine
+from app.services.analytics import analytics
+from app.services.forecast_engine import forecast, METHODS
+from app.services.price_engine import suggest_prices
+from app.services.lazy_imports import numpy as np
+from app.config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+STARTING, SERVING, WARM = "starting", "serving", "warm"
+
+
+class Readiness:
+    def __init__(self):
+        self.state = STARTING
+        self.created = time.perf_counter()
+        self.timings = {}
+        self.errors = {}
+        self.task = None
+
+    def serving(self):
+        self.state = SERVING
+        self.timings["serving_after"] = time.perf_counter() - self.created
+
+    def start_warm_up(self, steps):
+        """Run ``steps`` (``(name, coroutine function)`` pairs) one after another in the background."""
+        self.task = asyncio.ensure_future(self._warm_up(steps))
+
+    async def _warm_up(self, steps):
+        for name, step in steps:
+            started = time.perf_counter()
+            try:
+                await step()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Warm-up step %s failed: %s", name, e)
+                self.errors[name] = str(e)
+            self.timings[name] = time.perf_counter() - started
+        self.state = WARM
+        self.timings["warm_after"] = time.perf_counter() - self.created
+
+    async def stop(self):
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+    def is_ready(self, warm: bool = False) -> bool:
+        return self.state == WARM if warm else self.state in (SERVING, WARM)
+
+    def snapshot(self):
+        return {
+            "state": self.state,
+            "seconds": {name: round(value, 4) for name, value in self.timings.items()},
+            "errors": self.errors
+        }
+
+
+async def _run_engines():
+    """Load NumPy and run every engine once on a tiny input.
+
+    On the event loop, as a lazy module must not be loaded from two threads at once.
+    """
+    history = np.ones((1, 56))
+    for method in METHODS:
+        forecast(history, 7, method)
+    index = np.zeros(1, dtype=int)
+    suggest_prices(np.ones(1), np.full(1, 0.6), np.ones(1), np.ones((1, 56)), history, index, index)
+
+
+async def _open_connections(count: int):
+    async def touch():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    await asyncio.gather(*(touch() for _ in range(count)))
+
+
+def warm_up_steps(settings=None):
+    """Warm-up steps for the analytics libraries and pool, the connection pool and optionally the LLM stack.
+
+    The LLM stack takes seconds to import and does so in a thread, so the event
+    loop keeps serving meanwhile.
+    """
+    settings = settings or get_settings()
+    steps = [
+        ("analytics_engines", _run_engines),
+        ("analytics_pool", analytics.start),
+        ("db_pool", lambda: _open_connections(max(1, settings.db_pool_size)))
+    ]
+    if settings.warmup_llm:
+        steps.append(("llm_client", lambda: asyncio.to_thread(importlib.import_module, "langchain.llms")))
+    return steps
+
+
+readiness = Readiness()
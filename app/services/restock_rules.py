@@ -0,0 +1,139 @@
+"""Deterministic restock rules evaluated in bulk before any model call.
+
+Most restock decisions need no reasoning: a product below its minimum needs an
+order, and one holding weeks of stock does not. The rules below settle those
+for a whole store in a few array operations. Only ambiguous or exceptional rows
+are escalated to the LLM: stock close to the reorder point, sales spikes, sharp
+trends, unreliable forecasts or impossible (negative) stock. Stock far above
+what the forecast calls for is left alone whatever the sales pattern.
+
+Rules, enabled by name in ``RuleConfig.rules``:
+
+- ``threshold``: stock below ``min_threshold`` is restocked.
+- ``days_of_cover``: forecast demand over the supplier's lead time is the
+  reorder point; stock clearly below it is restocked, clearly above it is left
+  alone, and within ``ambiguity_band`` of it is escalated.
+- ``safety_stock``: adds ``service_level_z * sigma * sqrt(lead_time)`` to the
+  reorder point, sigma being the standard deviation of daily sales.
+
+Forecast-based orders bring stock up to the reorder point plus the demand of
+one review period. The configuration can be overridden with a JSON file named
+by the ``restock_rules_file`` setting.
+"""
+from __future__ import annotations
+
+import json
+from collections import Counter, namedtuple
+from typing import Dict, List
+
+from app.services.lazy_imports import numpy as np
+from pydantic import BaseModel, Field, conint
+
+from app.services import forecast_engine
+from app.services.prompt_context import sales_profile, RECENT_DAYS
+from app.config.settings import get_settings
+
+RULES = ("threshold", "days_of_cover", "safety_stock")
+RESTOCK, OK, ESCALATE = "restock", "ok", "escalate"
+
+Decision = namedtuple("Decision", ["product_id", "action", "quantity", "reason"])
+
+
+class RuleConfig(BaseModel):
+    rules: List[str] = list(RULES)
+    method: str = "moving_average"
+    lead_time_days: int = Field(3, ge=1)
+    # Per-supplier lead times, falling back to lead_time_days; at least a day, like it
+    supplier_lead_time_days: Dict[str, conint(ge=1)] = {}
+    review_period_days: int = Field(7, ge=0)
+    service_level_z: float = 1.65
+    # Stock within this fraction of the reorder point is left to the model
+    ambiguity_band: float = Field(0.15, ge=0)
+    # Escalate selling products whose forecast confidence is below this
+    min_confidence: float = 0.3
+    # Escalate when the last week's sales rate changed by more than this fraction
+    max_trend: float = 1.0
+    escalate_spikes: bool = True
+    # Stock above this multiple of the order-up-to level is left alone even when sales look unusual
+    surplus_factor: float = 2.0
+
+
+def load_rules(path: str = None) -> RuleConfig:
+    """The rule configuration from ``path`` (default: the ``restock_rules_file`` setting)."""
+    path = path or get_settings().restock_rules_file
+    if not path:
+        return RuleConfig()
+    with open(path) as handle:
+        config = RuleConfig(**json.load(handle))
+    unknown = set(config.rules) - set(RULES)
+    if unknown:
+        raise ValueError(f"Unknown restock rules {', '.join(sorted(unknown))}, expected some of {', '.join(RULES)}")
+    return config
+
+
+def evaluate(inventory, history: np.ndarray, config: RuleConfig) -> List[Decision]:
+    """Decide every row of ``inventory`` at once.
+
+    ``inventory`` is a list of mappings with product_id, supplier_id,
+    current_stock and min_threshold; ``history`` is the matching daily sales
+    matrix, oldest day first. Returns one ``Decision`` per row, in order.
+    """
+    if not inventory:
+        return []
+    rules = set(config.rules)
+    history = np.asarray(history, dtype=float)
+    stock = np.array([row["current_stock"] for row in inventory], dtype=float)
+    minimum = np.array([row["min_threshold"] for row in inventory], dtype=float)
+    lead_time = np.array([
+        config.supplier_lead_time_days.get(row["supplier_id"], config.lead_time_days) for row in inventory
+    ])
+
+    horizon = int(lead_time.max()) + config.review_period_days
+    predictions, confidence = forecast_engine.forecast(history, horizon, method=config.method)
+    demand = predictions.cumsum(axis=1)
+    rows = np.arange(len(inventory))
+    lead_demand = demand[rows, lead_time - 1]
+    review_demand = demand[rows, lead_time - 1 + config.review_period_days] - lead_demand \
+        if config.review_period_days else np.zeros(len(inventory))
+
+    reorder_point = lead_demand.copy()
+    if "safety_stock" in rules:
+        reorder_point += config.service_level_z * history.std(axis=1) * np.sqrt(lead_time)
+    order_up_to = np.ceil(reorder_point + review_demand)
+
+    _, trend, anomalies = sales_profile(history)
+    selling = history.sum(axis=1) > 0
+    spikes = anomalies[:, -RECENT_DAYS:].any(axis=1)
+    with np.errstate(invalid="ignore"):
+        sharp_trend = np.abs(trend) > config.max_trend
+
+    decisions = []
+    for row, item in enumerate(inventory):
+        level, rop = stock[row], reorder_point[row]
+        floor = int(minimum[row] - level + 10)
+        if level < 0:
+            decision = (ESCALATE, 0, "negative stock")
+        elif "threshold" in rules and level < minimum[row]:
+            decision = (RESTOCK, max(floor, int(order_up_to[row] - level)), "below minimum")
+        elif "days_of_cover" not in rules or not selling[row]:
+            decision = (OK, 0, "above minimum")
+        elif level > config.surplus_factor * order_up_to[row]:
+            decision = (OK, 0, f"covers {config.surplus_factor:g}x order-up-to level {order_up_to[row]:.0f}")
+        elif config.escalate_spikes and spikes[row]:
+            decision = (ESCALATE, 0, "recent sales spike")
+        elif sharp_trend[row]:
+            decision = (ESCALATE, 0, f"sales trend {trend[row]:+.0%}")
+        elif confidence[row] < config.min_confidence:
+            decision = (ESCALATE, 0, f"forecast confidence {confidence[row]:.2f}")
+        elif level < rop * (1 - config.ambiguity_band):
+            decision = (RESTOCK, int(order_up_to[row] - level), f"below reorder point {rop:.0f}")
+        elif level > rop * (1 + config.ambiguity_band):
+            decision = (OK, 0, f"above reorder point {rop:.0f}")
+        else:
+            decision = (ESCALATE, 0, f"near reorder point {rop:.0f}")
+        decisions.append(Decision(item["product_id"], *decision))
+    return decisions
+
+
+def summarize(decisions) -> Counter:
+    return Counter(decision.action for decision in decisions)
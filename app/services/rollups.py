@@ -0,0 +1,194 @@
+"""Maintenance of the ``daily_sales`` rollup.
+
+Readers that only need daily totals (forecasting, alerts, analytics) query
+``daily_sales`` instead of ``sales_history``, so their cost scales with the
+number of (store, product, day) series rather than with transaction volume.
+Writers call ``record_sales`` in the same transaction as the raw insert;
+``rebuild_daily_sales`` recomputes a date range from ``sales_history``. Both
+bump ``forecast_series.sales_version`` for every series they touch, which is
+how the forecast store knows which forecasts the new sales made stale.
+
+Usage: python -m app.services.rollups [--since YYYY-MM-DD] [--until YYYY-MM-DD]
+"""
+import argparse
+import asyncio
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from app.services.lazy_imports import numpy as np
+from sqlalchemy import select, delete, insert, func, literal, true
+
+from app.models.database import engine, DailySales, SalesHistory, ForecastSeries
+from app.models.bulk import executemany, datetime_converter, dialect_insert
+
+# Above this many series, daily_sales_matrix reads whole stores instead of single series
+SERIES_FILTER_LIMIT = 2000
+
+
+def _upsert(dialect_name: str):
+    table = DailySales.__table__
+    statement = dialect_insert(dialect_name)(table)
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.store_id, table.c.product_id, table.c.day],
+        set_={"qty": table.c.qty + statement.excluded.qty}
+    )
+
+
+def _bump_sales_versions(dialect_name: str, source=None):
+    """Upsert that increments ``sales_version`` for each (store_id, product_id), from rows or ``source``."""
+    table = ForecastSeries.__table__
+    statement = dialect_insert(dialect_name)(table)
+    if source is not None:
+        # SQLite needs a WHERE in the SELECT of an INSERT ... SELECT ... ON CONFLICT
+        statement = statement.from_select(
+            [table.c.store_id, table.c.product_id, table.c.sales_version], source.where(true())
+        )
+    # Existing rows grow by the inserted value, which is always 1
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.store_id, table.c.product_id],
+        set_={"sales_version": table.c.sales_version + statement.excluded.sales_version}
+    )
+
+
+def _day(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.fromisoformat(str(value)).date()
+
+
+async def add_daily_totals(connection, totals) -> int:
+    """Upsert ``{(store_id, product_id, day): qty}`` increments on an async connection."""
+    if not totals:
+        return 0
+    dialect_name = connection.dialect.name
+    convert = datetime_converter(connection)
+    await executemany(connection, _upsert(dialect_name), ["store_id", "product_id", "day", "qty"], [
+        (store_id, product_id, convert(day), qty)
+        for (store_id, product_id, day), qty in totals.items()
+    ])
+    series = {(store_id, product_id) for store_id, product_id, _ in totals}
+    await executemany(connection, _bump_sales_versions(dialect_name), ["store_id", "product_id", "sales_version"], [
+        (store_id, product_id, 1) for store_id, product_id in series
+    ])
+    return len(totals)
+
+
+async def record_sales(session, sales) -> int:
+    """Add ``sales`` (mappings with store_id, product_id, quantity, sale_date) to the rollup.
+
+    Sales are aggregated per (store, product, day) first, so a batch of thousands
+    of line items becomes one upsert per touched series-day. Does not commit.
+    Returns the number of rollup rows touched.
+    """
+    totals = Counter()
+    for sale in sales:
+        totals[(sale["store_id"], sale["product_id"], _day(sale["sale_date"]))] += sale["quantity"]
+    return await add_daily_totals(await session.connection(), totals)
+
+
+def rebuild_daily_sales(conn, since: date = None, until: date = None, mark_changed: bool = True) -> int:
+    """Recompute the rollup from ``sales_history`` for ``[since, until)`` (whole table if omitted).
+
+    Runs on a sync connection, e.g. through ``AsyncConnection.run_sync`` or a migration.
+    With ``mark_changed`` every series with rollup rows in the range before or
+    after the rebuild has its forecast marked stale.
+    """
+    day = func.date(SalesHistory.sale_date)
+    clear = delete(DailySales)
+    source = select(
+        SalesHistory.store_id, SalesHistory.product_id, day, func.sum(SalesHistory.quantity)
+    ).group_by(SalesHistory.store_id, SalesHistory.product_id, day)
+
+    if since is not None:
+        clear = clear.where(DailySales.day >= since)
+        source = source.where(SalesHistory.sale_date >= datetime.combine(since, datetime.min.time()))
+    if until is not None:
+        clear = clear.where(DailySales.day < until)
+        source = source.where(SalesHistory.sale_date < datetime.combine(until, datetime.min.time()))
+
+    rebuilt = select(DailySales.store_id, DailySales.product_id, literal(1)).distinct()
+    if since is not None:
+        rebuilt = rebuilt.where(DailySales.day >= since)
+    if until is not None:
+        rebuilt = rebuilt.where(DailySales.day < until)
+    bump = _bump_sales_versions(conn.dialect.name, rebuilt)
+
+    if mark_changed:
+        conn.execute(bump)
+    conn.execute(clear)
+    rows = conn.execute(insert(DailySales).from_select(
+        [DailySales.store_id, DailySales.product_id, DailySales.day, DailySales.qty], source
+    )).rowcount
+    if mark_changed:
+        conn.execute(bump)
+    return rows
+
+
+async def daily_sales_matrix(session, series, start: date, days: int):
+    """Fill a ``(len(series), days)`` matrix of daily quantities starting at ``start``.
+
+    Up to ``SERIES_FILTER_LIMIT`` series are looked up by (store_id, product_id);
+    more are read store by store, which is cheaper once most of a store is asked for.
+    """
+    history = np.zeros((len(series), days))
+    if not series:
+        return history
+
+    rows_by_key = {key: row for row, key in enumerate(series)}
+    query = select(DailySales.store_id, DailySales.product_id, DailySales.day, DailySales.qty).where(
+        DailySales.day >= start,
+        DailySales.day < start + timedelta(days=days)
+    )
+    if len(series) <= SERIES_FILTER_LIMIT:
+        # One store per query so the (store_id, product_id, day) key is searched, not scanned
+        products = {}
+        for store_id, product_id in series:
+            products.setdefault(store_id, []).append(product_id)
+        queries = [
+            query.where(DailySales.store_id == store_id, DailySales.product_id.in_(product_ids[offset:offset + 500]))
+            for store_id, product_ids in products.items()
+            for offset in range(0, len(product_ids), 500)
+        ]
+    else:
+        queries = [query.where(DailySales.store_id.in_({store_id for store_id, _ in series}))]
+
+    # Core rows: the ORM's per-row bookkeeping costs more than the query on large histories
+    connection = await session.connection()
+    for query in queries:
+        # Fetch all at once: iterating an async connection's result row by row is far slower
+        for store_id, product_id, day, qty in (await connection.execute(query)).all():
+            row = rows_by_key.get((store_id, product_id))
+            if row is not None:
+                history[row, (day - start).days] = qty
+    return history
+
+
+async def average_daily_sales(session, series, start: date, days: int):
+    """Mean daily quantity per series over ``[start, start + days)``, keyed by (store_id, product_id)."""
+    if not series:
+        return {}
+    query = select(DailySales.store_id, DailySales.product_id, func.sum(DailySales.qty)).where(
+        DailySales.store_id.in_({store_id for store_id, _ in series}),
+        DailySales.day >= start,
+        DailySales.day < start + timedelta(days=days)
+    ).group_by(DailySales.store_id, DailySales.product_id)
+    result = await session.execute(query)
+    totals = {(store_id, product_id): qty for store_id, product_id, qty in result}
+    return {key: totals.get(key, 0) / days for key in series}
+
+
+async def rebuild(since: date = None, until: date = None):
+    async with engine.begin() as conn:
+        rows = await conn.run_sync(rebuild_daily_sales, since, until)
+    await engine.dispose()
+    print(f"Rebuilt {rows} daily_sales rows")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the daily_sales rollup from sales_history")
+    parser.add_argument("--since", type=date.fromisoformat, help="first day to rebuild (inclusive)")
+    parser.add_argument("--until", type=date.fromisoformat, help="last day to rebuild (exclusive)")
+    args = parser.parse_args()
+    asyncio.run(rebuild(args.since, args.until))
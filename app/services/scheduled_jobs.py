@@ -0,0 +1,121 @@
+"""The background jobs run by ``app.services.jobs``.
+
+Importing this module registers them. Each precomputes something a request
+would otherwise compute on demand:
+
+- ``forecast_refresh`` updates the forecast store (``app.services.forecast_store``)
+  for the series whose sales changed since their last forecast
+- ``alert_materialization`` fills ``sales_velocity``, which the alert endpoints
+  read instead of aggregating ``daily_sales`` per request
+- ``rollup_compaction`` rebuilds the recent days of ``daily_sales`` from
+  ``sales_history`` and drops zero rows
+- ``stock_snapshot`` snapshots the stock of stores with enough ledger movements
+  since their last snapshot (``app.services.stock_ledger``), keeping ``?as_of=``
+  inventory reads to a short replay
+- ``forecast_explanation`` asks the LLM to comment on a store's forecast, so
+  ``/api/forecast/{store_id}?explain=true`` does not wait on the model
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, delete, insert, func, literal
+
+from app.models.database import Product, StoreInventory, DailySales, SalesVelocity
+from app.services.jobs import job, last_success
+from app.services.forecast_store import refresh_forecasts, load_forecasts, STORED_METHOD
+from app.services.forecasting import ForecastingService
+from app.services.forecast_engine import DEFAULT_METHOD
+from app.services.rollups import rebuild_daily_sales
+from app.services.stock_ledger import take_snapshots
+from app.config.constants import (
+    ALERT_SALES_WINDOW_DAYS, STOCK_SNAPSHOT_MIN_MOVEMENTS, FORECAST_STORE_DAYS, get_datetime_obj
+)
+
+
+@job("forecast_refresh")
+async def forecast_refresh(session, days: int = FORECAST_STORE_DAYS, force: bool = False):
+    """Bring the forecast store up to date, recomputing only series whose sales changed (all with ``force``)."""
+    return {**await refresh_forecasts(session, None, days, force=force), "days": days, "method": STORED_METHOD}
+
+
+@job("alert_materialization")
+async def alert_materialization(session, window_days: int = ALERT_SALES_WINDOW_DAYS):
+    """Recompute ``sales_velocity`` from ``daily_sales`` in one INSERT ... SELECT.
+
+    Series without sales in the window get no row; readers treat that as zero.
+    """
+    start = get_datetime_obj().date() + timedelta(days=1 - window_days)
+    await session.execute(delete(SalesVelocity))
+    source = select(
+        DailySales.store_id, DailySales.product_id, func.sum(DailySales.qty) * 1.0 / window_days,
+        literal(window_days), literal(datetime.now())
+    ).where(
+        DailySales.day >= start, DailySales.day < start + timedelta(days=window_days)
+    ).group_by(DailySales.store_id, DailySales.product_id)
+    rows = (await session.execute(insert(SalesVelocity).from_select(
+        [SalesVelocity.store_id, SalesVelocity.product_id, SalesVelocity.avg_daily_sales,
+         SalesVelocity.window_days, SalesVelocity.computed_at], source
+    ))).rowcount
+    await session.commit()
+    return {"series": rows, "window_days": window_days}
+
+
+@job("rollup_compaction")
+async def rollup_compaction(session, days: int = 7):
+    """Rebuild the last ``days`` days of ``daily_sales`` and delete rows whose quantity is zero."""
+    until = get_datetime_obj().date() + timedelta(days=1)
+    connection = await session.connection()
+    rebuilt = await connection.run_sync(rebuild_daily_sales, until - timedelta(days=days), until)
+    removed = (await session.execute(delete(DailySales).where(DailySales.qty == 0))).rowcount
+    await session.commit()
+    return {"rebuilt_rows": rebuilt, "removed_zero_rows": removed, "days": days}
+
+
+@job("stock_snapshot")
+async def stock_snapshot(session, min_movements: int = STOCK_SNAPSHOT_MIN_MOVEMENTS):
+    """Snapshot every store without a snapshot or with ``min_movements`` ledger movements since its last one."""
+    return {**await take_snapshots(session, min_movements), "min_movements": min_movements}
+
+
+@job("forecast_explanation", max_concurrency=2)
+async def forecast_explanation(session, store_id: str, days: int = 7, method: str = DEFAULT_METHOD):
+    """LLM commentary on ``store_id``'s forecast, read from the forecast store rather than passed in the params."""
+    items = (await session.execute(
+        select(StoreInventory.product_id, Product.name, StoreInventory.stock_level)
+        .join(Product, StoreInventory.product_id == Product.id)
+        .where(StoreInventory.store_id == store_id)
+    )).all()
+    stored, _ = await load_forecasts(session, [store_id], days, method)
+    forecast = []
+    for product_id, name, stock_level in items:
+        daily_demand, confidence = stored[(store_id, product_id)][:2]
+        forecast.append({
+            "product_id": product_id,
+            "product_name": name,
+            "current_stock": stock_level,
+            "predicted_demand": sum(daily_demand),
+            "confidence": confidence,
+            "daily_demand": daily_demand
+        })
+    explanation = await ForecastingService(session).explain_forecast(store_id, forecast)
+    return {"store_id": store_id, "explanation": explanation}
+
+
+async def read_sales_velocity(session, series, max_age_seconds: float):
+    """Materialized average daily sales for ``series``, or None when ``sales_velocity`` is stale.
+
+    Returns ``(velocity, as_of)`` with velocity keyed by (store_id, product_id),
+    as of the last successful ``alert_materialization`` no older than ``max_age_seconds``.
+    """
+    as_of = await last_success(session, "alert_materialization")
+    if as_of is None or (datetime.now() - as_of).total_seconds() > max_age_seconds:
+        return None
+    velocity = dict.fromkeys(series, 0.0)
+    if series:
+        result = await session.execute(
+            select(SalesVelocity.store_id, SalesVelocity.product_id, SalesVelocity.avg_daily_sales)
+            .where(SalesVelocity.store_id.in_({store_id for store_id, _ in series}))
+        )
+        for store_id, product_id, avg_daily_sales in result:
+            if (store_id, product_id) in velocity:
+                velocity[(store_id, product_id)] = avg_daily_sales
+    return velocity, as_of
@@ -0,0 +1,57 @@
+"""One-pass JSON encoding for API responses.
+
+Read routes used to build a Pydantic model per row and ``.dict()`` it, after
+which FastAPI walked the whole payload again with ``jsonable_encoder`` before
+``json.dumps``. They now build plain dicts straight from SQL row tuples and
+encode them once with ``dumps``: orjson when installed (``pip install orjson``),
+else the standard library with the same output FastAPI's ``JSONResponse``
+produces. Dates, datetimes and NumPy values are encoded directly, so builders
+need not convert them first.
+
+``FastJSONResponse`` is the app's default response class. A route returning
+one, or a ``Response`` with ``dumps``' bytes, skips FastAPI's serialization
+entirely, including the check against its ``response_model``. Read routes
+therefore encode with ``validated_dumps``, which checks the payload against the
+model once before encoding; cached responses are checked when the cache is
+filled, not on every hit.
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional; the standard library encoder gives the same JSON
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    # NumPy scalars and arrays, without importing NumPy here
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(payload) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(
+        payload, default=_default, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def validated_dumps(payload, model) -> bytes:
+    """``dumps(payload)`` once it validates against the Pydantic ``model``; raises ValidationError otherwise."""
+    model.model_validate(payload)
+    return dumps(payload)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -0,0 +1,174 @@
+"""Stock movement ledger, per-store snapshots and point-in-time stock.
+
+Every change to ``store_inventory.stock_level`` appends a ``stock_movements``
+row in the same transaction: receipts, sales, adjustments and transfers, with
+the signed quantity. ``stock_snapshot`` (a scheduled job) copies a store's
+stock levels into ``stock_snapshot_items`` once it has
+``STOCK_SNAPSHOT_MIN_MOVEMENTS`` movements since its last snapshot, recording
+the last movement the snapshot includes.
+
+Stock as of a moment is the store's newest snapshot taken at or before it plus
+the sum of the store's later movements up to that moment. The replay never
+covers more than the movements between two snapshots, however long the ledger
+grows, and ``ix_stock_movements_store_id`` reads them as one range.
+
+Movements and snapshots are stamped with the wall clock of the process writing
+them, like jobs and forecast generations, not with the business date of
+``get_datetime_obj``. A snapshot is stamped once it holds the store's rows, so
+every movement it includes is stamped no later than the snapshot. Beyond that,
+ledger order (IDs) and time order need not agree: concurrent transactions
+commit out of ID order and workers' clocks may differ. A movement stamped
+within that skew of ``as_of`` may therefore land on either side of it.
+
+A movement is only recorded for a (store, product) that has an inventory row,
+the same rows the stock UPDATE changes. Products stocked after a snapshot enter
+point-in-time reads with the store's next snapshot.
+"""
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import (
+    select, insert, update, func, exists, literal, bindparam, and_, String, Integer, DateTime
+)
+
+from app.models.database import StoreInventory, StockMovement, StockSnapshot, StockSnapshotItem
+from app.models.bulk import executemany, datetime_converter
+from app.config.constants import CURRENT_USER, STOCK_SNAPSHOT_MIN_MOVEMENTS
+
+RECEIPT, SALE, ADJUSTMENT, TRANSFER = "receipt", "sale", "adjustment", "transfer"
+MOVEMENT_KINDS = (RECEIPT, SALE, ADJUSTMENT, TRANSFER)
+
+_inventory = StoreInventory.__table__
+_store_id = bindparam("b_store_id", type_=String)
+_product_id = bindparam("b_product_id", type_=String)
+# INSERT ... SELECT <values> WHERE EXISTS (the inventory row), so unstocked keys record nothing
+_record = insert(StockMovement.__table__).from_select(
+    ["store_id", "product_id", "kind", "quantity", "counterparty_store_id", "recorded_by", "occurred_at"],
+    select(
+        _store_id, _product_id, bindparam("b_kind", type_=String), bindparam("b_quantity", type_=Integer),
+        bindparam("b_counterparty", type_=String), bindparam("b_user", type_=String),
+        bindparam("b_time", type_=DateTime)
+    ).where(exists().where(_inventory.c.store_id == _store_id, _inventory.c.product_id == _product_id))
+)
+_RECORD_KEYS = ["b_store_id", "b_product_id", "b_kind", "b_quantity", "b_counterparty", "b_user", "b_time"]
+
+PointInTime = namedtuple("PointInTime", ["snapshot_id", "taken_at", "replayed", "levels"])
+
+
+async def record_movements(connection, movements, user: str = CURRENT_USER, occurred_at: datetime = None) -> int:
+    """Append ``(store_id, product_id, kind, quantity, counterparty_store_id)`` movements in one executemany.
+
+    Call after the stock UPDATE, in the same transaction. ``occurred_at`` is the
+    wall-clock time of the movements, now if omitted. Zero quantities are
+    skipped. Returns the number of rows written. Does not commit.
+    """
+    convert = datetime_converter(connection)
+    occurred_at = convert(occurred_at or datetime.now())
+    return await executemany(connection, _record, _RECORD_KEYS, [
+        (store_id, product_id, kind, quantity, counterparty, user, occurred_at)
+        for store_id, product_id, kind, quantity, counterparty in movements
+        if quantity
+    ])
+
+
+def snapshot_store(conn, store_id: str, user: str = CURRENT_USER) -> int:
+    """Snapshot one store's stock levels on a sync connection; returns the number of items.
+
+    Does not commit. The snapshot must match the movements it claims to include,
+    so the store's inventory rows are locked first (FOR UPDATE; on SQLite the
+    header insert already holds the database write lock): every writer updates
+    stock before recording its movement, so once the locks are held no movement
+    of this store is in flight. ``taken_at`` is stamped only then, so it is no
+    earlier than any movement the snapshot includes.
+    """
+    snapshot_id = conn.execute(insert(StockSnapshot).values(
+        store_id=store_id, taken_at=datetime.now(), last_movement_id=0, items=0, created_by=user
+    )).inserted_primary_key[0]
+    conn.execute(select(_inventory.c.id).where(_inventory.c.store_id == store_id).with_for_update()).all()
+    last_movement_id = conn.execute(
+        select(func.coalesce(func.max(StockMovement.id), 0)).where(StockMovement.store_id == store_id)
+    ).scalar()
+    items = conn.execute(insert(StockSnapshotItem).from_select(
+        [StockSnapshotItem.snapshot_id, StockSnapshotItem.product_id, StockSnapshotItem.stock_level],
+        select(literal(snapshot_id), _inventory.c.product_id, _inventory.c.stock_level)
+        .where(_inventory.c.store_id == store_id)
+    )).rowcount
+    conn.execute(update(StockSnapshot).where(StockSnapshot.id == snapshot_id).values(
+        taken_at=datetime.now(), last_movement_id=last_movement_id, items=items
+    ))
+    return items
+
+
+def opening_snapshots(conn) -> int:
+    """Snapshot every store with inventory on a sync connection; returns the number of stores."""
+    store_ids = conn.execute(select(_inventory.c.store_id).distinct()).scalars().all()
+    for store_id in store_ids:
+        snapshot_store(conn, store_id)
+    return len(store_ids)
+
+
+async def stores_due(session, min_movements: int = STOCK_SNAPSHOT_MIN_MOVEMENTS, store_ids=None):
+    """Stores with no snapshot yet, or with at least ``min_movements`` movements since their latest one."""
+    if store_ids is None:
+        store_ids = (await session.execute(select(_inventory.c.store_id).distinct())).scalars().all()
+    latest = dict((await session.execute(
+        select(StockSnapshot.store_id, func.max(StockSnapshot.last_movement_id)).group_by(StockSnapshot.store_id)
+    )).all())
+    due = []
+    for store_id in store_ids:
+        if store_id not in latest:
+            due.append(store_id)
+            continue
+        # Bounded by min_movements through the (store_id, id) index, whatever the ledger's size
+        pending = await session.scalar(select(func.count()).select_from(
+            select(StockMovement.id).where(
+                StockMovement.store_id == store_id, StockMovement.id > latest[store_id]
+            ).limit(min_movements).subquery()
+        ))
+        if pending >= min_movements:
+            due.append(store_id)
+    return due
+
+
+async def take_snapshots(session, min_movements: int = STOCK_SNAPSHOT_MIN_MOVEMENTS, store_ids=None):
+    """Snapshot the stores ``stores_due`` returns, committing after each so locks are held one store at a time."""
+    items = 0
+    due = await stores_due(session, min_movements, store_ids)
+    for store_id in due:
+        connection = await session.connection()
+        items += await connection.run_sync(snapshot_store, store_id)
+        await session.commit()
+    return {"stores": len(due), "items": items}
+
+
+async def point_in_time(session, store_id: str, as_of: datetime):
+    """Stock of ``store_id`` as of ``as_of``, or None if the store has no snapshot that early.
+
+    Returns ``PointInTime`` with the snapshot used, how many movements are
+    replayed on top of it and ``levels``, a subquery of ``(product_id,
+    stock_level)`` to join in place of ``StoreInventory.stock_level``.
+    """
+    snapshot = (await session.execute(
+        select(StockSnapshot.id, StockSnapshot.taken_at, StockSnapshot.last_movement_id)
+        .where(StockSnapshot.store_id == store_id, StockSnapshot.taken_at <= as_of)
+        .order_by(StockSnapshot.taken_at.desc(), StockSnapshot.id.desc()).limit(1)
+    )).first()
+    if snapshot is None:
+        return None
+
+    replay = and_(
+        StockMovement.store_id == store_id,
+        StockMovement.id > snapshot.last_movement_id,
+        StockMovement.occurred_at <= as_of
+    )
+    replayed = await session.scalar(select(func.count()).select_from(StockMovement).where(replay))
+    deltas = select(
+        StockMovement.product_id, func.sum(StockMovement.quantity).label("delta")
+    ).where(replay).group_by(StockMovement.product_id).subquery()
+    levels = select(
+        StockSnapshotItem.product_id,
+        (StockSnapshotItem.stock_level + func.coalesce(deltas.c.delta, 0)).label("stock_level")
+    ).outerjoin(deltas, deltas.c.product_id == StockSnapshotItem.product_id).where(
+        StockSnapshotItem.snapshot_id == snapshot.id
+    ).subquery()
+    return PointInTime(snapshot.id, snapshot.taken_at, replayed, levels)
@@ -2,6 +2,9 @@
 const CURRENT_USER = "AkarshanGupta";
 const CURRENT_DATETIME = "2025-04-10 15:42:30";
 let forecastChart = null;
+let inventorySnapshot = null;
+let alertsSnapshot = null;
+let eventSource = null;
 
 // Initialize everything when the page loads
 document.addEventListener('DOMContentLoaded', async () => {
@@ -17,16 +20,81 @@ document.addEventListener('DOMContentLoaded', async () => {
         checkInventory(),
         checkAlerts()
     ]);
+    subscribeToStore(document.getElementById('storeSelect').value);
 
     // Add store change listener
     document.getElementById('storeSelect').addEventListener('change', async () => {
+        const store = document.getElementById('storeSelect').value;
         await Promise.all([
             checkInventory(),
             checkAlerts()
         ]);
+        subscribeToStore(store);
     });
 });
 
+// Live updates: apply pushed deltas instead of re-polling the API
+function subscribeToStore(store) {
+    if (eventSource) eventSource.close();
+    if (!window.EventSource) return;
+
+    eventSource = new EventSource(`/api/stream/${store}`);
+    eventSource.addEventListener('stock', (event) => {
+        const change = JSON.parse(event.data);
+        updateSnapshotItem(change.product_id, { current_stock: change.stock_level });
+        // Products still below their minimum get their alert's figures refreshed; crossings come as alert events
+        if (change.stock_level < change.min_threshold) applyAlert({ ...change, state: 'low' });
+    });
+    eventSource.addEventListener('price', (event) => {
+        const change = JSON.parse(event.data);
+        updateSnapshotItem(change.product_id, { price: change.price });
+    });
+    eventSource.addEventListener('alert', (event) => {
+        const alert = JSON.parse(event.data);
+        if (alert.state === 'low') {
+            showToast('error', `${alert.product_id} is below its minimum (${alert.stock_level}/${alert.min_threshold})`);
+        }
+        applyAlert(alert);
+    });
+    // Events were dropped because this client fell behind; reload the snapshot once
+    eventSource.addEventListener('resync', async () => {
+        await Promise.all([
+            checkInventory(),
+            checkAlerts()
+        ]);
+    });
+}
+
+// Add, update or clear one product's alert from an event payload, using the same rules as the alerts endpoint
+function applyAlert(change) {
+    if (!alertsSnapshot) return;
+    const alerts = alertsSnapshot.alerts.filter(entry => entry.product_id !== change.product_id);
+    if (change.state === 'low') {
+        const existing = alertsSnapshot.alerts.find(entry => entry.product_id === change.product_id);
+        const item = inventorySnapshot && inventorySnapshot.inventory.find(entry => entry.product_id === change.product_id);
+        alerts.push({
+            ...existing,
+            product_id: change.product_id,
+            product_name: existing ? existing.product_name : (item ? item.name : change.product_id),
+            current_stock: change.stock_level,
+            min_threshold: change.min_threshold,
+            urgency: change.stock_level < change.min_threshold / 2 ? 'HIGH' : 'MEDIUM',
+            suggested_order: change.min_threshold - change.stock_level + 10
+        });
+    }
+    alertsSnapshot.alerts = alerts;
+    displayAlerts(alertsSnapshot);
+}
+
+function updateSnapshotItem(productId, fields) {
+    if (!inventorySnapshot) return;
+    const item = inventorySnapshot.inventory.find(entry => entry.product_id === productId);
+    if (!item) return;
+    Object.assign(item, fields);
+    updateDashboardMetrics(inventorySnapshot);
+    displayInventory(inventorySnapshot);
+}
+
 // Main inventory functions
 async function checkInventory() {
     const store = document.getElementById('storeSelect').value;
@@ -43,6 +111,7 @@ async function checkInventory() {
         const response = await fetch(`/api/inventory/${store}`);
         if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
         const data = await response.json();
+        inventorySnapshot = data;
 
         // Update metrics and display inventory
         updateDashboardMetrics(data);
@@ -214,6 +283,7 @@ async function checkAlerts() {
         const response = await fetch(`/api/inventory-alerts/${store}`);
         if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
         const data = await response.json();
+        alertsSnapshot = data;
         displayAlerts(data);
     } catch (error) {
         console.error('Error:', error);
@@ -0,0 +1,147 @@
+"""Inventory latency while CPU-bound analytics run, inline against offloaded to worker processes.
+
+Seeds a temporary database, serves the app under uvicorn and measures
+GET /api/inventory/{store_id} latency three times:
+
+- idle, as a baseline
+- while chain-sized engine calls (Holt-Winters and day-of-week forecasts and
+  price suggestions over ``series`` series x 365 days) run back to back
+  through ``analytics.run`` with ``analytics.workers = 0``, i.e. on the event loop
+- under the same load offloaded to the process pool
+
+Only the engine calls move: loading their history from SQL still runs on the
+event loop, so the load here is the compute alone. It then checks that
+POST /api/price-optimization/batch answers the same through the pool as inline,
+and that a call exceeding its timeout raises ``AnalyticsTimeout`` without
+breaking the pool.
+
+Usage: python -m benchmarks.bench_analytics_offload [stores] [products] [seconds] [series]
+"""
+import asyncio
+import logging
+import sys
+
+import httpx
+import numpy as np
+
+from app.services.analytics import analytics, AnalyticsTimeout
+from app.services.cache import response_cache
+from app.services.forecast_engine import forecast
+from app.services.price_engine import suggest_prices
+from app.config.constants import get_datetime_obj
+from benchmarks.common import temp_database, seed_inventory, seed_daily_sales, serve_app, Timer
+
+
+def percentile(times, fraction: float):
+    ordered = sorted(times)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000
+
+
+def analytics_inputs(series: int, seed: int = 5):
+    rng = np.random.default_rng(seed)
+    history = rng.poisson(3.0, (series, 365)).astype(float)
+    price = rng.uniform(2.0, 20.0, series)
+    prices = price[:, None] * rng.uniform(0.8, 1.2, (series, 365))
+    product_index = np.arange(series) % 2000
+    return history, (price, price * 0.6, rng.integers(0, 100, series).astype(float), prices, history,
+                     product_index, product_index[:2000] % 10, "margin", 0.2)
+
+
+async def heavy_load(inputs, stop):
+    """Run forecasts and price suggestions over ``inputs`` until ``stop`` is set; returns the rounds done."""
+    history, pricing = inputs
+    rounds = 0
+    while not stop.is_set():
+        await analytics.run(forecast, history, 14, "holt_winters")
+        await analytics.run(forecast, history, 14, "day_of_week")
+        await analytics.run(suggest_prices, *pricing)
+        rounds += 1
+    return rounds
+
+
+async def inventory_latencies(client, store_ids, seconds: float):
+    times = []
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + seconds
+    while loop.time() < deadline:
+        with Timer() as timer:
+            response = await client.get(f"/api/inventory/{store_ids[len(times) % len(store_ids)]}")
+        response.raise_for_status()
+        times.append(timer.elapsed)
+        await asyncio.sleep(0.01)
+    return times
+
+
+async def measure(client, store_ids, seconds: float, inputs=None):
+    stop = asyncio.Event()
+    background = asyncio.ensure_future(heavy_load(inputs, stop)) if inputs else None
+    try:
+        times = await inventory_latencies(client, store_ids, seconds)
+    finally:
+        stop.set()
+    rounds = await background if background else 0
+    return times, rounds
+
+
+async def run(stores: int, products: int, seconds: float, series: int):
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    response_cache.max_entries = 0
+    workers = analytics.workers or 2
+    async with temp_database(db_pool_size=5) as engine:
+        store_ids, product_ids = await seed_inventory(engine, stores=stores, products=products)
+        await seed_daily_sales(engine, store_ids, product_ids, 56, get_datetime_obj().date())
+        inputs = analytics_inputs(series)
+        server, task, base_url = await serve_app(engine)
+        results = {}
+        try:
+            async with httpx.AsyncClient(base_url=base_url, timeout=600) as client:
+                results["idle"] = await measure(client, store_ids, seconds)
+
+                analytics.workers = 0
+                results["inline analytics"] = await measure(client, store_ids, seconds, inputs)
+                inline_prices = (await client.post(
+                    "/api/price-optimization/batch", json={"store_ids": store_ids[:2]}
+                )).text
+
+                analytics.workers = workers
+                await analytics.start()
+                results["offloaded analytics"] = await measure(client, store_ids, seconds, inputs)
+                # Two stores' matrices are below the offload threshold; send them through the pool anyway
+                analytics.offload_min_bytes = 0
+                offloaded_prices = (await client.post(
+                    "/api/price-optimization/batch", json={"store_ids": store_ids[:2]}
+                )).text
+                # generated_at is the frozen business clock, so the bodies compare equal
+                assert offloaded_prices == inline_prices
+                assert analytics.stats["offloaded"] > 0
+
+                try:
+                    await analytics.run(forecast, inputs[0], 28, "day_of_week", timeout=0.05)
+                    raise AssertionError("expected AnalyticsTimeout")
+                except AnalyticsTimeout:
+                    pass
+                small = inputs[0][:, -56:]
+                offloaded = await analytics.run(forecast, small, 7, "holt_winters")
+                inline = forecast(small, 7, "holt_winters")
+                assert all(np.allclose(a, b) for a, b in zip(offloaded, inline))
+        finally:
+            analytics.shutdown()
+            server.should_exit = True
+            await task
+
+    print(f"{stores} stores x {products:,} products; load: {series:,} series x 365 days; {seconds:g}s per run, "
+          f"{workers} analytics workers")
+    print(f"{'GET /api/inventory':<22}{'requests':>10}{'p50 (ms)':>10}{'p99 (ms)':>10}{'max (ms)':>10}"
+          f"{'load rounds':>13}")
+    for name, (times, rounds) in results.items():
+        print(f"{name:<22}{len(times):>10}{percentile(times, 0.5):>10.1f}{percentile(times, 0.99):>10.1f}"
+              f"{max(times) * 1000:>10.1f}{rounds:>13}")
+    print(f"results identical inline and offloaded; timeout recovered ({dict(analytics.stats)})")
+
+
+if __name__ == "__main__":
+    stores = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    products = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 15
+    series = int(sys.argv[4]) if len(sys.argv) > 4 else 40000
+    asyncio.run(run(stores, products, seconds, series))
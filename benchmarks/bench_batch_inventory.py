@@ -0,0 +1,44 @@
+"""Compare N single-store reads against one batch request per endpoint.
+
+Usage: python -m benchmarks.bench_batch_inventory [stores] [products]
+"""
+import asyncio
+import json
+import sys
+
+from benchmarks.common import temp_database, seed_inventory, api_client, Timer
+
+ENDPOINTS = [
+    ("inventory", "/api/inventory/{}", "/api/inventory/batch"),
+    ("inventory-alerts", "/api/inventory-alerts/{}", "/api/inventory-alerts/batch"),
+    ("forecast", "/api/forecast/{}", "/api/forecast/batch"),
+    ("price-optimization", "/api/price-optimization/{}", "/api/price-optimization/batch"),
+]
+
+
+async def run(stores: int, products: int):
+    async with temp_database() as engine:
+        store_ids, _ = await seed_inventory(engine, stores, products)
+        async with api_client(engine) as client:
+            print(f"{stores} stores x {products} products")
+            print(f"{'endpoint':<20}{'single (s)':>12}{'batch (s)':>12}{'speedup':>10}")
+            for name, single_path, batch_path in ENDPOINTS:
+                with Timer() as single:
+                    for store_id in store_ids:
+                        response = await client.get(single_path.format(store_id))
+                        response.raise_for_status()
+
+                with Timer() as batch:
+                    response = await client.post(batch_path, json={"store_ids": store_ids})
+                    response.raise_for_status()
+                    lines = [json.loads(line) for line in response.text.splitlines()]
+                assert [line["store_id"] for line in lines] == store_ids
+
+                print(f"{name:<20}{single.elapsed:>12.3f}{batch.elapsed:>12.3f}"
+                      f"{single.elapsed / batch.elapsed:>9.1f}x")
+
+
+if __name__ == "__main__":
+    stores = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    products = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    asyncio.run(run(stores, products))
@@ -0,0 +1,89 @@
+"""POST /api/prices/bulk against one POST /api/update-price per change.
+
+Seeds a temporary database, reprices ``singles`` products through the
+single-item route one request at a time, then applies ``bulk`` catalog-wide
+and store-scoped changes in one bulk request. Reports changes/s for both and
+checks that every change was recorded in price_history, that store prices
+show up in the inventory read, and that the price path before the change is
+reconstructed for elasticity estimation.
+
+Usage: python -m benchmarks.bench_bulk_prices [stores] [products] [singles] [bulk]
+"""
+import asyncio
+import logging
+import random
+import sys
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.database import PriceHistory, Product
+from app.services.prices import price_matrix
+from app.config.constants import get_datetime_obj
+from benchmarks.common import temp_database, seed_inventory, api_client, Timer
+
+
+async def run(stores: int, products: int, singles: int, bulk: int):
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    rng = random.Random(9)
+    async with temp_database(db_pool_size=5) as engine:
+        store_ids, product_ids = await seed_inventory(engine, stores=stores, products=products)
+        async with api_client(engine) as client:
+            with Timer() as single:
+                for product_id in product_ids[:singles]:
+                    response = await client.post("/api/update-price", json={
+                        "store_id": store_ids[0], "product_id": product_id, "new_price": round(rng.uniform(5, 150), 2)
+                    })
+                    assert response.status_code == 200, response.text
+
+            changes = [
+                {"product_id": rng.choice(product_ids), "new_price": round(rng.uniform(5, 150), 2)}
+                for _ in range(bulk // 2)
+            ] + [
+                {"store_id": rng.choice(store_ids), "product_id": rng.choice(product_ids),
+                 "new_price": round(rng.uniform(5, 150), 2)}
+                for _ in range(bulk - bulk // 2)
+            ]
+            changes.append({"store_id": store_ids[0], "product_id": "NOPE", "new_price": 1.0})
+            with Timer() as batch:
+                response = await client.post("/api/prices/bulk", json={"changes": changes, "reason": "benchmark"})
+            assert response.status_code == 200, response.text
+            summary = response.json()
+
+            # The last store-scoped change for a product wins and is what the store reads
+            store_id, product_id, price = next(
+                (change["store_id"], change["product_id"], change["new_price"])
+                for change in reversed(changes) if change.get("store_id") == store_ids[1]
+            )
+            inventory = (await client.get(f"/api/inventory/{store_id}")).json()["inventory"]
+            assert next(item["price"] for item in inventory if item["product_id"] == product_id) == price
+
+        async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with async_session() as session:
+            recorded = await session.scalar(select(func.count()).select_from(PriceHistory))
+            first = await session.scalar(select(PriceHistory).where(PriceHistory.store_id.is_(None))
+                                         .order_by(PriceHistory.id).limit(1))
+            current = await session.scalar(select(Product.price).where(Product.id == first.product_id))
+            start = get_datetime_obj().date().replace(day=1)
+            days = (get_datetime_obj().date() - start).days + 1
+            path = await price_matrix(session, [(store_ids[-1], first.product_id)], [current], start, days)
+
+    print(f"{stores} stores x {products} products")
+    print(f"single route: {singles} changes in {single.elapsed:.3f}s ({singles / single.elapsed:,.0f} changes/s)")
+    print(f"bulk route:   {len(changes)} changes in {batch.elapsed:.3f}s ({len(changes) / batch.elapsed:,.0f} changes/s), "
+          f"{batch.elapsed / len(changes) / (single.elapsed / singles):.1%} of the per-change cost")
+    print(f"  summary: { {key: value for key, value in summary.items() if key != 'missing'} }, "
+          f"missing {summary['missing']}")
+
+    assert summary["missing"] == [{"store_id": store_ids[0], "product_id": "NOPE"}]
+    assert recorded == singles + summary["applied"]
+    # Every change happened today, so earlier days carry the first recorded old price
+    assert path[0, 0] == first.old_price and path[0, -1] == current
+
+
+if __name__ == "__main__":
+    stores = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    products = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    singles = int(sys.argv[3]) if len(sys.argv) > 3 else 500
+    bulk = int(sys.argv[4]) if len(sys.argv) > 4 else 20000
+    asyncio.run(run(stores, products, singles, bulk))
@@ -0,0 +1,59 @@
+"""Agent coordinator over 1,000 stores with the offline fake LLM.
+
+Seeds a temporary database, then runs the coordinator at several worker counts.
+Every run shares one pooled engine and one LLM gateway over ``FakeLLM``, and
+sends every product to the model (see bench_restock_rules for the rules). The
+benchmark checks that the purchase orders add up to every below-minimum
+product in every store.
+
+Usage: python -m benchmarks.bench_coordinator [stores] [products] [llm_latency_ms]
+"""
+import asyncio
+import sys
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.agents.coordinator import AgentCoordinator
+from app.models.database import StoreInventory
+from app.services.fake_llm import FakeLLM
+from app.services.llm_gateway import LLMGateway
+from benchmarks.common import temp_database, seed_inventory
+
+
+async def expected_units(engine):
+    async with engine.connect() as conn:
+        result = await conn.execute(select(StoreInventory.stock_level, StoreInventory.min_threshold))
+        return sum(minimum - stock + 10 for stock, minimum in result if stock < minimum)
+
+
+async def run(stores: int, products: int, latency: float):
+    async with temp_database(db_pool_size=10, db_max_overflow=40) as engine:
+        await seed_inventory(engine, stores=stores, products=products)
+        expected = await expected_units(engine)
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        print(f"{stores} stores x {products} products, fake LLM {latency * 1000:.0f} ms per prompt, "
+              f"gateway: 4 concurrent calls of up to 8 prompts")
+        print(f"{'workers':>8}{'elapsed (s)':>13}{'stores/s':>10}{'store p50':>11}{'store p95':>11}"
+              f"{'db p50':>9}{'model calls':>13}{'orders':>8}")
+        for workers in (1, 10, 50):
+            llm = FakeLLM(latency)
+            gateway = LLMGateway("http://fake", "fake", max_concurrency=4, batch_size=8, batch_window=0.005,
+                                 client=llm)
+            coordinator = AgentCoordinator(session_factory, llm=gateway, max_workers=workers, use_rules=False)
+            report = await coordinator.run()
+            run_stats = report["run"]
+            print(f"{workers:>8}{run_stats['elapsed_seconds']:>13.2f}{run_stats['stores_per_second']:>10.1f}"
+                  f"{run_stats['store_seconds']['p50']:>11.3f}{run_stats['store_seconds']['p95']:>11.3f}"
+                  f"{run_stats['db_seconds_p50']:>9.3f}{llm.calls:>13}{len(report['purchase_orders']):>8}")
+
+            assert run_stats["succeeded"] == stores, run_stats["failed"][:3]
+            assert sum(order["total_units"] for order in report["purchase_orders"]) == expected
+
+
+if __name__ == "__main__":
+    stores = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    products = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    latency_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 20
+    asyncio.run(run(stores, products, latency_ms / 1000))
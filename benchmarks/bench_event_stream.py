@@ -0,0 +1,128 @@
+"""Fan-out of live stock events to many subscribers.
+
+Part one drives the in-process broker directly: thousands of subscribers on a
+handful of stores, a burst of stock changes, one subscriber that never reads.
+It reports publish throughput and checks that the stalled queue stays bounded
+and ends in a single ``resync``.
+
+Part two runs the app under uvicorn on a temporary database, opens SSE
+connections to /api/stream/{store_id}, posts stock updates and checks that
+every client receives every stock event and the threshold-crossing alert.
+
+Usage: python -m benchmarks.bench_event_stream [subscribers] [events] [sse_clients]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+import httpx
+
+from app.services.events import EventBroker, broker
+from benchmarks.common import temp_database, seed_inventory, serve_app, Timer
+
+
+async def broker_fanout(subscribers: int, events: int, stores: int = 10):
+    hub = EventBroker(queue_size=64, max_subscribers=subscribers + 1)
+    subscriptions = [hub.subscribe(f"store{i % stores}") for i in range(subscribers)]
+    stalled = hub.subscribe("store0")
+
+    async def drain(subscription):
+        received = 0
+        while True:
+            message = await subscription.next(timeout=5)
+            assert message is not None
+            if message.startswith(b"event: done"):
+                return received
+            received += 1
+
+    readers = [asyncio.ensure_future(drain(subscription)) for subscription in subscriptions]
+    with Timer() as timer:
+        for i in range(events):
+            hub.publish_stock(f"store{i % stores}", "P00001", 50 - i % 40, 20, -1)
+            if i % 32 == 31:
+                # Let readers run, as an event loop serving requests would
+                await asyncio.sleep(0)
+        for store in range(stores):
+            hub.publish(f"store{store}", "done", {})
+        received = await asyncio.gather(*readers)
+
+    deliveries = sum(received)
+    print(f"broker: {subscribers} subscribers on {stores} stores, {events} stock changes "
+          f"(+ alerts on threshold crossings)")
+    print(f"  {timer.elapsed:.3f}s, {deliveries / timer.elapsed:,.0f} deliveries/s, stats {hub.snapshot()}")
+    assert stalled.queue.qsize() <= hub.queue_size
+    assert stalled.overflowed and b"event: resync" in stalled.queue.get_nowait()
+
+
+async def sse_client(client, store_id, expected_stock, received_at, ready):
+    stock_events = alerts = 0
+    async with client.stream("GET", f"/api/stream/{store_id}") as response:
+        event = None
+        async for line in response.aiter_lines():
+            if line.startswith("event: "):
+                event = line[7:]
+            elif line.startswith("data: "):
+                if event == "ready":
+                    ready.release()
+                elif event == "stock":
+                    stock_events += 1
+                    received_at.append(time.perf_counter())
+                elif event == "alert":
+                    alerts += 1
+                if stock_events == expected_stock:
+                    return stock_events, alerts
+
+
+async def sse_end_to_end(clients: int, updates: int = 30):
+    async with temp_database(wal=True) as engine:
+        store_ids, product_ids = await seed_inventory(engine, stores=2, products=5)
+        server, task, base_url = await serve_app(engine)
+        try:
+            limits = httpx.Limits(max_connections=clients + 10)
+            async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+                # Start above the threshold so the updates below cross it exactly once
+                await client.post("/api/inventory/update", json={
+                    "store_id": store_ids[0], "product_id": product_ids[0], "quantity": 1000
+                })
+                level = (await client.get(f"/api/inventory/{store_ids[0]}")).json()["inventory"][0]["current_stock"]
+                step = -(level - 10) // updates - 1
+
+                ready = asyncio.Semaphore(0)
+                received_at = []
+                listeners = [
+                    asyncio.ensure_future(sse_client(client, store_ids[0], updates, received_at, ready))
+                    for _ in range(clients)
+                ]
+                for _ in range(clients):
+                    await asyncio.wait_for(ready.acquire(), 30)
+
+                sent_at = []
+                with Timer() as timer:
+                    for _ in range(updates):
+                        sent_at.append(time.perf_counter())
+                        response = await client.post("/api/inventory/update", json={
+                            "store_id": store_ids[0], "product_id": product_ids[0], "quantity": step
+                        })
+                        assert response.status_code == 200, response.text
+                    results = await asyncio.wait_for(asyncio.gather(*listeners), 60)
+        finally:
+            server.should_exit = True
+            await task
+
+    assert all(stock == updates and alerts == 1 for stock, alerts in results), results
+    lag = [received - sent_at[-1] for received in received_at[-clients:]]
+    print(f"sse: {clients} clients x {updates} stock updates over HTTP in {timer.elapsed:.3f}s; "
+          f"every client got every event and 1 alert; last-event lag p50 {statistics.median(lag) * 1000:.1f} ms")
+
+
+async def run(subscribers: int, events: int, clients: int):
+    await broker_fanout(subscribers, events)
+    await sse_end_to_end(clients)
+
+
+if __name__ == "__main__":
+    subscribers = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    events = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    clients = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+    asyncio.run(run(subscribers, events, clients))
@@ -0,0 +1,116 @@
+"""Streaming exports against the buffered inventory read.
+
+Seeds a temporary database with one large store and a chain-wide sales
+history, serves the app under uvicorn and downloads:
+
+- GET /api/inventory/{store_id}, which builds the whole JSON body first
+- GET /api/export/inventory and /api/export/sales as NDJSON and CSV
+
+For each it reports time to first byte, total time, size and the peak Python
+memory allocated while serving (tracemalloc, server and client share the
+process; the client discards chunks as they arrive). tracemalloc slows
+everything several times over, so compare the timings with each other only.
+Row counts are checked against the database.
+
+Usage: python -m benchmarks.bench_export [products] [sales]
+"""
+import asyncio
+import logging
+import random
+import sys
+import time
+import tracemalloc
+from datetime import timedelta
+
+import httpx
+from sqlalchemy import insert
+
+from app.models.database import SalesHistory
+from app.services.cache import response_cache
+from app.config.constants import CURRENT_USER, get_datetime_obj
+from benchmarks.common import temp_database, seed_inventory, serve_app
+
+
+async def seed_sales(engine, store_ids, product_ids, count: int, seed: int = 5):
+    rng = random.Random(seed)
+    now = get_datetime_obj()
+    async with engine.begin() as conn:
+        for start in range(0, count, 50000):
+            await conn.execute(insert(SalesHistory), [
+                {
+                    "store_id": rng.choice(store_ids),
+                    "product_id": rng.choice(product_ids),
+                    "quantity": rng.randint(1, 5),
+                    "sale_date": now - timedelta(minutes=rng.randint(0, 60 * 24 * 90)),
+                    "recorded_by": CURRENT_USER
+                }
+                for _ in range(min(50000, count - start))
+            ])
+
+
+async def download(client, path):
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    first_byte = None
+    size = lines = 0
+    async with client.stream("GET", path) as response:
+        assert response.status_code == 200, await response.aread()
+        async for chunk in response.aiter_bytes():
+            if first_byte is None:
+                first_byte = time.perf_counter() - started
+            size += len(chunk)
+            lines += chunk.count(b"\n")
+    total = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    return first_byte, total, size, lines, peak
+
+
+def report(label, first_byte, total, size, peak):
+    print(f"{label:<34}{first_byte * 1000:>10.0f}{total:>10.2f}{size / 2**20:>10.1f}{peak / 2**20:>12.1f}")
+
+
+async def run(products: int, sales: int):
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    # Measure building the body, not replaying it from the response cache
+    response_cache.max_entries = 0
+    async with temp_database(db_pool_size=5) as engine:
+        store_ids, product_ids = await seed_inventory(engine, stores=1, products=products)
+        sale_stores = [f"store{i}" for i in range(50)]
+        await seed_sales(engine, sale_stores, product_ids, sales)
+        server, task, base_url = await serve_app(engine)
+        tracemalloc.start()
+        try:
+            async with httpx.AsyncClient(base_url=base_url, timeout=300) as client:
+                print(f"1 store x {products:,} products, {sales:,} sales rows")
+                print(f"{'request':<34}{'TTFB ms':>10}{'total s':>10}{'MiB':>10}{'peak MiB':>12}")
+
+                first_byte, total, size, _, peak = await download(client, f"/api/inventory/{store_ids[0]}")
+                report("inventory (buffered JSON)", first_byte, total, size, peak)
+                buffered_peak = peak
+
+                for fmt in ("ndjson", "csv"):
+                    first_byte, total, size, lines, peak = await download(
+                        client, f"/api/export/inventory?store_id={store_ids[0]}&format={fmt}"
+                    )
+                    report(f"export inventory {fmt}", first_byte, total, size, peak)
+                    assert lines == products + (fmt == "csv")
+                    assert peak < buffered_peak / 3
+
+                for fmt in ("ndjson", "csv"):
+                    first_byte, total, size, lines, peak = await download(client, f"/api/export/sales?format={fmt}")
+                    report(f"export sales (chain) {fmt}", first_byte, total, size, peak)
+                    assert lines == sales + (fmt == "csv")
+
+                response = await client.get("/api/export/sales?format=xml")
+                assert response.status_code == 400
+        finally:
+            tracemalloc.stop()
+            server.should_exit = True
+            await task
+
+
+if __name__ == "__main__":
+    products = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    sales = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    asyncio.run(run(products, sales))
@@ -0,0 +1,47 @@
+"""Accuracy (MAPE) and throughput of the vectorized forecasting models.
+
+Generates a synthetic multi-year daily sales panel with trend, weekly and yearly
+seasonality and Poisson noise, then forecasts the final ``horizon`` days from the
+rest of the history for every series at once.
+
+Usage: python -m benchmarks.bench_forecast_engine [series] [years] [horizon]
+"""
+import sys
+
+import numpy as np
+
+from app.services.forecast_engine import METHODS, DEFAULT_HISTORY_DAYS, forecast, mape
+from benchmarks.common import Timer
+
+
+def synthetic_sales(series: int, days: int, seed: int = 7) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    t = np.arange(days)
+    base = rng.uniform(2, 40, size=(series, 1))
+    trend = rng.normal(0, 0.0005, size=(series, 1)) * t
+    weekly = rng.uniform(0, 0.4, size=(series, 1)) * np.sin(2 * np.pi * (t + rng.integers(0, 7, (series, 1))) / 7)
+    yearly = rng.uniform(0, 0.3, size=(series, 1)) * np.sin(2 * np.pi * t / 365.25)
+    return rng.poisson(np.clip(base * (1 + trend + weekly + yearly), 0, None)).astype(float)
+
+
+def run(series: int, years: int, horizon: int):
+    sales = synthetic_sales(series, years * 365)
+    history, actual = sales[:, :-horizon], sales[:, -horizon:]
+    recent = history[:, -DEFAULT_HISTORY_DAYS:]
+
+    print(f"{series} series x {years * 365} days, horizon {horizon} days")
+    print(f"{'method':<24}{'MAPE %':>10}{'full (s)':>12}{'series/s':>14}{'window (s)':>12}{'series/s':>14}")
+    for method in METHODS:
+        with Timer() as full:
+            predictions, _ = forecast(history, horizon, method)
+        with Timer() as window:
+            forecast(recent, horizon, method)
+        print(f"{method:<24}{mape(actual, predictions):>10.2f}{full.elapsed:>12.3f}{series / full.elapsed:>14,.0f}"
+              f"{window.elapsed:>12.3f}{series / window.elapsed:>14,.0f}")
+
+
+if __name__ == "__main__":
+    series = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    years = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    horizon = int(sys.argv[3]) if len(sys.argv) > 3 else 14
+    run(series, years, horizon)
@@ -0,0 +1,113 @@
+"""Materialized forecast store: read-through serving and incremental refresh.
+
+Seeds a temporary database with daily sales and measures:
+
+- GET /api/forecast/{store_id} computing every series on the fly (the first,
+  cold request, which also stores them) against later requests served from
+  ``demand_forecast``, checking both return the same numbers and that another
+  method is computed for its request without touching the store
+- a chain-wide ``refresh_forecasts`` with ``force`` against an incremental one
+  after POST /api/sales/bulk touched a few series, checking only those were
+  recomputed, that GET served them stale first without recomputing, and that
+  refreshes overwrite rows rather than append them
+
+Usage: python -m benchmarks.bench_forecast_store [stores] [products] [touched]
+"""
+import asyncio
+import logging
+import random
+import sys
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.database import DemandForecast, ForecastSeries
+from app.services.cache import response_cache
+from app.services.forecast_engine import METHODS
+from app.services.forecast_store import refresh_forecasts, STORED_METHOD
+from app.config.constants import FORECAST_STORE_DAYS, get_datetime_obj
+from benchmarks.common import temp_database, seed_inventory, seed_daily_sales, api_client, Timer
+
+
+async def count_rows(session_factory):
+    async with session_factory() as session:
+        return await session.scalar(select(func.count()).select_from(DemandForecast))
+
+
+async def run(stores: int, products: int, touched: int):
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    response_cache.max_entries = 0
+    async with temp_database(db_pool_size=5) as engine:
+        store_ids, product_ids = await seed_inventory(engine, stores=stores, products=products)
+        await seed_daily_sales(engine, store_ids, product_ids, 56, get_datetime_obj().date())
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        async with api_client(engine) as client:
+            path = f"/api/forecast/{store_ids[0]}?days=7"
+            with Timer() as cold:
+                first = (await client.get(path)).json()
+            assert first["freshness"]["recomputed_series"] == products
+            warm_times = []
+            for _ in range(5):
+                with Timer() as warm:
+                    again = (await client.get(path)).json()
+                warm_times.append(warm.elapsed)
+            assert again["freshness"]["recomputed_series"] == 0
+            assert again["forecast"] == first["forecast"]
+
+            # Another method is computed for the request alone and leaves the store as it was
+            other_method = next(method for method in METHODS if method != STORED_METHOD)
+            other = (await client.get(path + f"&method={other_method}")).json()["freshness"]
+            assert other["generation"] is None and other["recomputed_series"] == products, other
+            after_other = (await client.get(path)).json()
+            assert after_other["freshness"]["recomputed_series"] == 0 and after_other["forecast"] == first["forecast"]
+
+            async with session_factory() as session:
+                with Timer() as full:
+                    forced = await refresh_forecasts(session, days=FORECAST_STORE_DAYS, force=True)
+            assert forced["series"] == stores * products
+            rows = await count_rows(session_factory)
+            assert rows == stores * products * FORECAST_STORE_DAYS
+
+            rng = random.Random(3)
+            series = rng.sample([(store_id, product_id) for store_id in store_ids for product_id in product_ids],
+                                touched)
+            response = await client.post("/api/sales/bulk", json={"sales": [
+                {"store_id": store_id, "product_id": product_id, "quantity": 25}
+                for store_id, product_id in series
+            ]})
+            assert response.status_code == 200, response.text
+            in_first_store = sum(store_id == store_ids[0] for store_id, _ in series)
+
+            stale = (await client.get(path)).json()["freshness"]
+            assert stale["stale_series"] == in_first_store and stale["recomputed_series"] == 0, stale
+
+            async with session_factory() as session:
+                with Timer() as incremental:
+                    refreshed = await refresh_forecasts(session, days=FORECAST_STORE_DAYS)
+                changed = set((await session.execute(
+                    select(ForecastSeries.store_id, ForecastSeries.product_id)
+                    .where(ForecastSeries.generation == refreshed["generation"])
+                )).all())
+            assert refreshed["series"] == touched and changed == set(series)
+            assert await count_rows(session_factory) == rows
+
+            fresh = (await client.get(path)).json()["freshness"]
+            assert fresh["stale_series"] == 0
+
+    warm_times.sort()
+    print(f"{stores} stores x {products:,} products, 56 days of history, "
+          f"{FORECAST_STORE_DAYS}-day stored horizon")
+    print(f"  GET /api/forecast, computed and stored (cold)  {cold.elapsed * 1000:8.1f} ms")
+    print(f"  GET /api/forecast, served from store (warm)    {warm_times[len(warm_times) // 2] * 1000:8.1f} ms")
+    print(f"  full refresh, {forced['series']:,} series              {full.elapsed:8.2f} s")
+    print(f"  incremental refresh after {touched} changed series   {incremental.elapsed:8.3f} s "
+          f"({refreshed['series']} recomputed)")
+    print(f"  demand_forecast rows after both refreshes: {rows:,} (upserted, not appended)")
+
+
+if __name__ == "__main__":
+    stores = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    products = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    touched = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+    asyncio.run(run(stores, products, touched))
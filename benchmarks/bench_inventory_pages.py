@@ -0,0 +1,93 @@
+"""Projection and keyset pagination on GET /api/inventory/{store_id}.
+
+Seeds one store with many products and measures, through the in-process API
+(response cache off):
+
+- the full read, against loading the same rows as ORM entities as before
+- ``fields=product_id,current_stock``
+- walking every page with ``limit``/``after``, checking each product comes back
+  exactly once, and the cost of the first and the last page
+- the last page by OFFSET instead of by cursor, for comparison
+- category and stock-range filters, checked against the database
+
+Usage: python -m benchmarks.bench_inventory_pages [products] [page_size]
+"""
+import asyncio
+import logging
+import sys
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.database import StoreInventory, Product
+from app.services.cache import response_cache
+from benchmarks.common import temp_database, seed_inventory, api_client, Timer
+
+
+async def run(products: int, page_size: int):
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    response_cache.max_entries = 0
+    async with temp_database(db_pool_size=5) as engine:
+        store_ids, product_ids = await seed_inventory(engine, stores=1, products=products)
+        store_id = store_ids[0]
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        async with session_factory() as session:
+            with Timer() as entities:
+                result = await session.execute(
+                    select(StoreInventory, Product).join(Product).where(StoreInventory.store_id == store_id)
+                )
+                [(item.StoreInventory.stock_level, item.Product.name) for item in result.all()]
+            with Timer() as offset_page:
+                result = await session.execute(
+                    select(StoreInventory, Product).join(Product).where(StoreInventory.store_id == store_id)
+                    .order_by(StoreInventory.product_id).offset(products - page_size).limit(page_size)
+                )
+                result.all()
+            footwear = await session.scalar(select(func.count()).select_from(StoreInventory).join(Product).where(
+                Product.category == "Footwear", StoreInventory.stock_level.between(10, 50)
+            ))
+
+        async with api_client(engine) as client:
+            with Timer() as full:
+                response = await client.get(f"/api/inventory/{store_id}")
+            assert len(response.json()["inventory"]) == products
+
+            with Timer() as narrow:
+                response = await client.get(f"/api/inventory/{store_id}?fields=product_id,current_stock")
+            assert set(response.json()["inventory"][0]) == {"product_id", "current_stock"}
+
+            seen, page_times, cursor = [], [], None
+            while True:
+                path = f"/api/inventory/{store_id}?limit={page_size}" + (f"&after={cursor}" if cursor else "")
+                with Timer() as page:
+                    body = (await client.get(path)).json()
+                page_times.append(page.elapsed)
+                seen.extend(item["product_id"] for item in body["inventory"])
+                cursor = body["next_cursor"]
+                if cursor is None:
+                    break
+            assert seen == sorted(product_ids)
+
+            response = await client.get(
+                f"/api/inventory/{store_id}?category=Footwear&min_stock=10&max_stock=50&fields=category,current_stock"
+            )
+            items = response.json()["inventory"]
+            assert len(items) == footwear
+            assert all(item["category"] == "Footwear" and 10 <= item["current_stock"] <= 50 for item in items)
+            assert (await client.get(f"/api/inventory/{store_id}?fields=nope")).status_code == 400
+
+    print(f"1 store x {products:,} products, pages of {page_size}")
+    print(f"  full read as ORM entities (before)   {entities.elapsed:8.3f}s (query + hydration only)")
+    print(f"  full read, projected columns         {full.elapsed:8.3f}s (whole request)")
+    print(f"  fields=product_id,current_stock      {narrow.elapsed:8.3f}s")
+    print(f"  {len(page_times)} keyset pages                      {sum(page_times):8.3f}s, "
+          f"first {page_times[0] * 1000:.1f} ms, last {page_times[-1] * 1000:.1f} ms")
+    print(f"  last page by OFFSET (query only)     {offset_page.elapsed * 1000:8.1f} ms")
+    print(f"  category + stock range filter: {len(items)} rows")
+
+
+if __name__ == "__main__":
+    products = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    page_size = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    asyncio.run(run(products, page_size))
@@ -0,0 +1,202 @@
+"""Background jobs: precomputed alert velocity, forecast refresh and the scheduler's guarantees.
+
+Seeds a temporary database, runs the app's job scheduler against it and,
+through the in-process API (response cache off):
+
+- times the alert endpoint aggregating daily_sales on demand, then again
+  reading the sales_velocity table after an alert_materialization job, and
+  checks both give the same figures
+- runs forecast_refresh and rollup_compaction through POST /api/jobs and
+  checks the rows they wrote
+- times /api/forecast/{store_id}?explain=true, which now returns at once with
+  a job to poll, against a model that takes ``llm_latency`` seconds
+- checks retries, the per-job concurrency cap, that a cron slot is queued
+  once, and that jobs whose heartbeat expired are requeued while a live
+  worker's are left alone, with throwaway jobs registered here
+
+Usage: python -m benchmarks.bench_jobs [stores] [products] [llm_latency]
+"""
+import asyncio
+import logging
+import statistics
+import sys
+from datetime import datetime
+
+from sqlalchemy import select, func, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.database import DemandForecast, Job
+from app.services import jobs
+from app.services.cache import response_cache
+from app.services.fake_llm import FakeLLM
+from app.services.llm_gateway import get_llm_gateway
+from app.config.constants import get_datetime_obj
+from benchmarks.common import temp_database, seed_inventory, seed_daily_sales, api_client, Timer
+
+active = {"bench_sleep": 0}
+peak = {"bench_sleep": 0}
+failures = {}
+
+
+@jobs.job("bench_sleep", max_concurrency=2)
+async def bench_sleep(session, seconds: float = 0.05):
+    active["bench_sleep"] += 1
+    peak["bench_sleep"] = max(peak["bench_sleep"], active["bench_sleep"])
+    await asyncio.sleep(seconds)
+    active["bench_sleep"] -= 1
+    return {"slept": seconds}
+
+
+@jobs.job("bench_flaky", max_attempts=3)
+async def bench_flaky(session, key: str, fail_times: int):
+    failures[key] = failures.get(key, 0) + 1
+    if failures[key] <= fail_times:
+        raise RuntimeError(f"failure {failures[key]}")
+    return {"attempts": failures[key]}
+
+
+async def wait_for(client, job_id: int, timeout: float = 120):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        body = (await client.get(f"/api/jobs/{job_id}")).json()
+        if body["status"] in ("succeeded", "failed"):
+            return body
+        assert asyncio.get_running_loop().time() < deadline, body
+        await asyncio.sleep(0.02)
+
+
+async def alert_latencies(client, store_ids, rounds: int = 3):
+    times, bodies = [], {}
+    for _ in range(rounds):
+        for store_id in store_ids:
+            with Timer() as timer:
+                response = await client.get(f"/api/inventory-alerts/{store_id}")
+            assert response.status_code == 200
+            times.append(timer.elapsed)
+            bodies[store_id] = response.json()
+    return times, bodies
+
+
+async def run(stores: int, products: int, llm_latency: float):
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("app.services.jobs").setLevel(logging.CRITICAL)
+    response_cache.max_entries = 0
+    jobs.JOB_RETRY_BACKOFF_SECONDS = 0
+    gateway = get_llm_gateway()
+    gateway.client, gateway.cache = FakeLLM(latency=llm_latency, respond=lambda prompt: "Demand is steady."), None
+
+    async with temp_database(db_pool_size=5) as engine:
+        store_ids, product_ids = await seed_inventory(engine, stores=stores, products=products)
+        sales_rows = await seed_daily_sales(engine, store_ids, product_ids, 28, get_datetime_obj().date())
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        scheduler = jobs.scheduler
+        scheduler.session_factory, scheduler.workers, scheduler.poll_seconds = session_factory, 4, 0.05
+        await scheduler.start()
+        try:
+            async with api_client(engine) as client:
+                on_demand, before = await alert_latencies(client, store_ids)
+                assert all(body["velocity_as_of"] is None for body in before.values())
+
+                created = await client.post("/api/jobs", json={"name": "alert_materialization"})
+                assert created.status_code == 202
+                with Timer() as materialize:
+                    done = await wait_for(client, created.json()["id"])
+                assert done["status"] == "succeeded", done
+
+                materialized, after = await alert_latencies(client, store_ids)
+                for store_id in store_ids:
+                    assert after[store_id]["velocity_as_of"] is not None
+                    assert [alert["avg_daily_sales"] for alert in after[store_id]["alerts"]] == \
+                        [alert["avg_daily_sales"] for alert in before[store_id]["alerts"]]
+
+                refresh = await wait_for(client, (await client.post(
+                    "/api/jobs", json={"name": "forecast_refresh", "params": {"days": 7}}
+                )).json()["id"])
+                assert refresh["status"] == "succeeded", refresh
+                async with session_factory() as session:
+                    forecast_rows = await session.scalar(select(func.count()).select_from(DemandForecast))
+                assert forecast_rows == stores * products * 7
+                assert refresh["result"]["series"] == stores * products
+                compaction = await wait_for(client, (await client.post(
+                    "/api/jobs", json={"name": "rollup_compaction"}
+                )).json()["id"])
+                assert compaction["status"] == "succeeded", compaction
+
+                with Timer() as explain_request:
+                    body = (await client.get(f"/api/forecast/{store_ids[0]}?explain=true")).json()
+                with Timer() as explain_job:
+                    explained = await wait_for(client, body["explanation_job"]["id"])
+                assert explained["result"]["explanation"] == "Demand is steady."
+
+                sleepers = [(await client.post("/api/jobs", json={"name": "bench_sleep"})).json()["id"]
+                            for _ in range(6)]
+                for job_id in sleepers:
+                    assert (await wait_for(client, job_id))["status"] == "succeeded"
+                assert peak["bench_sleep"] == 2, peak
+
+                flaky = await wait_for(client, (await client.post("/api/jobs", json={
+                    "name": "bench_flaky", "params": {"key": "recovers", "fail_times": 2}
+                })).json()["id"])
+                assert flaky["status"] == "succeeded" and flaky["attempts"] == 3, flaky
+                broken = await wait_for(client, (await client.post("/api/jobs", json={
+                    "name": "bench_flaky", "params": {"key": "broken", "fail_times": 9}
+                })).json()["id"])
+                assert broken["status"] == "failed" and broken["attempts"] == 3, broken
+
+                assert (await client.post("/api/jobs", json={"name": "nope"})).status_code == 400
+                assert (await client.get("/api/jobs/999999")).status_code == 404
+                listed = (await client.get("/api/jobs?status=failed")).json()["jobs"]
+                assert [row["id"] for row in listed] == [broken["id"]]
+
+                # Another process queueing the same cron slot is refused
+                slot = datetime.now().replace(second=0, microsecond=0)
+                async with session_factory() as session:
+                    await jobs.enqueue(session, "bench_sleep", run_at=slot, scheduled_for=slot)
+                    try:
+                        await jobs.enqueue(session, "bench_sleep", run_at=slot, scheduled_for=slot)
+                        raise AssertionError("cron slot queued twice")
+                    except IntegrityError:
+                        await session.rollback()
+
+                # A job whose process stopped heartbeating is picked up again on the next start,
+                # one a live worker elsewhere is heartbeating is not
+                await scheduler.stop()
+                async with session_factory() as session:
+                    orphan, live = [(await session.execute(insert(Job).values(
+                        name=name, params=params, status="running", attempts=1, max_attempts=3,
+                        run_at=datetime.now(), created_at=datetime.now(), started_at=datetime.now(),
+                        worker_id=worker_id, heartbeat_at=heartbeat_at
+                    ).returning(Job.id))).scalar_one() for name, params, worker_id, heartbeat_at in [
+                        ("bench_sleep", "{}", "crashed", None),
+                        ("bench_flaky", '{"key": "live", "fail_times": 0}', "elsewhere", datetime.now()),
+                    ]]
+                    await session.commit()
+                await scheduler.start()
+                assert (await wait_for(client, orphan))["status"] == "succeeded"
+                live_row = (await client.get(f"/api/jobs/{live}")).json()
+                assert live_row["status"] == "running" and live_row["worker_id"] == "elsewhere", live_row
+        finally:
+            await scheduler.stop()
+
+    def summary(times):
+        ordered = sorted(times)
+        p95 = ordered[int(len(ordered) * 0.95)]
+        return f"median {statistics.median(ordered) * 1000:6.1f} ms, p95 {p95 * 1000:6.1f} ms"
+
+    print(f"{stores} stores x {products:,} products, {sales_rows:,} daily_sales rows")
+    print(f"  alerts, velocity from daily_sales   {summary(on_demand)}")
+    print(f"  alerts, materialized sales_velocity {summary(materialized)}")
+    print(f"  alert_materialization job           {materialize.elapsed:8.2f}s "
+          f"({done['result']['series']:,} series)")
+    print(f"  forecast_refresh job                {forecast_rows:,} forecast rows")
+    print(f"  forecast?explain=true               {explain_request.elapsed * 1000:6.1f} ms to respond, "
+          f"explanation ready {explain_job.elapsed:.2f}s later (model latency {llm_latency}s)")
+    print(f"  concurrency cap 2: peak {peak['bench_sleep']} of 6 queued; retries, cron dedupe and lease requeue OK")
+
+
+if __name__ == "__main__":
+    stores = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    products = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    llm_latency = float(sys.argv[3]) if len(sys.argv) > 3 else 2.0
+    asyncio.run(run(stores, products, llm_latency))
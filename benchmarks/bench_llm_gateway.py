@@ -0,0 +1,102 @@
+"""LLM gateway against a local fake Ollama server.
+
+Compares one Ollama client per call (the old per-agent pattern) with the shared
+gateway for a fleet of stores, then checks coalescing of duplicate prompts, the
+disk cache on a repeated run, and JSON re-prompting after an unparseable answer.
+
+Usage: python -m benchmarks.bench_llm_gateway [stores] [latency_ms]
+"""
+import asyncio
+import json
+import shutil
+import sys
+import tempfile
+
+from app.services.llm_gateway import LLMGateway, PromptCache, JSON_RETRY_SUFFIX
+from benchmarks.common import Timer
+from benchmarks.fake_ollama import FakeOllama
+
+MODEL = "mistral"
+
+
+def store_prompt(store_id: int) -> str:
+    return f"Analyze the inventory of store{store_id} and return a JSON list of products that need restocking."
+
+
+def make_gateway(fake, cache_dir=None, max_concurrency=4, batch_size=8):
+    cache = PromptCache(cache_dir, ttl=3600) if cache_dir else None
+    return LLMGateway(fake.base_url, MODEL, max_concurrency=max_concurrency, batch_size=batch_size,
+                      batch_window=0.01, cache=cache)
+
+
+async def per_call_clients(fake, prompts):
+    from langchain.llms import Ollama
+
+    async def call(prompt):
+        llm = Ollama(base_url=fake.base_url, model=MODEL)
+        response = await llm.agenerate([prompt])
+        return response.generations[0][0].text
+
+    return await asyncio.gather(*(call(prompt) for prompt in prompts))
+
+
+def report(label, fake, timer, gateway=None):
+    line = f"{label:<34}{timer.elapsed:>9.3f}s{fake.requests:>10}{fake.peak_active:>8}"
+    if gateway is not None:
+        line += "   " + ", ".join(f"{name}={value:g}" for name, value in sorted(gateway.stats.items()))
+    print(line)
+
+
+async def run(stores: int, latency: float):
+    cache_dir = tempfile.mkdtemp(prefix="llm_cache_")
+    prompts = [store_prompt(i) for i in range(stores)]
+    print(f"{stores} store prompts, {latency * 1000:.0f} ms simulated model latency")
+    print(f"{'scenario':<34}{'elapsed':>10}{'requests':>10}{'peak':>8}")
+    try:
+        async with FakeOllama(latency=latency) as fake:
+            with Timer() as timer:
+                await per_call_clients(fake, prompts)
+            report("client per call", fake, timer)
+
+        async with FakeOllama(latency=latency) as fake:
+            gateway = make_gateway(fake, max_concurrency=4)
+            with Timer() as timer:
+                answers = await asyncio.gather(*(gateway.generate_json(prompt) for prompt in prompts))
+            report("gateway, unique prompts", fake, timer, gateway)
+            assert fake.peak_active <= 4
+            assert answers == [{"prompt_chars": len(prompt)} for prompt in prompts]
+
+        # Every store asks one of ten identical questions at once
+        duplicated = [prompts[i % 10] for i in range(stores)]
+        async with FakeOllama(latency=latency) as fake:
+            gateway = make_gateway(fake, cache_dir)
+            with Timer() as timer:
+                await asyncio.gather(*(gateway.generate(prompt) for prompt in duplicated))
+            report("gateway, 10 distinct prompts", fake, timer, gateway)
+            assert fake.requests == 10
+
+            with Timer() as timer:
+                await asyncio.gather(*(gateway.generate(prompt) for prompt in duplicated))
+            report("  same again (disk cache)", fake, timer, gateway)
+            assert fake.requests == 10
+
+        # Prose without JSON the first time; the re-prompt gets a bare JSON answer
+        def flaky(prompt):
+            if prompt.endswith(JSON_RETRY_SUFFIX):
+                return json.dumps(["P00001"])
+            return "Product P00001 is running low and should be restocked."
+
+        async with FakeOllama(respond=flaky, latency=latency) as fake:
+            gateway = make_gateway(fake, cache_dir)
+            with Timer() as timer:
+                answer = await gateway.generate_json("Which products in store0 need restocking?")
+            report("gateway, JSON retry", fake, timer, gateway)
+            assert answer == ["P00001"] and gateway.stats["parse_failures"] == 1
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    stores = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 20
+    asyncio.run(run(stores, latency_ms / 1000))
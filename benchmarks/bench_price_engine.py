@@ -0,0 +1,95 @@
+"""Elasticity recovery and throughput of the vectorized price optimizer.
+
+Part one simulates daily sales under known per-category elasticities and
+randomly varied prices, then checks how closely ``estimate_elasticity``
+recovers them. Part two optimizes every (store, product) series of a chain of
+``stores`` x ``skus`` (default 1,000 x 100,000) for both objectives, a block of
+stores at a time, checks the price constraints and that a repeated run gives
+identical prices.
+
+Usage: python -m benchmarks.bench_price_engine [skus] [stores] [stores_per_block]
+"""
+import sys
+
+import numpy as np
+
+from app.services.price_engine import estimate_elasticity, optimize, OBJECTIVES, DEFAULT_MAX_CHANGE, MIN_MARGIN
+from benchmarks.common import Timer
+
+
+def elasticity_recovery(products: int = 2000, stores: int = 20, days: int = 56, categories: int = 8, seed: int = 3):
+    rng = np.random.default_rng(seed)
+    true_category = rng.uniform(-3, -0.5, categories)
+    product_category = rng.integers(0, categories, products)
+    true_product = true_category[product_category] + rng.normal(0, 0.2, products)
+
+    base_price = rng.uniform(5, 150, products)
+    # Each product is repriced a few times over the window, identically in every store
+    steps = np.cumsum(rng.random((products, days)) < 0.05, axis=1)
+    prices = base_price[:, None] * (1 + 0.15 * np.sin(steps * 1.7 + rng.uniform(0, 6, (products, 1))))
+    base_demand = rng.uniform(1, 30, (stores, products))
+
+    series_prices = np.tile(prices, (stores, 1))
+    expected = base_demand.reshape(-1, 1) * (series_prices / base_price[np.tile(np.arange(products), stores), None]) \
+        ** true_product[np.tile(np.arange(products), stores), None]
+    quantities = rng.poisson(expected)
+    product_index = np.tile(np.arange(products), stores)
+
+    with Timer() as timer:
+        estimated = estimate_elasticity(series_prices, quantities, product_index, product_category)
+    error = np.abs(estimated - np.clip(true_product, -4, -0.3))
+    print(f"elasticity: {products} products x {stores} stores x {days} days estimated in {timer.elapsed:.3f}s; "
+          f"abs error median {np.median(error):.3f}, p90 {np.quantile(error, 0.9):.3f}")
+    assert np.median(error) < 0.25
+
+    flat = estimate_elasticity(np.full((4, days), 10.0), np.ones((4, days)), np.arange(4), np.zeros(4, dtype=int))
+    assert np.allclose(flat, -1.5), "no price variation must fall back to the prior"
+
+
+def chain_inputs(skus: int, first_store: int, stores: int, seed: int = 11):
+    """Deterministic inputs for a block of stores; prices and costs are per product."""
+    catalog = np.random.default_rng(seed)
+    price = catalog.uniform(5, 150, skus)
+    cost = price * catalog.uniform(0.4, 0.8, skus)
+    elasticity = catalog.uniform(-3, -0.5, skus)
+    block = np.random.default_rng([seed, first_store])
+    demand = block.gamma(1.5, 2.0, (stores, skus)) * (block.random((stores, skus)) > 0.1)
+    stock = block.integers(0, 200, (stores, skus))
+    return price, cost, demand, stock, elasticity
+
+
+def optimize_chain(skus: int, stores: int, block: int, objective: str):
+    """Optimize every block; returns (optimizer seconds, price checksum, series repriced)."""
+    elapsed = checksum = 0.0
+    changed = 0
+    for first in range(0, stores, block):
+        price, cost, demand, stock, elasticity = chain_inputs(skus, first, min(block, stores - first))
+        with Timer() as timer:
+            suggested, _ = optimize(price, cost, demand, stock, elasticity, objective)
+        elapsed += timer.elapsed
+        lower = np.maximum(price * (1 - DEFAULT_MAX_CHANGE), cost * (1 + MIN_MARGIN))
+        assert (suggested >= np.round(lower, 2) - 0.01).all()
+        assert (suggested <= np.round(np.maximum(price * (1 + DEFAULT_MAX_CHANGE), lower), 2) + 0.01).all()
+        checksum += float(suggested.sum())
+        changed += int((np.abs(suggested - price) >= 0.01).sum())
+    return elapsed, checksum, changed
+
+
+def run(skus: int, stores: int, block: int):
+    elasticity_recovery()
+    series = skus * stores
+    print(f"optimizer: {stores:,} stores x {skus:,} SKUs = {series:,} series, {block} stores per block")
+    for objective in OBJECTIVES:
+        elapsed, checksum, changed = optimize_chain(skus, stores, block, objective)
+        print(f"  {objective:<8} {elapsed:7.2f}s  {series / elapsed:>14,.0f} series/s  {changed / series:.1%} repriced")
+        # Deterministic: a second pass over the first blocks gives the same prices
+        _, first_checksum, _ = optimize_chain(skus, min(stores, 2 * block), block, objective)
+        _, again, _ = optimize_chain(skus, min(stores, 2 * block), block, objective)
+        assert first_checksum == again
+
+
+if __name__ == "__main__":
+    skus = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    stores = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    block = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    run(skus, stores, block)
@@ -0,0 +1,159 @@
+"""Prompt size and end-to-end latency of raw JSON prompts vs the compact encoders.
+
+Builds one synthetic store (inventory rows and individual sales over the alert
+window), renders the inventory-check and forecast prompts the old way (json.dumps
+of every row / sale) and with ``app.services.prompt_context``, and sends each
+through the LLM gateway to a fake Ollama whose latency grows with prompt tokens.
+
+Usage: python -m benchmarks.bench_prompt_context [products] [sales_per_day] [budget]
+"""
+import asyncio
+import json
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.config.constants import CURRENT_USER, ALERT_SALES_WINDOW_DAYS, get_datetime_obj
+from app.services.forecast_engine import forecast
+from app.services.llm_gateway import LLMGateway
+from app.services.prompt_context import encode_inventory, encode_forecast, estimate_tokens
+from benchmarks.common import Timer
+from benchmarks.fake_ollama import FakeOllama
+
+# Prompt processing at ~5k tokens/s, in the range of a 7B model on a consumer GPU
+TOKEN_LATENCY = 0.0002
+
+
+def synthetic_store(products: int, sales_per_day: float, days: int, seed: int = 11):
+    rng = np.random.default_rng(seed)
+    now = get_datetime_obj()
+    start = now.date() + timedelta(days=1 - days)
+    inventory = [
+        {
+            "product_id": f"P{i:05d}",
+            "name": f"Product {i}",
+            "current_stock": int(rng.integers(0, 150)),
+            "min_threshold": 20,
+            "last_updated_by": CURRENT_USER if rng.random() > 0.02 else "store_manager",
+            "last_updated_at": now - timedelta(minutes=int(rng.integers(0, 5)) * 1440)
+        }
+        for i in range(products)
+    ]
+    rates = rng.gamma(1.0, sales_per_day, size=(products, 1))
+    history = rng.poisson(np.repeat(rates, days, axis=1)).astype(float)
+    spikes = rng.random(history.shape) < 0.005
+    history[spikes] *= 6
+
+    # Individual sale lines of 1-3 units adding up to each daily total
+    sales = []
+    for row, item in enumerate(inventory):
+        for day in np.flatnonzero(history[row]):
+            remaining = int(history[row, day])
+            moment = datetime.combine(start + timedelta(days=int(day)), datetime.min.time()) + timedelta(hours=9)
+            while remaining > 0:
+                quantity = min(remaining, int(rng.integers(1, 4)))
+                sales.append({"product_id": item["product_id"], "quantity": quantity, "date": moment.isoformat()})
+                moment += timedelta(minutes=int(rng.integers(1, 30)))
+                remaining -= quantity
+    return inventory, history, sales, start, now
+
+
+def raw_inventory_prompt(inventory, now):
+    rows = [dict(row, last_updated_at=row["last_updated_at"].isoformat()) for row in inventory]
+    return f"""
+        Analyze the following inventory data:
+        {json.dumps(rows)}
+
+        Consider:
+        1. Current stock levels vs minimum threshold
+        2. Last update time and user
+        3. Current time: {now.isoformat()}
+        4. Current user: {CURRENT_USER}
+
+        Return a JSON list of products that need restocking.
+        """
+
+
+def compact_inventory_prompt(context):
+    return f"""
+        Analyze the following inventory and sales summary:
+        {context}
+
+        Consider:
+        1. Current stock levels vs minimum threshold
+        2. Recent sales velocity, trend and days of cover
+        3. Last update time and user
+        4. Current user: {CURRENT_USER}
+
+        Return a JSON list of products that need restocking.
+        """
+
+
+def raw_forecast_prompt(sales, days):
+    return f"""
+        Based on this historical sales data:
+        {json.dumps(sales)}
+
+        Predict daily sales for the next {days} days considering:
+        1. Historical patterns
+        2. Seasonal trends
+        3. Recent changes in demand
+
+        Return the forecast as a JSON array with dates and predicted quantities.
+        """
+
+
+async def timed_call(gateway, prompt):
+    with Timer() as timer:
+        await gateway.generate(prompt, use_cache=False)
+    return timer.elapsed
+
+
+async def run(products: int, sales_per_day: float, budget: int):
+    days = ALERT_SALES_WINDOW_DAYS
+    inventory, history, sales, start, now = synthetic_store(products, sales_per_day, days)
+    predictions, confidence = forecast(history, 7)
+    forecast_items = [
+        {
+            "product_id": item["product_id"],
+            "product_name": item["name"],
+            "current_stock": item["current_stock"],
+            "predicted_demand": int(np.round(predictions[row]).sum()),
+            "confidence": float(confidence[row]),
+            "daily_demand": [int(value) for value in np.round(predictions[row])]
+        }
+        for row, item in enumerate(inventory)
+    ]
+
+    with Timer() as encode_timer:
+        compact_inventory = encode_inventory("store1", inventory, history, start, now, budget)
+        compact_forecast = encode_forecast("store1", forecast_items, now.date() + timedelta(days=1), budget)
+
+    prompts = [
+        ("inventory check, raw JSON", raw_inventory_prompt(inventory, now)),
+        ("inventory check, compact", compact_inventory_prompt(compact_inventory)),
+        ("sales history, raw JSON", raw_forecast_prompt(sales, 7)),
+        ("forecast summary, compact", compact_forecast),
+    ]
+
+    print(f"{products} products, {len(sales)} sale lines over {days} days, token budget {budget}, "
+          f"encoding took {encode_timer.elapsed * 1000:.1f} ms")
+    print(f"{'prompt':<30}{'chars':>10}{'~tokens':>10}{'latency (s)':>14}")
+    async with FakeOllama(latency=0.02, token_latency=TOKEN_LATENCY) as fake:
+        gateway = LLMGateway(fake.base_url, "mistral", batch_window=0)
+        for label, prompt in prompts:
+            elapsed = await timed_call(gateway, prompt)
+            print(f"{label:<30}{len(prompt):>10,}{estimate_tokens(prompt):>10,}{elapsed:>14.3f}")
+
+    assert estimate_tokens(compact_inventory) <= budget and estimate_tokens(compact_forecast) <= budget
+    print("\nCompact inventory context:")
+    lines = compact_inventory.splitlines()
+    print("\n".join(lines[:6] + ["..."] + lines[-4:]))
+
+
+if __name__ == "__main__":
+    products = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    sales_per_day = float(sys.argv[2]) if len(sys.argv) > 2 else 3
+    budget = int(sys.argv[3]) if len(sys.argv) > 3 else 1500
+    asyncio.run(run(products, sales_per_day, budget))
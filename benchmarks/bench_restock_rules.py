@@ -0,0 +1,98 @@
+"""Restock rules before the model versus the model for every product.
+
+Seeds a temporary database with inventory and four weeks of daily sales, then
+runs the agent coordinator twice over the offline fake LLM: once sending every
+product to the model, once deciding with ``app.services.restock_rules`` first
+and sending only escalated rows. Reports the share of decisions made without a
+model call, the model calls and prompt tokens avoided, and the wall-clock
+saving. Both runs must order every product that is below its minimum.
+
+Usage: python -m benchmarks.bench_restock_rules [stores] [products] [llm_latency_ms]
+"""
+import asyncio
+import sys
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.agents.coordinator import AgentCoordinator
+from app.models.database import StoreInventory
+from app.services.fake_llm import FakeLLM
+from app.services.llm_gateway import LLMGateway
+from app.services.prompt_context import estimate_tokens
+from app.services.restock_rules import RuleConfig
+from app.config.constants import ALERT_SALES_WINDOW_DAYS, get_datetime_obj
+from benchmarks.common import temp_database, seed_inventory, seed_daily_sales
+
+
+async def below_minimum(engine):
+    async with engine.connect() as conn:
+        result = await conn.execute(select(StoreInventory.store_id, StoreInventory.product_id).where(
+            StoreInventory.stock_level < StoreInventory.min_threshold
+        ))
+        return set(result)
+
+
+class CountingLLM(FakeLLM):
+    """FakeLLM that also counts the prompt tokens it was sent."""
+
+    def __init__(self, latency: float):
+        super().__init__(latency)
+        self.tokens = 0
+
+    async def agenerate(self, prompts):
+        self.tokens += sum(estimate_tokens(prompt) for prompt in prompts)
+        return await super().agenerate(prompts)
+
+
+async def run_once(session_factory, latency: float, rules):
+    llm = CountingLLM(latency)
+    gateway = LLMGateway("http://fake", "fake", max_concurrency=4, batch_size=8, batch_window=0.005, client=llm)
+    coordinator = AgentCoordinator(session_factory, llm=gateway, max_workers=10, rules=rules,
+                                   use_rules=rules is not None)
+    report = await coordinator.run()
+    return report, llm
+
+
+async def run(stores: int, products: int, latency: float):
+    async with temp_database(db_pool_size=10, db_max_overflow=20) as engine:
+        store_ids, product_ids = await seed_inventory(engine, stores=stores, products=products)
+        await seed_daily_sales(engine, store_ids, product_ids, ALERT_SALES_WINDOW_DAYS, get_datetime_obj().date())
+        short = await below_minimum(engine)
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        print(f"{stores} stores x {products} products, fake LLM {latency * 1000:.0f} ms per prompt")
+        print(f"{'mode':<16}{'elapsed (s)':>13}{'model rows':>12}{'model calls':>13}{'prompt tokens':>15}"
+              f"{'order lines':>13}")
+        results = {}
+        for mode, rules in (("model only", None), ("rules first", RuleConfig())):
+            report, llm = await run_once(session_factory, latency, rules)
+            run_stats = report["run"]
+            assert run_stats["succeeded"] == stores, run_stats["failed"][:3]
+            ordered = {
+                (store_id, line["product_id"])
+                for order in report["purchase_orders"] for line in order["lines"] for store_id in line["stores"]
+            }
+            assert short <= ordered, f"{mode}: {len(short - ordered)} below-minimum products not ordered"
+            results[mode] = (run_stats, llm)
+            print(f"{mode:<16}{run_stats['elapsed_seconds']:>13.2f}{llm.prompts:>12}{llm.calls:>13}"
+                  f"{llm.tokens:>15,}{run_stats['restock_lines']:>13}")
+
+    baseline, baseline_llm = results["model only"]
+    ruled, ruled_llm = results["rules first"]
+    summary = ruled["rules"]
+    print(f"rules: {summary['decisions']}")
+    print(f"  {summary['resolved_without_model']:.1%} of decisions made without the model; "
+          f"{summary['model_calls_skipped']} of {stores} stores needed no model call")
+    print(f"  model prompts {baseline_llm.prompts} -> {ruled_llm.prompts}, "
+          f"prompt tokens {baseline_llm.tokens:,} -> {ruled_llm.tokens:,}, "
+          f"elapsed {baseline['elapsed_seconds']:.2f}s -> {ruled['elapsed_seconds']:.2f}s "
+          f"({1 - ruled['elapsed_seconds'] / baseline['elapsed_seconds']:.0%} saved)")
+    assert ruled_llm.prompts < baseline_llm.prompts
+
+
+if __name__ == "__main__":
+    stores = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    products = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    latency_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 20
+    asyncio.run(run(stores, products, latency_ms / 1000))
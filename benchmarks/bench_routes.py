@@ -0,0 +1,284 @@
+"""End-to-end benchmark of every API route on a synthetic chain.
+
+Loads a chain with ``benchmarks.synthetic`` into a temporary database (or uses
+an already generated one with ``--database-url``), then drives each route in
+``app/api/routes.py`` through the in-process ASGI client: ``--requests``
+requests per route from ``--concurrency`` concurrent clients, spread over the
+stores. Read routes run with the response cache off unless ``--cache`` is set,
+so they measure the queries rather than cache hits. Write routes really write,
+so later routes see the stock, sales and prices earlier ones changed.
+
+Per route it reports throughput, p50/p99/max latency, errors (non-2xx
+responses) and the process's peak RSS so far. The results are printed as a
+table and written as JSON to ``--output`` (stdout with ``-``) for tracking
+across releases. GET /api/stream/{store_id} never ends, which the ASGI client
+cannot handle; ``benchmarks.bench_event_stream`` covers it under uvicorn.
+
+Usage: python -m benchmarks.bench_routes [--stores N] [--products N] [--days N] [--assortment N]
+           [--requests N] [--concurrency N] [--cache] [--database-url URL] [--output PATH]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, distinct
+
+from app.models.database import Product, StoreInventory, create_engine_from_settings
+from app.services.analytics import analytics
+from app.services.cache import response_cache
+from app.config.constants import get_datetime_obj
+from benchmarks.common import temp_database, api_client, Timer
+from benchmarks.synthetic import generate
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def percentile(times, fraction: float):
+    ordered = sorted(times)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def route_table(store_ids, product_ids, batch_stores: int = 10):
+    """``[(name, request)]`` where ``request(client, i)`` sends the i-th request of that route."""
+    products = len(product_ids)
+    since = (get_datetime_obj() - timedelta(days=7)).isoformat()
+    state = {}
+
+    def store(i):
+        return store_ids[i % len(store_ids)]
+
+    def stores(i):
+        first = i * batch_stores % len(store_ids)
+        return (store_ids * 2)[first:first + min(batch_stores, len(store_ids))]
+
+    async def stocked(client, i):
+        """A product stocked at ``store(i)``, from the store's first page."""
+        key = store(i)
+        if key not in state:
+            page = (await client.get(f"/api/inventory/{key}", params={"fields": "product_id", "limit": 1000})).json()
+            state[key] = [item["product_id"] for item in page["inventory"]]
+        return state[key][i % len(state[key])]
+
+    async def update(client, i):
+        return await client.post("/api/inventory/update", json={
+            "store_id": store(i), "product_id": await stocked(client, i), "quantity": 1 if i % 2 else -1
+        })
+
+    async def update_batch(client, i):
+        return await client.post("/api/inventory/update/batch", json={"updates": [
+            {"store_id": store(i + n), "product_id": await stocked(client, i + n), "quantity": 1 if n % 2 else -1}
+            for n in range(100)
+        ]})
+
+    async def transfer(client, i):
+        # A product both stores stock, so that the transfer is not a 404
+        key = ("transfer", store(i), store(i + 1))
+        if key not in state:
+            await stocked(client, i)
+            await stocked(client, i + 1)
+            state[key] = sorted(set(state[store(i)]).intersection(state[store(i + 1)])) or [None]
+        return await client.post("/api/inventory/transfer", json={
+            "from_store_id": store(i), "to_store_id": store(i + 1), "product_id": state[key][i % len(state[key])],
+            "quantity": 1
+        })
+
+    async def sales(client, i):
+        sale_date = datetime.combine(get_datetime_obj().date(), datetime.min.time()).isoformat()
+        return await client.post("/api/sales/bulk", json={"sales": [
+            {"store_id": store(i + n), "product_id": await stocked(client, i + n), "quantity": 1 + n % 3,
+             "sale_date": sale_date}
+            for n in range(1000)
+        ]})
+
+    async def price(client, i):
+        return await client.post("/api/update-price", json={
+            "store_id": store(i), "product_id": product_ids[i * 7919 % products], "new_price": 10 + i % 50
+        })
+
+    async def bulk_prices(client, i):
+        return await client.post("/api/prices/bulk", json={"reason": "benchmark", "changes": [
+            {"product_id": product_ids[(i * 500 + n) % products], "new_price": 5 + (i + n) % 90,
+             **({"store_id": store(i + n)} if n % 2 else {})}
+            for n in range(500)
+        ]})
+
+    async def create_job(client, i):
+        # Scheduled a year ahead so that a scheduler running against the database leaves them alone
+        response = await client.post("/api/jobs", json={
+            "name": "alert_materialization", "params": {"window_days": 7 + i % 21},
+            "run_at": (get_datetime_obj() + timedelta(days=365)).isoformat()
+        })
+        state.setdefault("jobs", []).append(response.json().get("id"))
+        return response
+
+    async def get_job(client, i):
+        jobs = state.get("jobs") or [1]
+        return await client.get(f"/api/jobs/{jobs[i % len(jobs)]}")
+
+    return [
+        ("GET /inventory/{store_id}", lambda client, i: client.get(f"/api/inventory/{store(i)}")),
+        ("GET /inventory/{store_id} page", lambda client, i: client.get(
+            f"/api/inventory/{store(i)}", params={"fields": "product_id,current_stock", "limit": 500})),
+        ("GET /inventory/{store_id} as_of", lambda client, i: client.get(
+            f"/api/inventory/{store(i)}", params={"as_of": get_datetime_obj().isoformat(), "limit": 500})),
+        ("POST /inventory/update", update),
+        ("POST /inventory/update/batch x100", update_batch),
+        ("POST /inventory/transfer", transfer),
+        ("POST /sales/bulk x1000", sales),
+        ("GET /forecast/{store_id}", lambda client, i: client.get(f"/api/forecast/{store(i)}")),
+        ("GET /forecast/{store_id} refresh", lambda client, i: client.get(
+            f"/api/forecast/{store(i)}", params={"refresh": "true"})),
+        ("GET /inventory-alerts/{store_id}", lambda client, i: client.get(f"/api/inventory-alerts/{store(i)}")),
+        ("GET /price-optimization/{store_id}", lambda client, i: client.get(
+            f"/api/price-optimization/{store(i)}")),
+        ("POST /update-price", price),
+        ("POST /prices/bulk x500", bulk_prices),
+        (f"POST /inventory/batch x{batch_stores}", lambda client, i: client.post(
+            "/api/inventory/batch", json={"store_ids": stores(i)})),
+        (f"POST /forecast/batch x{batch_stores}", lambda client, i: client.post(
+            "/api/forecast/batch", json={"store_ids": stores(i)})),
+        (f"POST /inventory-alerts/batch x{batch_stores}", lambda client, i: client.post(
+            "/api/inventory-alerts/batch", json={"store_ids": stores(i)})),
+        (f"POST /price-optimization/batch x{batch_stores}", lambda client, i: client.post(
+            "/api/price-optimization/batch", json={"store_ids": stores(i)})),
+        ("GET /export/inventory", lambda client, i: client.get(
+            "/api/export/inventory", params={"store_id": store(i)})),
+        ("GET /export/sales", lambda client, i: client.get(
+            "/api/export/sales", params={"store_id": store(i), "since": since})),
+        ("GET /export/forecasts", lambda client, i: client.get(
+            "/api/export/forecasts", params={"store_id": store(i), "format": "csv"})),
+        ("POST /jobs", create_job),
+        ("GET /jobs", lambda client, i: client.get("/api/jobs")),
+        ("GET /jobs/schedules", lambda client, i: client.get("/api/jobs/schedules")),
+        ("GET /jobs/{job_id}", get_job),
+        ("GET /cache/stats", lambda client, i: client.get("/api/cache/stats")),
+    ]
+
+
+async def drive(client, request, requests: int, concurrency: int):
+    """Send ``requests`` requests from ``concurrency`` clients; returns (latencies, errors, seconds)."""
+    times = []
+    errors = []
+    counter = iter(range(requests))
+
+    async def worker():
+        for i in counter:
+            with Timer() as timer:
+                response = await request(client, i)
+            times.append(timer.elapsed)
+            if response.status_code >= 300:
+                errors.append(f"{response.status_code} {response.text[:200]}")
+
+    with Timer() as timer:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return times, errors, timer.elapsed
+
+
+async def bench(engine, store_ids, product_ids, args):
+    results = []
+    async with api_client(engine) as client:
+        for name, request in route_table(store_ids, product_ids):
+            # One untimed request first, so per-route setup (stocked products, the analytics pool) is not measured
+            await request(client, 0)
+            times, errors, seconds = await drive(client, request, args.requests, args.concurrency)
+            results.append({
+                "route": name,
+                "requests": len(times),
+                "errors": len(errors),
+                "seconds": round(seconds, 4),
+                "throughput_rps": round(len(times) / seconds, 2),
+                "p50_ms": round(percentile(times, 0.5), 3),
+                "p99_ms": round(percentile(times, 0.99), 3),
+                "max_ms": round(max(times) * 1000, 3),
+                "peak_rss_mb": round(peak_rss_mb(), 1)
+            })
+            if errors:
+                results[-1]["first_error"] = errors[0]
+    return results
+
+
+async def run(args):
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    if not args.cache:
+        response_cache.max_entries = 0
+    report = {
+        "benchmark": "routes",
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {key: value for key, value in vars(args).items() if key not in ("output", "database_url")},
+    }
+    try:
+        if args.database_url:
+            engine = create_engine_from_settings(database_url=args.database_url)
+            try:
+                async with engine.connect() as conn:
+                    store_ids = list((await conn.execute(
+                        select(distinct(StoreInventory.store_id)).order_by(StoreInventory.store_id)
+                    )).scalars())
+                    product_ids = list((await conn.execute(select(Product.id).order_by(Product.id))).scalars())
+                report["dataset"] = {"stores": len(store_ids), "products": len(product_ids)}
+                report["routes"] = await bench(engine, store_ids, product_ids, args)
+            finally:
+                await engine.dispose()
+        else:
+            async with temp_database(db_pool_size=5) as engine:
+                started = time.perf_counter()
+                store_ids, product_ids, counts = await generate(
+                    engine, args.stores, args.products, args.days, args.assortment, seed=args.seed
+                )
+                report["dataset"] = {"generate_seconds": round(time.perf_counter() - started, 2), **counts}
+                report["routes"] = await bench(engine, store_ids, product_ids, args)
+    finally:
+        analytics.shutdown()
+
+    print(f"{report['dataset']}; {args.requests} requests/route, concurrency {args.concurrency}, "
+          f"cache {'on' if args.cache else 'off'}", file=sys.stderr)
+    print(f"{'route':<40}{'req/s':>10}{'p50 (ms)':>10}{'p99 (ms)':>10}{'max (ms)':>10}{'errors':>8}{'RSS (MB)':>10}",
+          file=sys.stderr)
+    for row in report["routes"]:
+        print(f"{row['route']:<40}{row['throughput_rps']:>10.1f}{row['p50_ms']:>10.1f}{row['p99_ms']:>10.1f}"
+              f"{row['max_ms']:>10.1f}{row['errors']:>8}{row['peak_rss_mb']:>10.0f}", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        print(f"results written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark every API route on a synthetic chain")
+    parser.add_argument("--stores", type=int, default=20)
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--assortment", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=50, help="timed requests per route")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--cache", action="store_true", help="leave the response cache on")
+    parser.add_argument("--database-url", default=None,
+                        help="benchmark an existing database (e.g. one from benchmarks.synthetic) instead")
+    parser.add_argument("--output", default="bench_routes.json", help="JSON results file, or - for stdout")
+    asyncio.run(run(parser.parse_args()))
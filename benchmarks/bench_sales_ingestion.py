@@ -0,0 +1,80 @@
+"""Sales ingestion throughput on SQLite in WAL mode.
+
+Measures the ingestion service directly and POST /api/sales/bulk through the
+ASGI app, and checks that stock levels were decremented by the sold quantity.
+
+Usage: python -m benchmarks.bench_sales_ingestion [lines] [lines_per_request]
+"""
+import asyncio
+import random
+import sys
+from datetime import timedelta
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.database import SalesHistory, StoreInventory, DailySales
+from app.services.ingestion import ingest_sales
+from app.config.constants import get_datetime_obj
+from benchmarks.common import temp_database, seed_inventory, api_client, Timer
+
+
+def sales_lines(store_ids, product_ids, count, seed=3):
+    """POS-like lines: Zipf-skewed product popularity, timestamps spread over one trading day."""
+    rng = random.Random(seed)
+    opening = get_datetime_obj().replace(hour=8, minute=0, second=0)
+    products = rng.choices(product_ids, weights=[1 / rank for rank in range(1, len(product_ids) + 1)], k=count)
+    return [
+        {
+            "store_id": rng.choice(store_ids),
+            "product_id": product_id,
+            "quantity": rng.randint(1, 5),
+            "sale_date": (opening + timedelta(seconds=rng.randrange(12 * 3600))).isoformat()
+        }
+        for product_id in products
+    ]
+
+
+async def totals(session):
+    sold = await session.scalar(select(func.sum(SalesHistory.quantity)))
+    rolled_up = await session.scalar(select(func.sum(DailySales.qty)))
+    stock = await session.scalar(select(func.sum(StoreInventory.stock_level)))
+    return sold or 0, rolled_up or 0, stock
+
+
+async def run(lines: int, per_request: int):
+    async with temp_database(wal=True) as engine:
+        store_ids, product_ids = await seed_inventory(engine, stores=200, products=500)
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with session_factory() as session:
+            _, _, initial_stock = await totals(session)
+
+        service_lines = sales_lines(store_ids, product_ids, lines)
+        async with session_factory() as session:
+            summary = await ingest_sales(session, service_lines)
+        print(f"service: {summary['inserted']:,} lines in {summary['elapsed_seconds']:.2f}s "
+              f"= {summary['rows_per_second']:,.0f} lines/s")
+
+        api_lines = sales_lines(store_ids, product_ids, lines, seed=4)
+        async with api_client(engine) as client:
+            with Timer() as timer:
+                for start in range(0, lines, per_request):
+                    response = await client.post(
+                        "/api/sales/bulk", json={"sales": api_lines[start:start + per_request]}
+                    )
+                    response.raise_for_status()
+        print(f"POST /api/sales/bulk ({per_request:,} lines/request): {lines:,} lines in {timer.elapsed:.2f}s "
+              f"= {lines / timer.elapsed:,.0f} lines/s")
+
+        async with session_factory() as session:
+            sold, rolled_up, stock = await totals(session)
+        expected = sum(line["quantity"] for line in service_lines + api_lines)
+        assert sold == rolled_up == expected, (sold, rolled_up, expected)
+        assert stock == initial_stock - expected, (stock, initial_stock, expected)
+        print("sales_history, daily_sales and store_inventory totals are consistent")
+
+
+if __name__ == "__main__":
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    per_request = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    asyncio.run(run(lines, per_request))
@@ -0,0 +1,119 @@
+"""Cost of turning inventory rows into a JSON response body, per 10k rows.
+
+Seeds one store with ``products`` products and times each stage against the
+way read routes worked before:
+
+- fetching the rows as ORM entities (``select(StoreInventory, Product)``)
+  against fetching the flat columns of ``_inventory_query``
+- building the payload: an ``InventoryResponse`` per row and ``.dict()``,
+  then ``jsonable_encoder`` and ``json.dumps`` as FastAPI's ``JSONResponse``
+  did (before), against plain dicts from the row tuples encoded once with
+  ``app.services.serialization.dumps`` (after), with the standard library and,
+  when installed, with orjson
+
+Usage: python -m benchmarks.bench_serialization [products] [repeats]
+"""
+import asyncio
+import json
+import statistics
+import sys
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.api.routes import _inventory_query, _inventory_item
+from app.models.database import StoreInventory, Product
+from app.models.schemas import InventoryResponse
+from app.services import serialization
+from app.services.prices import effective_price
+from app.config.constants import CURRENT_USER, CURRENT_DATETIME
+from benchmarks.common import temp_database, seed_inventory, Timer
+
+PER = 10000
+
+
+def before(items):
+    """The old path: one Pydantic model per entity row, then FastAPI's encoder and json.dumps."""
+    inventory = [
+        InventoryResponse(
+            product_id=item.Product.id,
+            name=item.Product.name,
+            category=item.Product.category,
+            current_stock=item.StoreInventory.stock_level,
+            min_threshold=item.StoreInventory.min_threshold,
+            price=effective_price(item.StoreInventory, item.Product),
+            last_updated=item.StoreInventory.last_updated_at.isoformat()
+            if item.StoreInventory.last_updated_at else None
+        ).dict()
+        for item in items
+    ]
+    payload = {"store_id": "store0", "inventory": inventory, "checked_by": CURRENT_USER,
+               "checked_at": CURRENT_DATETIME}
+    return json.dumps(jsonable_encoder(payload), ensure_ascii=False, allow_nan=False, indent=None,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def after(rows):
+    payload = {"store_id": "store0", "inventory": [_inventory_item(row) for row in rows], "checked_by": CURRENT_USER,
+               "checked_at": CURRENT_DATETIME}
+    return serialization.dumps(payload)
+
+
+def best(fn, repeats: int) -> float:
+    times = []
+    for _ in range(repeats):
+        with Timer() as timer:
+            fn()
+        times.append(timer.elapsed)
+    return min(times)
+
+
+async def fetch_time(session, query, repeats: int):
+    times = []
+    for _ in range(repeats):
+        with Timer() as timer:
+            rows = (await session.execute(query)).all()
+        times.append(timer.elapsed)
+    return rows, statistics.median(times)
+
+
+async def run(products: int, repeats: int):
+    async with temp_database() as engine:
+        store_ids, _ = await seed_inventory(engine, stores=1, products=products)
+        condition = StoreInventory.store_id == store_ids[0]
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with session_factory() as session:
+            entities, entity_fetch = await fetch_time(
+                session, select(StoreInventory, Product).join(Product).where(condition), repeats
+            )
+        async with session_factory() as session:
+            rows, column_fetch = await fetch_time(session, _inventory_query(condition), repeats)
+
+    assert json.loads(before(entities)) == json.loads(after(rows)), "old and new payloads differ"
+    scale = PER / products * 1000
+    results = [
+        ("fetch: ORM entities (before)", entity_fetch),
+        ("fetch: column tuples (after)", column_fetch),
+        ("encode: Pydantic + jsonable_encoder (before)", best(lambda: before(entities), repeats)),
+    ]
+    orjson = serialization.orjson
+    serialization.orjson = None
+    try:
+        results.append(("encode: dicts + json (after)", best(lambda: after(rows), repeats)))
+    finally:
+        serialization.orjson = orjson
+    if orjson is not None:
+        results.append(("encode: dicts + orjson (after)", best(lambda: after(rows), repeats)))
+    else:
+        results.append(("encode: dicts + orjson (after)", None))
+
+    print(f"1 store x {products:,} products, best/median of {repeats}; ms per {PER:,} rows")
+    for name, seconds in results:
+        print(f"  {name:<46}" + (f"{seconds * scale:8.1f}" if seconds is not None else "   (orjson not installed)"))
+
+
+if __name__ == "__main__":
+    products = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    asyncio.run(run(products, repeats))
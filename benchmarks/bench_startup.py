@@ -0,0 +1,135 @@
+"""Cold start of a worker: import time, what stays unloaded, and time to ready.
+
+Each measurement runs in a fresh interpreter against a throwaway SQLite file,
+with the scheduler off:
+
+- ``python -X importtime -c "import main"``, ``runs`` times: wall time, the
+  total reported by importtime and the packages costing the most, against the
+  same import with NumPy, Jinja2 and langchain (when installed) loaded eagerly,
+  as they were before they became lazy
+- which of the heavy libraries ``import main`` leaves unloaded
+- ``uvicorn main:app``: seconds from launch until GET /ready answers 200
+  (serving) and until /ready?warm=true does (warm)
+
+Usage: python -m benchmarks.bench_startup [runs]
+"""
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ["numpy", "langchain", "jinja2", "uvicorn", "pyinstrument"]
+EAGER = "import numpy, jinja2\ntry:\n    import langchain.llms\nexcept ImportError:\n    pass\nimport main"
+
+
+def environment(directory: str):
+    return {
+        **os.environ,
+        "DATABASE_URL": f"sqlite+aiosqlite:///{os.path.join(directory, 'startup.db')}",
+        "SCHEDULER_ENABLED": "false"
+    }
+
+
+def import_time(code: str, env):
+    """``(wall seconds, importtime total seconds, {top-level package: cumulative seconds})`` of running ``code``."""
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - started
+    packages = Counter()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented under the module that triggered them
+        if not name[1:].startswith(" "):
+            packages[name.strip().split(".")[0]] += int(cumulative) / 1e6
+    return wall, sum(packages.values()), packages
+
+
+def loaded_modules(env):
+    code = (
+        "import json, main\n"
+        "from app.services.lazy_imports import is_loaded\n"
+        f"print(json.dumps({{name: is_loaded(name) for name in {HEAVY!r}}}))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True,
+                            check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_ready(env, timeout: float = 120):
+    """Seconds from launching uvicorn until /ready answers 200, and until /ready?warm=true does."""
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env
+    )
+    serving = warm = None
+    body = None
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=5) as client:
+            while warm is None and time.perf_counter() - started < timeout:
+                try:
+                    response = client.get("/ready", params={"warm": "true"} if serving else {})
+                except httpx.TransportError:
+                    time.sleep(0.005)
+                    continue
+                if response.status_code == 200:
+                    if serving is None:
+                        serving = time.perf_counter() - started
+                    else:
+                        warm = time.perf_counter() - started
+                        body = response.json()
+                else:
+                    time.sleep(0.005)
+    finally:
+        server.terminate()
+        server.wait()
+    return serving, warm, body
+
+
+def run(runs: int):
+    with tempfile.TemporaryDirectory(prefix="retail_startup_") as directory:
+        env = environment(directory)
+        # One unmeasured run writes the bytecode caches and warms the OS file cache
+        import_time("import main", env)
+
+        results = {}
+        for name, code in (("import main", "import main"), ("eager heavy imports", EAGER)):
+            samples = [import_time(code, env) for _ in range(runs)]
+            results[name] = samples
+        loaded = loaded_modules(env)
+        serving, warm, body = time_to_ready(env)
+
+    print(f"{'':<22}{'wall (ms)':>12}{'imports (ms)':>14}   top packages (cumulative ms, last run)")
+    for name, samples in results.items():
+        wall = statistics.median(sample[0] for sample in samples) * 1000
+        total = statistics.median(sample[1] for sample in samples) * 1000
+        top = ", ".join(f"{package} {seconds * 1000:.0f}" for package, seconds in samples[-1][2].most_common(6))
+        print(f"{name:<22}{wall:>12.0f}{total:>14.0f}   {top}")
+    print("loaded by import main: " + ", ".join(f"{name}={'yes' if flag else 'no'}" for name, flag in loaded.items()))
+    if serving is None:
+        print("uvicorn never answered /ready")
+    else:
+        warm_text = f"{warm:.2f}s" if warm is not None else "not within the timeout"
+        print(f"uvicorn: serving after {serving:.2f}s, warm after {warm_text}; warm-up {body}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,110 @@
+"""Point-in-time inventory reads as the stock ledger grows.
+
+Seeds one store, takes its opening snapshot, then applies ``rounds`` batches of
+``per_round`` random adjustments and runs the ``stock_snapshot`` job after each
+batch. Ledger rows carry the wall clock, so each batch is a distinct moment. At
+intervals it reads GET /api/inventory/{store_id}?as_of=<now> through the
+in-process API (response cache off), checks it against the live stock, and reads
+an as_of between the first and second batch, checked against the stock recorded
+then. The same history is replayed
+into a second database where only the opening snapshot exists, for comparison.
+
+With snapshots the read replays at most about ``min_movements`` movements, so
+its latency stays flat; without them it replays the whole ledger.
+
+Usage: python -m benchmarks.bench_stock_history [products] [rounds] [per_round] [min_movements]
+"""
+import asyncio
+import logging
+import random
+import statistics
+import sys
+from datetime import datetime
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.database import StoreInventory, StockMovement
+from app.services.cache import response_cache
+from app.services.inventory import adjust_stock_many
+from app.services.stock_ledger import take_snapshots, ADJUSTMENT, RECEIPT
+from benchmarks.common import temp_database, seed_inventory, api_client, Timer
+
+
+async def stock(session, store_id):
+    rows = await session.execute(
+        select(StoreInventory.product_id, StoreInventory.stock_level).where(StoreInventory.store_id == store_id)
+    )
+    return dict(rows.all())
+
+
+async def read_as_of(client, store_id, as_of, expected, repeats: int = 5):
+    times = []
+    for _ in range(repeats):
+        with Timer() as timer:
+            response = await client.get(
+                f"/api/inventory/{store_id}", params={"as_of": as_of.isoformat(), "fields": "product_id,current_stock"}
+            )
+        times.append(timer.elapsed)
+    body = response.json()
+    assert {item["product_id"]: item["current_stock"] for item in body["inventory"]} == expected, "wrong stock"
+    return statistics.median(times) * 1000, body["snapshot"]["replayed_movements"]
+
+
+async def grow(products: int, rounds: int, per_round: int, min_movements, checkpoints):
+    """Apply the seeded history; returns ``[(round, ledger rows, ms, replayed, round-1 ms)]`` per checkpoint."""
+    rng = random.Random(3)
+    results = []
+    async with temp_database() as engine:
+        store_ids, product_ids = await seed_inventory(engine, stores=1, products=products)
+        store_id = store_ids[0]
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with session_factory() as session, api_client(engine) as client:
+            await take_snapshots(session)
+            early = None
+            for number in range(1, rounds + 1):
+                await adjust_stock_many(session, [
+                    (store_id, rng.choice(product_ids), rng.choice([-3, -2, -1, 1, 2, 5]),
+                     RECEIPT if n % 10 == 0 else ADJUSTMENT)
+                    for n in range(per_round)
+                ])
+                await session.commit()
+                if min_movements is not None:
+                    await take_snapshots(session, min_movements)
+                if early is None:
+                    early = (datetime.now(), await stock(session, store_id))
+                if number in checkpoints:
+                    ledger = await session.scalar(select(func.count()).select_from(StockMovement))
+                    current = await stock(session, store_id)
+                    latest, replayed = await read_as_of(client, store_id, datetime.now(), current)
+                    early_ms, _ = await read_as_of(client, store_id, *early)
+                    results.append((number, ledger, latest, replayed, early_ms))
+    return results
+
+
+async def run(products: int, rounds: int, per_round: int, min_movements: int):
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    response_cache.max_entries = 0
+    checkpoints = {rounds}
+    checkpoint = 1
+    while checkpoint < rounds:
+        checkpoints.add(checkpoint)
+        checkpoint *= 4
+    with_snapshots = await grow(products, rounds, per_round, min_movements, checkpoints)
+    opening_only = await grow(products, rounds, per_round, None, checkpoints)
+
+    print(f"1 store x {products:,} products, {per_round} adjustments per round, "
+          f"snapshot every {min_movements:,} movements")
+    print(f"{'round':>7}{'ledger rows':>13}   {'as_of now (ms)':>15}{'replayed':>10}   "
+          f"{'no snapshots (ms)':>18}{'replayed':>10}   {'as_of round 1 (ms)':>20}")
+    for (number, ledger, latest, replayed, early_ms), without in zip(with_snapshots, opening_only):
+        print(f"{number:>7}{ledger:>13,}   {latest:>15.1f}{replayed:>10,}   {without[2]:>18.1f}{without[3]:>10,}"
+              f"   {early_ms:>20.1f}")
+
+
+if __name__ == "__main__":
+    products = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 256
+    per_round = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+    min_movements = int(sys.argv[4]) if len(sys.argv) > 4 else 5000
+    asyncio.run(run(products, rounds, per_round, min_movements))
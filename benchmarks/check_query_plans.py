@@ -0,0 +1,75 @@
+"""Check that the hot-path queries are answered through the composite indexes.
+
+A script, not part of any test suite: it runs EXPLAIN QUERY PLAN on the same
+statements the routes and services issue, prints each plan and exits with a
+non-zero status if SQLite falls back to a full table scan for any of them.
+
+Usage: python -m benchmarks.check_query_plans
+"""
+import asyncio
+from datetime import timedelta
+
+from sqlalchemy import select
+
+from app.api.routes import _inventory_query
+from app.models.database import StoreInventory, SalesHistory, DailySales, DemandForecast
+from app.config.constants import get_datetime_obj
+from benchmarks.common import temp_database, seed_inventory
+
+since = get_datetime_obj() - timedelta(days=30)
+
+CHECKS = [
+    ("inventory by store",
+     _inventory_query(StoreInventory.store_id == "store1"),
+     "ix_store_inventory_store_product"),
+    ("inventory batch",
+     _inventory_query(StoreInventory.store_id.in_(["store1", "store2"])),
+     "ix_store_inventory_store_product"),
+    ("inventory row update",
+     select(StoreInventory).where(StoreInventory.store_id == "store1", StoreInventory.product_id == "P00001"),
+     "ix_store_inventory_store_product"),
+    ("sales by store and date",
+     select(SalesHistory).where(SalesHistory.store_id == "store1", SalesHistory.sale_date >= since),
+     "ix_sales_history_store_product_date"),
+    ("sales by series and date",
+     select(SalesHistory).where(
+         SalesHistory.store_id == "store1",
+         SalesHistory.product_id == "P00001",
+         SalesHistory.sale_date >= since
+     ),
+     "ix_sales_history_store_product_date"),
+    ("daily sales rollup by store and day",
+     select(DailySales).where(DailySales.store_id.in_(["store1", "store2"]), DailySales.day >= since.date()),
+     "sqlite_autoindex_daily_sales_1"),
+    ("forecast by series and date",
+     select(DemandForecast).where(
+         DemandForecast.store_id == "store1",
+         DemandForecast.product_id == "P00001",
+         DemandForecast.forecast_date >= since
+     ),
+     "ix_demand_forecast_store_product_date"),
+]
+
+
+async def explain(conn, query):
+    compiled = query.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+    result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}")
+    return [row[-1] for row in result]
+
+
+async def run():
+    failures = 0
+    async with temp_database() as engine:
+        await seed_inventory(engine, stores=20, products=50)
+        async with engine.connect() as conn:
+            for name, query, index in CHECKS:
+                plan = await explain(conn, query)
+                ok = any(index in step for step in plan)
+                failures += not ok
+                print(f"[{'ok' if ok else 'FAIL'}] {name}: {' | '.join(plan)}")
+    if failures:
+        raise SystemExit(f"{failures} queries are not using their index")
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,162 @@
+import asyncio
+import os
+import random
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from datetime import date, timedelta
+
+import httpx
+import numpy as np
+import uvicorn
+from sqlalchemy import insert, event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+
+from app.models.database import Base, Product, StoreInventory, DailySales, get_session, create_engine_from_settings
+from app.models.migrations import upgrade
+from app.config.constants import CURRENT_USER, get_datetime_obj
+
+
+@asynccontextmanager
+async def temp_database(wal: bool = False, **engine_settings):
+    """Yield an engine bound to a throwaway SQLite file with the current schema.
+
+    With ``engine_settings`` the engine comes from ``create_engine_from_settings``
+    with those settings overridden; otherwise it is a plain engine, plus WAL
+    pragmas if ``wal`` is set.
+    """
+    path = os.path.join(tempfile.mkdtemp(prefix="retail_bench_"), "bench.db")
+    if engine_settings:
+        engine = create_engine_from_settings(database_url=f"sqlite+aiosqlite:///{path}", **engine_settings)
+    else:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    if wal and not engine_settings:
+        @event.listens_for(engine.sync_engine, "connect")
+        def set_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute("PRAGMA cache_size=-65536")
+            cursor.execute("PRAGMA busy_timeout=30000")
+            cursor.close()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(upgrade)
+    try:
+        yield engine
+    finally:
+        await engine.dispose()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+async def seed_inventory(engine, stores: int, products: int, seed: int = 42):
+    rng = random.Random(seed)
+    now = get_datetime_obj()
+    product_ids = [f"P{i:05d}" for i in range(products)]
+    store_ids = [f"store{i}" for i in range(stores)]
+
+    async with engine.begin() as conn:
+        await conn.execute(insert(Product), [
+            {
+                "id": product_id,
+                "name": f"Product {product_id}",
+                "category": rng.choice(["Clothing", "Footwear", "Accessories"]),
+                "price": round(rng.uniform(5, 150), 2),
+                "supplier_id": f"S{rng.randint(1, 20):03d}",
+                "created_by": CURRENT_USER,
+                "created_at": now,
+                "last_updated": now
+            }
+            for product_id in product_ids
+        ])
+        await conn.execute(insert(StoreInventory), [
+            {
+                "store_id": store_id,
+                "product_id": product_id,
+                "stock_level": rng.randint(0, 150),
+                "min_threshold": 20,
+                "last_updated_by": CURRENT_USER,
+                "last_updated_at": now
+            }
+            for store_id in store_ids
+            for product_id in product_ids
+        ])
+    return store_ids, product_ids
+
+
+async def seed_daily_sales(engine, store_ids, product_ids, days: int, end: date, seed: int = 7):
+    """Fill ``daily_sales`` for ``days`` days up to ``end`` with Poisson demand per product.
+
+    Each product gets a base rate of 0-8 units/day, and about one series in
+    twenty a burst of sales on a recent day.
+    """
+    rng = np.random.default_rng(seed)
+    rates = rng.uniform(0, 8, len(product_ids))
+    first = end - timedelta(days=days - 1)
+    rows = []
+    for store_id in store_ids:
+        quantities = rng.poisson(rates[:, None], (len(product_ids), days))
+        bursts = rng.random(len(product_ids)) < 0.05
+        quantities[bursts, -2] += rng.integers(20, 60, bursts.sum())
+        for row, product_id in enumerate(product_ids):
+            rows.extend(
+                {"store_id": store_id, "product_id": product_id, "day": first + timedelta(days=day), "qty": int(qty)}
+                for day, qty in enumerate(quantities[row]) if qty
+            )
+    async with engine.begin() as conn:
+        await conn.execute(insert(DailySales), rows)
+    return len(rows)
+
+
+@asynccontextmanager
+async def api_client(engine):
+    """In-process ASGI client for the app with sessions bound to ``engine``."""
+    from main import app
+
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def override_session():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_session] = override_session
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            yield client
+    finally:
+        app.dependency_overrides.pop(get_session, None)
+
+
+async def serve_app(engine):
+    """Run the app under uvicorn on a free port with sessions bound to ``engine``.
+
+    Returns ``(server, task, base_url)``; set ``server.should_exit`` and await
+    ``task`` to stop it. Unlike ``api_client`` responses really stream.
+    """
+    from main import app
+
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def override_session():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_session] = override_session
+    # No lifespan: the temporary database is already migrated and seeded
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, lifespan="off", log_level="warning"))
+    task = asyncio.ensure_future(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    return server, task, f"http://127.0.0.1:{port}"
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
@@ -0,0 +1,89 @@
+"""Minimal stand-in for the Ollama HTTP API, for exercising the LLM gateway offline.
+
+Serves ``POST /api/generate`` with the same newline-delimited JSON stream Ollama
+sends. Each request sleeps ``latency`` seconds plus ``token_latency`` per
+estimated prompt token (prompt processing time grows with prompt size), and the
+server records how many requests it saw and the peak number served at once.
+
+Usage: python -m benchmarks.fake_ollama [port]
+"""
+import asyncio
+import json
+import sys
+
+
+def echo_json(prompt: str) -> str:
+    """Default responder: a JSON answer wrapped in prose, as chat models often do."""
+    return f'Here is the analysis:\n```json\n{json.dumps({"prompt_chars": len(prompt)})}\n```'
+
+
+class FakeOllama:
+    def __init__(self, respond=echo_json, latency: float = 0.05, token_latency: float = 0.0,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.respond = respond
+        self.latency = latency
+        self.token_latency = token_latency
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self.active = 0
+        self.peak_active = 0
+        self.server = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+            if not request_line.startswith(b"POST /api/generate"):
+                writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                return
+
+            self.requests += 1
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+            try:
+                prompt = json.loads(body)["prompt"]
+                await asyncio.sleep(self.latency + self.token_latency * len(prompt) / 4)
+                text = self.respond(prompt)
+            finally:
+                self.active -= 1
+
+            payload = (json.dumps({"response": text, "done": False}) + "\n"
+                       + json.dumps({"response": "", "done": True}) + "\n").encode()
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                         + f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode()
+                         + payload)
+            await writer.drain()
+        finally:
+            writer.close()
+
+
+async def serve(port: int):
+    async with FakeOllama(port=port) as fake:
+        print(f"Fake Ollama listening on {fake.base_url}")
+        await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(serve(int(sys.argv[1]) if len(sys.argv) > 1 else 11434))
@@ -0,0 +1,130 @@
+"""Requests/sec on the inventory routes under different engine configurations.
+
+Each configuration gets a fresh SQLite file seeded with the same inventory, then
+serves a fixed mix of GET /api/inventory/{store_id} (response cache disabled, so
+every read reaches the database) and POST /api/inventory/update with a bounded
+number of requests in flight. Configurations:
+
+- baseline: the old engine, SQL echo on, no pooling, SQLite default journal
+- echo off: the same without SQL echo
+- pooled: plus a queue pool instead of a new connection per session
+- pooled + pragmas: plus WAL, synchronous=NORMAL, cache_size and mmap_size
+  (the default settings)
+
+Pass a PostgreSQL URL to also run the default settings against it; that
+database is treated as scratch space and its tables are dropped.
+
+Usage: python -m benchmarks.load_test_engine [requests] [concurrency] [postgresql+asyncpg://...]
+"""
+import asyncio
+import logging
+import os
+import random
+import statistics
+import sys
+from contextlib import redirect_stdout
+
+from app.models.database import Base, create_engine_from_settings
+from app.models.migrations import upgrade
+from app.services.cache import response_cache
+from benchmarks.common import temp_database, seed_inventory, api_client, Timer
+
+NO_PRAGMAS = dict(sqlite_journal_mode="", sqlite_synchronous="", sqlite_busy_timeout_ms=0,
+                  sqlite_cache_size_kib=0, sqlite_mmap_size=0)
+CONFIGURATIONS = [
+    ("baseline", dict(NO_PRAGMAS, db_echo=True, db_pool_size=0)),
+    ("echo off", dict(NO_PRAGMAS, db_echo=False, db_pool_size=0)),
+    ("pooled", dict(NO_PRAGMAS, db_echo=False)),
+    ("pooled + pragmas", dict(db_echo=False)),
+]
+WRITE_SHARE = 0.2
+
+
+def request_mix(requests: int, store_ids, product_ids, seed: int = 5):
+    rng = random.Random(seed)
+    calls = []
+    for _ in range(requests):
+        store_id = rng.choice(store_ids)
+        if rng.random() < WRITE_SHARE:
+            calls.append(("POST", "/api/inventory/update", {
+                "store_id": store_id, "product_id": rng.choice(product_ids), "quantity": rng.randint(-3, 3)
+            }))
+        else:
+            calls.append(("GET", f"/api/inventory/{store_id}", None))
+    return calls
+
+
+async def drive(engine, calls, concurrency: int):
+    gate = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async with api_client(engine) as client:
+        async def fire(method, path, body):
+            nonlocal errors
+            async with gate:
+                with Timer() as timer:
+                    response = await client.request(method, path, json=body)
+                latencies.append(timer.elapsed)
+                if response.status_code != 200:
+                    errors += 1
+
+        with Timer() as total:
+            await asyncio.gather(*(fire(*call) for call in calls))
+
+    latencies.sort()
+    return {
+        "rps": len(calls) / total.elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p95": latencies[int(len(latencies) * 0.95)] * 1000,
+        "errors": errors
+    }
+
+
+async def run_sqlite(settings, requests: int, concurrency: int):
+    async with temp_database(**settings) as engine:
+        store_ids, product_ids = await seed_inventory(engine, stores=50, products=40)
+        return await drive(engine, request_mix(requests, store_ids, product_ids), concurrency)
+
+
+async def run_postgres(url: str, requests: int, concurrency: int):
+    engine = create_engine_from_settings(database_url=url)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(upgrade)
+        store_ids, product_ids = await seed_inventory(engine, stores=50, products=40)
+        return await drive(engine, request_mix(requests, store_ids, product_ids), concurrency)
+    finally:
+        await engine.dispose()
+
+
+def report(label, stats):
+    print(f"{label:<20}{stats['rps']:>10,.0f}{stats['p50']:>10.1f}{stats['p95']:>10.1f}{stats['errors']:>8}")
+
+
+async def run(requests: int, concurrency: int, postgres_url: str = None):
+    # Measure the database path, not the response cache
+    response_cache.max_entries = 0
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    engine_logger = logging.getLogger("sqlalchemy.engine")
+
+    print(f"{requests} requests ({WRITE_SHARE:.0%} writes), {concurrency} in flight")
+    print(f"{'configuration':<20}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}")
+    for label, settings in CONFIGURATIONS:
+        # Echo output goes to /dev/null so the cost measured is logging, not the terminal
+        engine_logger.propagate = False
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            stats = await run_sqlite(settings, requests, concurrency)
+        engine_logger.propagate = True
+        report(label, stats)
+
+    if postgres_url:
+        report("postgresql", await run_postgres(postgres_url, requests, concurrency))
+
+
+if __name__ == "__main__":
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    asyncio.run(run(requests, concurrency, sys.argv[3] if len(sys.argv) > 3 else None))
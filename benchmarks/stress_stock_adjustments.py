@@ -0,0 +1,74 @@
+"""Concurrency stress test for stock adjustments.
+
+Fires thousands of concurrent POST /api/inventory/update and
+/api/inventory/update/batch requests against a handful of hot inventory rows
+and asserts that every delta is reflected in the final stock levels.
+
+Usage: python -m benchmarks.stress_stock_adjustments [requests] [concurrency]
+"""
+import asyncio
+import random
+import sys
+from collections import Counter
+
+from sqlalchemy import select
+
+from app.models.database import StoreInventory
+from benchmarks.common import temp_database, seed_inventory, api_client, Timer
+
+
+async def stock_levels(engine):
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            select(StoreInventory.store_id, StoreInventory.product_id, StoreInventory.stock_level)
+        )
+        return {(store_id, product_id): level for store_id, product_id, level in result}
+
+
+async def run(requests: int, concurrency: int):
+    rng = random.Random(11)
+    async with temp_database(wal=True) as engine:
+        store_ids, product_ids = await seed_inventory(engine, stores=2, products=5)
+        hot_rows = [(store_id, product_id) for store_id in store_ids for product_id in product_ids]
+        before = await stock_levels(engine)
+        expected = Counter()
+
+        calls = []
+        for _ in range(requests):
+            if rng.random() < 0.8:
+                store_id, product_id = rng.choice(hot_rows)
+                quantity = rng.randint(-5, 5)
+                expected[(store_id, product_id)] += quantity
+                calls.append(("/api/inventory/update",
+                              {"store_id": store_id, "product_id": product_id, "quantity": quantity}))
+            else:
+                updates = []
+                for store_id, product_id in rng.sample(hot_rows, 4):
+                    quantity = rng.randint(-5, 5)
+                    expected[(store_id, product_id)] += quantity
+                    updates.append({"store_id": store_id, "product_id": product_id, "quantity": quantity})
+                calls.append(("/api/inventory/update/batch", {"updates": updates}))
+
+        gate = asyncio.Semaphore(concurrency)
+        async with api_client(engine) as client:
+            async def fire(path, body):
+                async with gate:
+                    response = await client.post(path, json=body)
+                    assert response.status_code == 200, response.text
+
+            with Timer() as timer:
+                await asyncio.gather(*(fire(path, body) for path, body in calls))
+
+        after = await stock_levels(engine)
+        lost = {key: (after[key] - before[key], delta) for key, delta in expected.items()
+                if after[key] - before[key] != delta}
+        print(f"{requests:,} requests ({concurrency} in flight) on {len(hot_rows)} rows in {timer.elapsed:.2f}s "
+              f"= {requests / timer.elapsed:,.0f} req/s")
+        assert not lost, f"lost updates (applied, expected): {lost}"
+        print("final stock levels match the sum of all adjustments")
+
+
+if __name__ == "__main__":
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    asyncio.run(run(requests, concurrency))
@@ -0,0 +1,259 @@
+"""Seeded synthetic retail chain, bulk-loaded at configurable scale.
+
+``generate`` fills an empty, migrated database with a reproducible chain:
+
+- ``products`` SKUs in a dozen categories, with log-normal prices, unit costs
+  and a long-tailed popularity
+- ``stores`` stores of varying size, each stocking ``assortment`` SKUs drawn by
+  popularity (every SKU when unset), with stock levels and thresholds sized to
+  their sales
+- ``days`` days of ``daily_sales`` up to ``end``: Poisson demand with a trend
+  per SKU, a weekly and a yearly cycle per category, a year-end peak and the
+  response to catalog price changes at a per-category elasticity
+- the ``price_history`` of those changes, and raw ``sales_history`` lines at
+  times of day for the last ``raw_days`` days, which add up to the same daily
+  totals as the rollup
+- ``forecast_series`` rows at ``sales_version`` 1, as if the sales had gone
+  through ``record_sales``
+- an opening stock snapshot per store, from which ``?as_of=`` reads start
+
+Each store's rows come from a generator seeded with ``(seed, store index)``, so
+the same arguments always give the same database, however it is chunked. Rows
+go through the driver-level ``executemany`` one store per transaction, which
+keeps memory flat at chain scale (e.g. 5000 stores x 50000 SKUs with
+``--assortment 5000`` over 730 days), though such a database takes hours and
+hundreds of GB to build.
+
+Usage: python -m benchmarks.synthetic [--stores N] [--products N] [--days N] [--assortment N]
+           [--raw-days N] [--seed N] [--database-url URL]
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from sqlalchemy import select, func
+
+from app.models.database import (
+    Base, Product, StoreInventory, SalesHistory, PriceHistory, DailySales, ForecastSeries,
+    create_engine_from_settings
+)
+from app.models.bulk import executemany, datetime_converter
+from app.models.migrations import upgrade
+from app.services.stock_ledger import snapshot_store
+from app.config.constants import CURRENT_USER, get_datetime_obj
+
+CATEGORIES = [
+    "Clothing", "Footwear", "Accessories", "Outerwear", "Sportswear", "Underwear",
+    "Kids", "Home", "Beauty", "Bags", "Jewelry", "Seasonal"
+]
+# Share of SKUs whose catalog price changes during the window, and how often at most
+PRICE_CHANGE_SHARE = 0.3
+MAX_PRICE_CHANGES = 4
+# Relative demand by weekday, Monday first
+WEEKLY_PROFILE = np.array([0.85, 0.8, 0.85, 0.95, 1.15, 1.35, 1.05])
+# Opening hours over which raw sales lines are spread
+OPENING_HOURS = (8, 21)
+
+_products = Product.__table__
+_inventory = StoreInventory.__table__
+_PRODUCT_KEYS = ["id", "name", "category", "price", "unit_cost", "supplier_id",
+                 "created_by", "created_at", "last_updated"]
+_INVENTORY_KEYS = ["store_id", "product_id", "stock_level", "min_threshold", "last_updated_by", "last_updated_at"]
+_PRICE_KEYS = ["product_id", "store_id", "old_price", "new_price", "reason", "changed_by", "changed_at"]
+_SALES_KEYS = ["store_id", "product_id", "quantity", "sale_date", "recorded_by"]
+_DAILY_KEYS = ["store_id", "product_id", "day", "qty"]
+_SERIES_KEYS = ["store_id", "product_id", "sales_version"]
+
+
+class Catalog:
+    """Chain-wide draws shared by every store: SKUs, their demand drivers and price paths."""
+
+    def __init__(self, products: int, days: int, end: date, seed: int):
+        rng = np.random.default_rng([seed, 0])
+        self.days = days
+        self.first = end - timedelta(days=days - 1)
+        self.product_ids = [f"P{i:06d}" for i in range(products)]
+        self.category = rng.integers(0, len(CATEGORIES), products)
+
+        category_price = rng.uniform(2.5, 4.0, len(CATEGORIES))
+        start_price = np.round(np.exp(rng.normal(category_price[self.category], 0.5)), 2) + 0.99
+        self.unit_cost = np.round(start_price * rng.uniform(0.4, 0.75, products), 2)
+        self.supplier = rng.integers(1, max(2, products // 250) + 1, products)
+        self.created_days_ago = rng.integers(days, days + 365, products)
+
+        # Long-tailed base demand in units/day at an average store, and a linear trend over the window
+        self.popularity = np.exp(rng.normal(-0.5, 1.2, products))
+        self.trend = rng.uniform(-0.2, 0.2, products)
+
+        day_index = np.arange(days)
+        day_of_year = np.array([(self.first + timedelta(days=int(day))).timetuple().tm_yday for day in day_index])
+        weekday = (self.first.weekday() + day_index) % 7
+        amplitude = rng.uniform(0.05, 0.5, len(CATEGORIES))
+        peak_day = rng.uniform(0, 365, len(CATEGORIES))
+        weekly = WEEKLY_PROFILE[None, :] * rng.uniform(0.9, 1.1, (len(CATEGORIES), 7))
+        yearly = 1 + amplitude[:, None] * np.cos(2 * np.pi * (day_of_year[None, :] - peak_day[:, None]) / 365.25)
+        year_end = np.where(day_of_year >= 330, 1.3, 1.0)
+        self.seasonality = weekly[:, weekday] * yearly * year_end
+        self.elasticity = rng.uniform(-2.5, -0.5, len(CATEGORIES))
+
+        # Catalog price changes: a step path per changed SKU, as a demand multiplier over the window
+        self.price = start_price.copy()
+        self.price_changes = []
+        changed = np.flatnonzero(rng.random(products) < PRICE_CHANGE_SHARE)
+        self.multiplier_row = np.full(products, -1)
+        self.multiplier_row[changed] = np.arange(len(changed))
+        self.multiplier = np.ones((len(changed), days), dtype=np.float32)
+        for row, product in enumerate(changed):
+            count = min(days - 1, int(rng.integers(1, MAX_PRICE_CHANGES + 1)))
+            change_days = np.sort(rng.choice(np.arange(1, days), count, replace=False))
+            for day in change_days:
+                old_price = self.price[product]
+                new_price = round(max(0.99, old_price * rng.uniform(0.75, 1.15)), 2)
+                if new_price == old_price:
+                    continue
+                midnight = datetime.combine(self.first + timedelta(days=int(day)), datetime.min.time())
+                changed_at = midnight + timedelta(seconds=int(rng.integers(0, 86400)))
+                self.price_changes.append((product, old_price, new_price, changed_at))
+                self.price[product] = new_price
+                elasticity = self.elasticity[self.category[product]]
+                self.multiplier[row, day:] = (new_price / start_price[product]) ** elasticity
+
+    def demand(self, items, store_factor: float, rng):
+        """Daily units sold of ``items`` at a store of size ``store_factor``, shape ``(len(items), days)``."""
+        rate = (self.popularity[items] * store_factor)[:, None] * self.seasonality[self.category[items]]
+        rate *= 1 + self.trend[items, None] * np.linspace(-0.5, 0.5, self.days)[None, :]
+        rows = self.multiplier_row[items]
+        changed = rows >= 0
+        rate[changed] *= self.multiplier[rows[changed]]
+        return rng.poisson(rate)
+
+
+async def _write_catalog(connection, catalog: Catalog, now: datetime):
+    convert = datetime_converter(connection)
+    await executemany(connection, _products.insert(), _PRODUCT_KEYS, [
+        (product_id, f"{CATEGORIES[catalog.category[index]]} item {product_id}", CATEGORIES[catalog.category[index]],
+         float(catalog.price[index]), float(catalog.unit_cost[index]), f"S{catalog.supplier[index]:04d}",
+         CURRENT_USER, convert(now - timedelta(days=int(catalog.created_days_ago[index]))), convert(now))
+        for index, product_id in enumerate(catalog.product_ids)
+    ])
+    await executemany(connection, PriceHistory.__table__.insert(), _PRICE_KEYS, [
+        (catalog.product_ids[product], None, float(old_price), float(new_price), "synthetic", CURRENT_USER,
+         convert(changed_at))
+        for product, old_price, new_price, changed_at in catalog.price_changes
+    ])
+    return {"products": len(catalog.product_ids), "price_history": len(catalog.price_changes)}
+
+
+async def _write_store(connection, catalog: Catalog, store: int, store_id: str, assortment: int,
+                       raw_days: int, seed: int, now: datetime):
+    rng = np.random.default_rng([seed, store + 1])
+    convert = datetime_converter(connection)
+    products = len(catalog.product_ids)
+    if assortment and assortment < products:
+        weights = catalog.popularity / catalog.popularity.sum()
+        items = np.sort(rng.choice(products, assortment, replace=False, p=weights))
+    else:
+        items = np.arange(products)
+    store_factor = float(np.exp(rng.normal(0, 0.4)))
+    quantities = catalog.demand(items, store_factor, rng)
+
+    recent = quantities[:, -28:].mean(axis=1)
+    min_threshold = np.maximum(5, np.ceil(recent * 7)).astype(int)
+    stock_level = rng.poisson(recent * rng.uniform(0, 21, len(items)) + 1)
+    product_ids = [catalog.product_ids[item] for item in items]
+    await executemany(connection, _inventory.insert(), _INVENTORY_KEYS, [
+        (store_id, product_id, int(stock), int(threshold), CURRENT_USER, convert(now))
+        for product_id, stock, threshold in zip(product_ids, stock_level, min_threshold)
+    ])
+
+    days = [convert(catalog.first + timedelta(days=day)) for day in range(catalog.days)]
+    rows, columns = np.nonzero(quantities)
+    values = quantities[rows, columns]
+    await executemany(connection, DailySales.__table__.insert(), _DAILY_KEYS, [
+        (store_id, product_ids[row], days[column], int(qty))
+        for row, column, qty in zip(rows.tolist(), columns.tolist(), values.tolist())
+    ])
+    sold = np.flatnonzero(quantities.any(axis=1))
+    await executemany(connection, ForecastSeries.__table__.insert(), _SERIES_KEYS, [
+        (store_id, product_ids[row], 1) for row in sold.tolist()
+    ])
+
+    # One raw line per series and day, at a time within opening hours
+    raw = columns >= catalog.days - raw_days
+    seconds = rng.integers(OPENING_HOURS[0] * 3600, OPENING_HOURS[1] * 3600, int(raw.sum()))
+    await executemany(connection, SalesHistory.__table__.insert(), _SALES_KEYS, [
+        (store_id, product_ids[row], int(qty),
+         convert(datetime.combine(catalog.first + timedelta(days=column), datetime.min.time())
+                 + timedelta(seconds=second)),
+         CURRENT_USER)
+        for row, column, qty, second in zip(rows[raw].tolist(), columns[raw].tolist(), values[raw].tolist(),
+                                            seconds.tolist())
+    ])
+    snapshot_items = await connection.run_sync(snapshot_store, store_id)
+    return {"store_inventory": len(items), "daily_sales": len(values), "forecast_series": len(sold),
+            "sales_history": int(raw.sum()), "stock_snapshot_items": snapshot_items}
+
+
+async def generate(engine, stores: int, products: int, days: int = 730, assortment: int = None,
+                   raw_days: int = 7, seed: int = 1, end: date = None, progress=None):
+    """Load the synthetic chain into ``engine``'s (empty, migrated) database.
+
+    Store IDs are ``store0``..``store{stores - 1}``. ``progress(done, counts)`` is
+    called after each store. Returns ``(store_ids, product_ids, counts)`` with the
+    rows written per table.
+    """
+    now = get_datetime_obj()
+    end = end or now.date()
+    raw_days = min(raw_days, days)
+    catalog = Catalog(products, days, end, seed)
+    store_ids = [f"store{i}" for i in range(stores)]
+    counts = Counter()
+
+    async with engine.begin() as connection:
+        counts.update(await _write_catalog(connection, catalog, now))
+    for store, store_id in enumerate(store_ids):
+        async with engine.begin() as connection:
+            counts.update(await _write_store(connection, catalog, store, store_id, assortment, raw_days, seed, now))
+        if progress:
+            progress(store + 1, counts)
+    return store_ids, catalog.product_ids, counts
+
+
+async def main(args):
+    overrides = {"database_url": args.database_url} if args.database_url else {}
+    engine = create_engine_from_settings(**overrides)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(upgrade)
+            existing = await conn.scalar(select(func.count()).select_from(Product))
+        if existing:
+            raise SystemExit(f"Database already contains {existing} products; generate into an empty one")
+
+        started = time.perf_counter()
+
+        def progress(done, counts):
+            if done % max(1, args.stores // 20) == 0 or done == args.stores:
+                elapsed = time.perf_counter() - started
+                print(f"{done}/{args.stores} stores, {sum(counts.values()):,} rows, {elapsed:.0f}s", flush=True)
+
+        _, _, counts = await generate(engine, args.stores, args.products, args.days, args.assortment,
+                                      args.raw_days, args.seed, progress=progress)
+        print(", ".join(f"{table}: {rows:,}" for table, rows in sorted(counts.items())))
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-load a seeded synthetic retail chain")
+    parser.add_argument("--stores", type=int, default=20)
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=730, help="days of daily sales up to the business date")
+    parser.add_argument("--assortment", type=int, default=None, help="SKUs stocked per store (default: all)")
+    parser.add_argument("--raw-days", type=int, default=7, help="trailing days also written to sales_history")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--database-url", default=None, help="defaults to DATABASE_URL from the settings")
+    asyncio.run(main(parser.parse_args()))
@@ -10,9 +10,9 @@ def print_response(response, title):
     print(json.dumps(response.json(), indent=2))
 
 def run_demo():
-    # 1. Check system info
-    response = requests.get(f"{BASE_URL}/system-info")
-    print_response(response, "System Information")
+    # 1. Check background job schedules
+    response = requests.get(f"{BASE_URL}/jobs/schedules")
+    print_response(response, "Job Schedules")
 
     # 2. Check initial inventory for all stores
     for store_id in ["store1", "store2", "store3"]:
@@ -36,9 +36,9 @@ def run_demo():
     response = requests.get(f"{BASE_URL}/forecast/store1")
     print_response(response, "Demand Forecast for store1")
 
-    # 6. Get optimization recommendations
-    response = requests.get(f"{BASE_URL}/optimize/store1")
-    print_response(response, "Optimization Recommendations")
+    # 6. Get price optimization recommendations
+    response = requests.get(f"{BASE_URL}/price-optimization/store1")
+    print_response(response, "Price Optimization")
 
 if __name__ == "__main__":
     run_demo()
\ No newline at end of file
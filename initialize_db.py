@@ -1,5 +1,6 @@
 import asyncio
 from app.models.database import async_session, Product, StoreInventory, SalesHistory
+from app.services.rollups import record_sales
 from app.config.constants import CURRENT_USER, get_datetime_obj
 import random
 
@@ -54,6 +55,7 @@ async def initialize_database():
             print("Store inventory initialized successfully!")
 
             # Add sample sales history
+            sales = []
             for _ in range(50):
                 sale = SalesHistory(
                     store_id=random.choice(stores),
@@ -63,6 +65,13 @@ async def initialize_database():
                     recorded_by=CURRENT_USER
                 )
                 session.add(sale)
+                sales.append({
+                    "store_id": sale.store_id,
+                    "product_id": sale.product_id,
+                    "quantity": sale.quantity,
+                    "sale_date": sale.sale_date
+                })
+            await record_sales(session, sales)
             await session.commit()
             print("Sales history added successfully!")
 
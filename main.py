@@ -1,36 +1,70 @@
 from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 from contextlib import asynccontextmanager
+from functools import lru_cache
 from app.api.routes import router
-from app.models.database import init_db
+from app.models.database import init_db, engine
+from app.services.jobs import scheduler
+from app.services.analytics import analytics
+from app.services.cache import response_cache
+from app.services.events import broker
+from app.services.llm_gateway import get_llm_gateway
+from app.services.metrics import REGISTRY, MetricsMiddleware
+from app.services.readiness import readiness, warm_up_steps
+from app.services.serialization import FastJSONResponse
+from app.services import scheduled_jobs  # noqa: F401  registers the jobs
+from app.config.settings import get_settings
 from app.config.constants import CURRENT_USER, CURRENT_DATETIME
-import uvicorn
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     print(f"Starting application as {CURRENT_USER} at {CURRENT_DATETIME}")
     await init_db()
+    if get_settings().scheduler_enabled:
+        await scheduler.start()
+    # Serve right away; libraries, the analytics pool and connections warm up in the background
+    readiness.serving()
+    readiness.start_warm_up(warm_up_steps())
     yield
     # Shutdown
     print("Shutting down application")
+    await readiness.stop()
+    await scheduler.stop()
+    if get_llm_gateway.cache_info().currsize:
+        await get_llm_gateway().close()
+    analytics.shutdown()
+    # Pooled aiosqlite connections run on non-daemon threads that keep the process alive until closed
+    await engine.dispose()
 
 app = FastAPI(
     title="Retail Inventory AI",
     description="Multi-agent AI system for retail inventory management",
+    default_response_class=FastJSONResponse,
     lifespan=lifespan
 )
 
+settings = get_settings()
+app.add_middleware(MetricsMiddleware, profiling=settings.profiling_enabled, profile_dir=settings.profile_dir)
+REGISTRY.add_stats("response_cache", response_cache.stats)
+REGISTRY.add_stats("analytics", lambda: analytics.stats)
+REGISTRY.add_stats("event_stream", broker.snapshot)
+# Only once something has used the gateway; creating it here would set up its disk cache
+REGISTRY.add_stats("llm_gateway", lambda: get_llm_gateway().stats if get_llm_gateway.cache_info().currsize else {})
+
 # Mount static files
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
-# Templates
-templates = Jinja2Templates(directory="app/templates")
+# Templates, loaded with the first page view rather than at startup
+@lru_cache()
+def get_templates():
+    from fastapi.templating import Jinja2Templates
+    return Jinja2Templates(directory="app/templates")
 
 @app.get("/")
 async def home(request: Request):
-    return templates.TemplateResponse(
+    return get_templates().TemplateResponse(
         "index.html",
         {
             "request": request,
@@ -39,8 +73,19 @@ async def home(request: Request):
         }
     )
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Request, SQL, LLM, analytics and cache metrics in the Prometheus text format."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/ready", include_in_schema=False)
+async def ready(warm: bool = False):
+    """200 once the worker serves requests, or with ``warm=true`` once it has also warmed up; 503 before."""
+    return JSONResponse(readiness.snapshot(), status_code=200 if readiness.is_ready(warm) else 503)
+
 # Include API routes
 app.include_router(router, prefix="/api")
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
@@ -1,22 +1,36 @@
 import asyncio
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from app.models.database import Base, Product, StoreInventory, SalesHistory
-from app.config.constants import DATABASE_URL, CURRENT_USER, get_datetime_obj
+import sys
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.models.database import create_engine_from_settings, Base, Product, StoreInventory, SalesHistory
+from app.models.migrations import upgrade
+from app.services.rollups import record_sales
+from app.services.stock_ledger import take_snapshots
+from app.config.constants import CURRENT_USER, get_datetime_obj
 import random
 
 
-async def setup_database():
+async def setup_database(reset: bool = False):
     # Create async engine
-    engine = create_async_engine(DATABASE_URL, echo=True)
+    engine = create_engine_from_settings()
     async_session = async_sessionmaker(engine, expire_on_commit=False)
 
     try:
-        # First, create all tables
+        # Create missing tables and upgrade existing ones in place;
+        # only drop everything when explicitly asked to
         async with engine.begin() as conn:
-            await conn.run_sync(Base.metadata.drop_all)
+            if reset:
+                await conn.run_sync(Base.metadata.drop_all)
             await conn.run_sync(Base.metadata.create_all)
+            version = await conn.run_sync(upgrade)
 
-        print("Tables created successfully!")
+        print(f"Tables ready at schema version {version}!")
+
+        async with async_session() as session:
+            existing = await session.scalar(select(func.count()).select_from(Product))
+        if existing:
+            print(f"Database already contains {existing} products, skipping sample data")
+            return
 
         # Create sample products
         products_data = [
@@ -93,9 +107,22 @@ async def setup_database():
                 )
 
             session.add_all(sales_history)
+            await record_sales(session, [
+                {
+                    "store_id": sale.store_id,
+                    "product_id": sale.product_id,
+                    "quantity": sale.quantity,
+                    "sale_date": sale.sale_date
+                }
+                for sale in sales_history
+            ])
             await session.commit()
             print("Sales history added successfully!")
 
+            # Opening stock of the new stores, the starting point of ?as_of= reads
+            snapshots = await take_snapshots(session)
+            print(f"Stock snapshots taken for {snapshots['stores']} stores")
+
         print(f"Database initialized successfully by {CURRENT_USER}!")
 
     except Exception as e:
@@ -106,4 +133,4 @@ async def setup_database():
 
 
 if __name__ == "__main__":
-    asyncio.run(setup_database())
\ No newline at end of file
+    asyncio.run(setup_database(reset="--reset" in sys.argv))
\ No newline at end of file
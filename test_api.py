@@ -14,10 +14,10 @@ def print_json(data, title):
     print("\n")
 
 def test_api():
-    # 1. System Information
-    print("Testing System Information...")
-    response = requests.get(f"{BASE_URL}/system-info")
-    print_json(response.json(), "System Info")
+    # 1. Background job schedules
+    print("Checking job schedules...")
+    response = requests.get(f"{BASE_URL}/jobs/schedules")
+    print_json(response.json(), "Job Schedules")
 
     # 2. Check Initial Inventory for all stores
     stores = ["store1", "store2", "store3"]
@@ -41,10 +41,10 @@ def test_api():
     response = requests.get(f"{BASE_URL}/forecast/store1")
     print_json(response.json(), "Store1 Forecast")
 
-    # 5. Get Optimization Recommendations
-    print("Getting optimization recommendations...")
-    response = requests.get(f"{BASE_URL}/optimize/store1")
-    print_json(response.json(), "Optimization Recommendations")
+    # 5. Get Price Optimization Recommendations
+    print("Getting price optimization recommendations...")
+    response = requests.get(f"{BASE_URL}/price-optimization/store1")
+    print_json(response.json(), "Price Optimization")
 
 if __name__ == "__main__":
     print(f"Starting API tests at {CURRENT_TIME}")